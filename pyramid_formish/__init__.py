@@ -1,76 +1,352 @@
+import itertools
 import os
+import re
+import threading
+from hashlib import md5
+import time
 import mako
 
 import formish
+import schemaish
+from formish.forms import Collection
+from formish.forms import ErrorDict
+from formish.forms import Group
+from formish.forms import fall_back_renderer
+from formish.forms import is_int
 from pkg_resources import resource_filename
 
 from chameleon.zpt import language
 from chameleon.zpt.template import PageTemplateFile
 from zope.interface import Interface
-from zope.component import queryUtility
-from zope.component import getSiteManager
 
+from pyramid.events import IApplicationCreated
+from pyramid.i18n import get_locale_name
+from pyramid.response import Response
+from pyramid.settings import asbool
 from pyramid.threadlocal import get_current_registry
+from pyramid.threadlocal import get_current_request
+
+from pyramid_formish.events import FormTimings
+from pyramid_formish.events import IFormPhaseEvent
+from pyramid_formish.events import timed
+
+DEFAULT_CACHE_SIZE = 1000
+DEFAULT_RELOAD_INTERVAL = 1
+DEFAULT_RESULT_CACHE_TTL = 60
+RESOLVE_RENDERER_ORDER = 10000
+
+_marker = object()
+
+# the default repr of an object, function or method, which only tells it
+# apart from those alive at the same time
+ADDRESS_REPR = re.compile(r' at 0x[0-9a-fA-F]+>')
+
+# tokens identifying definitions shared between forms
+_definition_tokens = itertools.count(1)
+
+def definition_token():
+    """ Return a new token for ``Form.share``, unique within the process """
+    return 'definition-%d' % _definition_tokens.next()
+
+class LRUCache(object):
+    """ A thread-safe, size-bounded, least-recently-used cache.  Keeps
+    ``hits``, ``misses`` and ``evictions`` counters.  A ``maxsize`` of
+    ``None`` means the cache is unbounded. """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.hits = self.misses = self.evictions = 0
+        self.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            # links are [prev, next, key, value]; ``root`` is a sentinel
+            # whose ``next`` is the least recently used link
+            root = []
+            root[:] = [root, root, None, None]
+            self.root = root
+            self.data = {}
+        finally:
+            self.lock.release()
+
+    def _unlink(self, link):
+        prev, next = link[0], link[1]
+        prev[1] = next
+        next[0] = prev
+
+    def _append(self, link):
+        root = self.root
+        last = root[0]
+        link[0] = last
+        link[1] = root
+        last[1] = root[0] = link
+
+    def _get(self, key):
+        link = self.data.get(key)
+        if link is None:
+            return _marker
+        self._unlink(link)
+        self._append(link)
+        return link[3]
+
+    def _put(self, key, value):
+        link = self.data.get(key)
+        if link is not None:
+            self._unlink(link)
+            link[3] = value
+        else:
+            link = self.data[key] = [None, None, key, value]
+        self._append(link)
+        if self.maxsize is not None and len(self.data) > self.maxsize:
+            oldest = self.root[1]
+            self._unlink(oldest)
+            del self.data[oldest[2]]
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        self.lock.acquire()
+        try:
+            value = self._get(key)
+            if value is _marker:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+        finally:
+            self.lock.release()
+
+    def put(self, key, value):
+        self.lock.acquire()
+        try:
+            self._put(key, value)
+        finally:
+            self.lock.release()
+
+    def invalidate(self, key):
+        self.lock.acquire()
+        try:
+            link = self.data.pop(key, None)
+            if link is not None:
+                self._unlink(link)
+        finally:
+            self.lock.release()
+
+    def load(self, key, factory, valid=None):
+        """ Return the value cached for ``key``, calling ``factory`` to
+        compute it if it is missing (or if ``valid`` is given and returns
+        False for it).  Concurrent callers missing the same key wait for a
+        single call of ``factory`` rather than each calling it. """
+        def _get(key):
+            value = self._get(key)
+            if value is not _marker and valid is not None and not valid(value):
+                return _marker
+            return value
+        self.lock.acquire()
+        try:
+            value = _get(key)
+            if value is not _marker:
+                self.hits += 1
+                return value
+            keylock = self.loading.get(key)
+            if keylock is None:
+                keylock = self.loading[key] = threading.Lock()
+        finally:
+            self.lock.release()
+
+        keylock.acquire()
+        try:
+            self.lock.acquire()
+            try:
+                value = _get(key)
+                if value is not _marker:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+            finally:
+                self.lock.release()
+            try:
+                value = factory()
+                self.put(key, value)
+            finally:
+                self.lock.acquire()
+                try:
+                    if self.loading.get(key) is keylock:
+                        del self.loading[key]
+                finally:
+                    self.lock.release()
+            return value
+        finally:
+            keylock.release()
 
 def cache(func):
     def load(self, *args):
-        template = self.registry.get(args)
-        if template is None:
-            self.registry[args] = template = func(self, *args)
-        return template
+        if self.auto_reload:
+            self.check()
+        return self.registry.load(args, lambda: func(self, *args))
     return load
 
+def compile_template(template):
+    """ Compile ``template`` the same way rendering it would, without
+    rendering it """
+    key = None, True, template.signature
+    if key not in template.registry:
+        template.acquire()
+        try:
+            source = template.compiler(None, True)
+        finally:
+            template.release()
+        template.registry.add(key, source, template.filename)
+
 class IFormishSearchPath(Interface):
     """ Utility interface representing a chameleon.formish search path """
 
 class IFormishRenderer(Interface):
     """ Utility interface representing a formish renderer """
     
+class TemplateDirectory(object):
+    """ The files beneath a search path directory, along with the
+    modification times of each file and directory seen """
+    def __init__(self, path):
+        self.path = path
+        self.scan()
+
+    def scan(self):
+        files = {}
+        mtimes = {}
+        seen = set()
+        for root, dirs, names in os.walk(self.path, followlinks=True):
+            # symlinked directories are followed, each directory only once
+            stat = os.stat(root)
+            if (stat.st_dev, stat.st_ino) in seen:
+                dirs[:] = []
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            mtimes[root] = os.path.getmtime(root)
+            prefix = os.path.relpath(root, self.path)
+            for name in names:
+                filename = os.path.normpath(os.path.join(prefix, name))
+                filename = filename.replace(os.sep, '/')
+                fullpath = os.path.join(root, name)
+                files[filename] = fullpath
+                mtimes[fullpath] = os.path.getmtime(fullpath)
+        self.files = files
+        self.mtimes = mtimes
+
+    def changed(self):
+        if not self.mtimes:
+            return os.path.isdir(self.path)
+        for path, mtime in self.mtimes.items():
+            try:
+                if os.path.getmtime(path) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
 class TemplateLoader(object):
     parser = language.Parser()
 
-    def __init__(self, search_path=None, auto_reload=False):
+    def __init__(self, search_path=None, auto_reload=False,
+                 cache_size=DEFAULT_CACHE_SIZE,
+                 reload_interval=DEFAULT_RELOAD_INTERVAL):
         if search_path is None:
             search_path = []
         if isinstance(search_path, basestring):
             search_path = [search_path]
         self.search_path = search_path
         self.auto_reload = auto_reload
-        self.registry = {}
-        self.notexists = {}
+        self.reload_interval = reload_interval
+        self.next_check = 0
+        self.registry = LRUCache(cache_size)
+        self.build_index()
+
+    def build_index(self):
+        """ Map each template filename relative to a search path
+        directory to its absolute path; directories earlier in the search
+        path win """
+        self.directories = [ TemplateDirectory(x) for x in self.search_path ]
+        index = {}
+        for directory in self.directories:
+            for filename, path in directory.files.items():
+                index.setdefault(filename, path)
+        self.index = index
+        self.indexed_path = list(self.search_path)
+
+    def changed(self):
+        if self.search_path != self.indexed_path:
+            return True
+        for directory in self.directories:
+            if directory.changed():
+                return True
+        return False
+
+    def check(self):
+        """ Rebuild the index and empty the template cache if the search
+        path has changed.  Does nothing if the last check happened less
+        than ``reload_interval`` seconds ago. """
+        now = time.time()
+        if now < self.next_check:
+            return
+        self.next_check = now + self.reload_interval
+        if self.changed():
+            self.build_index()
+            self.registry.clear()
 
     @cache
     def load(self, filename):
-        for path in self.search_path:
-            path = os.path.join(path, filename)
-            if (path in self.notexists) and (not self.auto_reload):
-                raise mako.exceptions.TopLevelLookupException(
-                    "Can not find template %s" % filename)
-            try:
-                return PageTemplateFile(path, parser=self.parser,
-                                        auto_reload=self.auto_reload,
-                                        encoding='utf-8')
-            except OSError:
-                self.notexists[path] = True
+        path = self.index.get(filename)
+        if path is None:
+            raise mako.exceptions.TopLevelLookupException(
+                "Can not find template %s" % filename)
+        # changes to template files are detected by ``check`` rather than
+        # by each template
+        return PageTemplateFile(path, parser=self.parser, auto_reload=False,
+                                encoding='utf-8')
 
-        raise mako.exceptions.TopLevelLookupException(
-            "Can not find template %s" % filename)
+    def warm(self):
+        """ Load and compile every template in the search path.  Return a
+        sequence of the filenames of the templates compiled and a sequence
+        of ``(filename, exception)`` pairs for those which failed to
+        compile """
+        compiled = []
+        failed = []
+        filenames = sorted([ x for x in self.index if x.endswith('.html') ])
+        for filename in filenames:
+            try:
+                compile_template(self.load(filename))
+            except Exception, e:
+                failed.append((filename, e))
+            else:
+                compiled.append(filename)
+        return compiled, failed
 
 class ZPTRenderer(object):
-    def __init__(self, directories=None):
-        settings = get_current_registry().settings
-        auto_reload = settings and settings['reload_templates'] or False
+    def __init__(self, directories=None, registry=None):
+        if registry is None:
+            registry = get_current_registry()
+        settings = registry.settings or {}
+        auto_reload = settings.get('reload_templates', False)
+        cache_size = int(settings.get('formish.template_cache_size',
+                                      DEFAULT_CACHE_SIZE))
+        reload_interval = float(settings.get('formish.reload_interval',
+                                             DEFAULT_RELOAD_INTERVAL))
         if directories is None:
             directories = []
         if isinstance(directories, basestring):
             directories = [directories]
         self.directories = list(directories)
         # if there are ZCML-registered directories, use those too
-        more = queryUtility(IFormishSearchPath, default=[])
-        directories.extend(more)
+        more = registry.queryUtility(IFormishSearchPath, default=[])
         default = resource_filename('pyramid_formish', 'templates/zpt')
-        directories.append(default)
-        self.loader = TemplateLoader(directories, auto_reload=auto_reload)
+        search_path = self.directories + list(more) + [default]
+        self.loader = TemplateLoader(search_path, auto_reload=auto_reload,
+                                     cache_size=cache_size,
+                                     reload_interval=reload_interval)
 
     def __call__(self, template, args):
         if template.startswith('/'):
@@ -78,23 +354,456 @@ class ZPTRenderer(object):
         template = self.loader.load(template)
         return template(**args)
 
-def get_default_renderer():
-    sm = getSiteManager()
-    renderer = queryUtility(IFormishRenderer)
+def get_default_renderer(registry=None):
+    """ Return the renderer used by forms created while ``registry`` (by
+    default, the current registry) is active: its ``IFormishRenderer``
+    utility, or else a ``ZPTRenderer`` for its search path.  The renderer is
+    looked up once and kept on the registry. """
+    if registry is None:
+        registry = get_current_registry()
+    try:
+        return registry.formish_renderer
+    except AttributeError:
+        pass
+    renderer = registry.queryUtility(IFormishRenderer)
     if renderer is None:
-        # register a default renderer
-        renderer = ZPTRenderer()
-        sm.registerUtility(renderer, IFormishRenderer)
+        renderer = ZPTRenderer(registry=registry)
+    registry.formish_renderer = renderer
     return renderer
 
+def reset_default_renderer(registry):
+    """ Make ``get_default_renderer`` look up the renderer of ``registry``
+    again, e.g. after its search path has changed """
+    try:
+        del registry.formish_renderer
+    except AttributeError:
+        pass
+
+def warm_templates(event):
+    """ ``IApplicationCreated`` subscriber which loads and compiles the
+    templates of the default renderer before the application serves its
+    first request """
+    loader = getattr(get_default_renderer(), 'loader', None)
+    if loader is not None:
+        loader.warm()
+
+def includeme(config):
+    # resolve the default renderer after all other configuration actions
+    config.action(None, get_default_renderer, (config.registry,),
+                  order=RESOLVE_RENDERER_ORDER)
+    config.add_subscriber(warm_templates, IApplicationCreated)
+    config.add_directive('add_form', 'pyramid_formish.config.add_form')
+    config.add_directive('add_form_group',
+                         'pyramid_formish.config.add_form_group')
+    config.add_directive('add_formish_template_path',
+                         'pyramid_formish.config.add_formish_template_path')
+    config.add_directive('load_formish_zcml',
+                         'pyramid_formish.plan.load_formish_zcml',
+                         action_wrap=False)
+    settings = config.registry.settings or {}
+    if asbool(settings.get('formish.timings', False)):
+        timings = FormTimings()
+        config.registry.formish_timings = timings
+        config.add_subscriber(timings, IFormPhaseEvent)
+
+class RenderCache(object):
+    """ A cache of form renderings.  A rendering is only stored the second
+    time its key is seen, so that renderings which are unlikely to be
+    repeated (such as those of forms with per-user defaults) do not push
+    out the others. """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.renderings = LRUCache(maxsize)
+        self.seen = LRUCache(maxsize)
+
+    def get(self, key):
+        return self.renderings.get(key)
+
+    def put(self, key, html):
+        if self.seen.get(key) is None:
+            self.seen.put(key, True)
+        else:
+            self.renderings.put(key, html)
+
+    def clear(self):
+        self.renderings.clear()
+        self.seen.clear()
+
+class ResultCache(object):
+    """ A cache of the results of the handlers of submissions of a ``GET``
+    form, keyed on the submitted data once validated.  Results expire
+    ``ttl`` seconds after they were computed.  Responses are copied as they
+    are returned, so that each request may change its own. """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE,
+                 ttl=DEFAULT_RESULT_CACHE_TTL):
+        self.results = LRUCache(maxsize)
+        self.ttl = ttl
+
+    def load(self, key, factory):
+        """ Return the result cached for ``key``, calling ``factory`` to
+        compute it if it is missing or has expired """
+        def compute():
+            return time.time() + self.ttl, factory()
+        def valid(entry):
+            return entry[0] > time.time()
+        expires, result = self.results.load(key, compute, valid)
+        if isinstance(result, Response):
+            result = result.copy()
+        return result
+
+    def clear(self):
+        self.results.clear()
+
+def get_result_caches(registry=None):
+    """ Return a dictionary mapping the id of each ``GET`` form of
+    ``registry`` whose results are cached to a list of its
+    ``ResultCache`` objects (one per form declaration) """
+    if registry is None:
+        registry = get_current_registry()
+    try:
+        return registry.formish_result_caches
+    except AttributeError:
+        caches = registry.formish_result_caches = {}
+        return caches
+
+def invalidate_results(form_id=None, registry=None):
+    """ Empty the result caches of the ``GET`` forms with the id
+    ``form_id`` (of all forms if it is None), e.g. when the data they
+    search has changed """
+    caches = get_result_caches(registry)
+    if form_id is None:
+        form_caches = sum(caches.values(), [])
+    else:
+        form_caches = caches.get(form_id, [])
+    for cache in form_caches:
+        cache.clear()
+
+def canonical(value):
+    """ Return a representation of ``value`` which does not depend on the
+    ordering of the dictionaries within it """
+    if isinstance(value, dict):
+        items = [ (canonical(k), canonical(v)) for k, v in value.items() ]
+        items.sort()
+        return ('dict', tuple(items))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple([ canonical(x) for x in value ]))
+    return value
+
+def digest(value):
+    return md5(repr(canonical(value))).hexdigest()
+
+def attr_state(attr):
+    """ Return the type, title, description, validator and default of the
+    schemaish attribute ``attr`` and, if it is a container, the state of
+    its attributes; the reprs of structures and sequences leave out most of
+    it """
+    cls = type(attr)
+    if hasattr(attr, 'defaults'):
+        default = attr.defaults
+    else:
+        default = getattr(attr, 'default', None)
+    state = ('%s.%s' % (cls.__module__, cls.__name__), attr.title,
+             attr.description, attr.validator, default)
+    if isinstance(attr, schemaish.Sequence):
+        return state + (attr_state(attr.attr),)
+    if isinstance(attr, schemaish.Structure):
+        return state + (tuple([ (name, attr_state(a))
+                                for name, a in attr.attrs ]),)
+    if isinstance(attr, schemaish.Tuple):
+        return state + (tuple([ attr_state(a) for a in attr.attrs ]),)
+    return state
+
+class FormErrors(ErrorDict):
+    """ An ErrorDict which does not walk every field of the form when it
+    is empty; each structure and sequence lists the errors when rendered,
+    so otherwise rendering a large form takes time quadratic in its
+    number of fields """
+    def __iter__(self):
+        if not len(self):
+            return iter(())
+        return ErrorDict.__iter__(self)
+
+class TransientGroup(Group):
+    """ The top-level group of a form sharing a definition: its fields are
+    bound anew each time they are used rather than kept, so that the form
+    holds no per-field objects between uses """
+    def bind(self, attr_name, attr):
+        field = Group.bind(self, attr_name, attr)
+        del self._fields[attr_name]
+        return field
+
+class FieldsPlaceholder(object):
+    """ Stands in for a form or collection while its own template is
+    rendered, so that its fields render as ``marker`` """
+    def __init__(self, obj, marker):
+        self._obj = obj
+        self._marker = marker
+
+    def __getattr__(self, name):
+        return getattr(self._obj, name)
+
+    @property
+    def fields(self):
+        return MarkerFields(self._marker)
+
+class MarkerFields(object):
+    """ A sequence of two fields which render as ``marker``, so that the
+    text a template puts between its fields can be found; calling it
+    returns ``marker`` once """
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __call__(self):
+        return self.marker
+
+    def __iter__(self):
+        return iter([self, self])
+
+def split_rendering(html, marker, count):
+    """ Return the parts of ``html`` around ``marker``, or ``None`` if
+    ``marker`` does not occur exactly ``count`` times """
+    parts = html.split(marker)
+    if len(parts) != count + 1:
+        return None
+    return parts
+
+def iter_joined(head, separator, tail, fields, marker):
+    """ Yield ``head``, the chunks of each of ``fields`` separated by
+    ``separator``, then ``tail`` """
+    yield head
+    for i, field in enumerate(fields):
+        if i:
+            yield separator
+        for chunk in iter_field(field, marker):
+            yield chunk
+    yield tail
+
+def iter_field(field, marker):
+    """ Yield the rendering of a bound formish field in chunks, rendering
+    the fields of structures and sequences one at a time """
+    widget_type, widget = field.widget.template.split('.')
+    if not isinstance(field, Collection) or widget_type == 'field':
+        yield field()
+        return
+    placeholder = FieldsPlaceholder(field, marker)
+    html = fall_back_renderer(field.form.renderer, '%s/main' % widget_type,
+                              widget, {'field':placeholder})
+    parts = split_rendering(html, marker, 2)
+    if parts is None:
+        # the template does not render each of its fields once
+        yield field()
+        return
+    head, separator, tail = parts
+    for chunk in iter_joined(head, separator, tail, field.fields, marker):
+        yield chunk
+
 class Form(formish.Form):
+    # a RenderCache, set to cache renderings of this form when it has no
+    # errors and no submitted data
+    render_cache = None
+    # True while item_data and actions are those of a shared definition
+    _shared_item_data = False
+    _shared_actions = False
+    # the token identifying the shared definition, if any
+    _shared_token = None
+
     def __init__(self, *arg, **kw):
         if not 'renderer' in kw:
             kw['renderer'] = get_default_renderer() # need to defer this til now
         formish.Form.__init__(self, *arg, **kw)
+        if type(self.errors) is ErrorDict:
+            errors = FormErrors(self)
+            errors.update(self.errors)
+            self.errors = errors
+
+    def share(self, item_data, actions, token=None):
+        """ Use ``item_data`` (the widgets, titles and descriptions of the
+        fields) and ``actions`` (a list of ``formish.forms.Action``) of a
+        form definition shared between requests instead of copies of them.
+        Both are copied before the form changes them.  Fields are bound
+        when used rather than kept, so that only the data, defaults and
+        errors of the form are held per form.  ``token`` (see
+        ``definition_token``), if given, stands for the definition in the
+        fingerprint of the form as long as the form does not change it; it
+        must not be given to forms of other schemas. """
+        self.item_data = item_data
+        self._actions = actions
+        self._shared_item_data = self._shared_actions = True
+        self._shared_token = token
+        self.structure = TransientGroup(None, self.structure.attr, self)
+
+    def set_item_data(self, key, name, value):
+        if self._shared_item_data:
+            self.item_data = dict([ (k, dict(v))
+                                    for k, v in self.item_data.items() ])
+            self._shared_item_data = False
+        formish.Form.set_item_data(self, key, name, value)
+
+    def add_action(self, name=None, value=None, callback=None):
+        if self._shared_actions:
+            self._actions = list(self._actions)
+            self._shared_actions = False
+        formish.Form.add_action(self, name, value, callback)
 
     def set_widget(self, title, widget):
         self[title].widget = widget
+
+    def __call__(self, classes=None):
+        return timed('render', self.name, None, self._render, classes)
+
+    def _render(self, classes=None):
+        self._add_classes(classes)
+        cache = self.render_cache
+        if cache is None or not self.pristine():
+            return formish.Form.__call__(self)
+        key = self.render_key()
+        if key is None:
+            return formish.Form.__call__(self)
+        html = cache.get(key)
+        if html is None:
+            html = formish.Form.__call__(self)
+            cache.put(key, html)
+        return html
+
+    def _add_classes(self, classes):
+        if classes:
+            # formish shares the list of classes between forms
+            self.classes = list(self.classes)
+            for css_class in classes:
+                if css_class and css_class not in self.classes:
+                    self.classes.append(css_class)
+
+    def iter_render(self, classes=None, encoding='utf-8'):
+        """ Render the form like calling it does, but yield the rendering
+        in chunks (one or more per field) encoded with ``encoding``, so
+        that large forms need not be rendered into memory at once.  The
+        result may be used as the ``app_iter`` of a response.  If
+        ``encoding`` is None, unicode chunks are yielded. """
+        for chunk in self._iter_render(classes):
+            if encoding is not None:
+                chunk = chunk.encode(encoding)
+            yield chunk
+
+    def _iter_render(self, classes):
+        self._add_classes(classes)
+        marker = u'<!--formish-fields-%x-->' % id(self)
+        placeholder = FieldsPlaceholder(self, marker)
+        form_parts = split_rendering(
+            self.renderer('/formish/form/main.html', {'form':placeholder}),
+            marker, 1)
+        fields_parts = split_rendering(
+            self.renderer('/formish/form/fields.html', {'form':placeholder}),
+            marker, 2)
+        if form_parts is None or fields_parts is None:
+            # the templates do not render each field once
+            yield formish.Form.__call__(self)
+            return
+        head, separator, tail = fields_parts
+        yield form_parts[0]
+        for chunk in iter_joined(head, separator, tail, self.fields, marker):
+            yield chunk
+        yield form_parts[1]
+
+    def render_field(self, name):
+        """ Return the rendering of the field, structure or sequence of the
+        form whose dotted key is ``name`` (e.g. ``address.city``), as it
+        appears in the rendering of the whole form.  Raise ``KeyError`` if
+        the form has no such field. """
+        return timed('render', self.name, None, self._render_field, name)
+
+    def _render_field(self, name):
+        try:
+            field = self.get_field(name)
+        except AttributeError:
+            # a segment of the name other than the last is not a collection
+            field = None
+        if field is None:
+            raise KeyError(name)
+        cache = self.render_cache
+        if cache is None or not self.pristine():
+            return self._render_subtree(field)
+        # the default widget of the field is part of the key once resolved
+        field.widget
+        key = self.render_key()
+        if key is None:
+            return self._render_subtree(field)
+        key += (name,)
+        html = cache.get(key)
+        if html is None:
+            html = self._render_subtree(field)
+            cache.put(key, html)
+        return html
+
+    def _render_subtree(self, field):
+        """ Render ``field``; if the form's request data would be converted
+        from its defaults, only convert those of ``field`` """
+        segments = field.name.split('.')
+        if self._request_data is not None or [ s for s in segments
+                                               if is_int(s) or s == '*' ]:
+            return field()
+        request_data = data = {}
+        for segment in segments[:-1]:
+            data[segment] = {}
+            data = data[segment]
+        data[segments[-1]] = field.widget.to_request_data(field,
+                                                          field.defaults)
+        self._request_data = request_data
+        try:
+            return field()
+        finally:
+            self._request_data = None
+
+    def pristine(self):
+        """ Return True if the form has not been validated against a
+        request, and has no errors or alert """
+        return (getattr(self, '_request', None) is None and
+                not self.errors and not self.alert)
+
+    def fingerprint(self):
+        """ Return a digest of the parts of the form which affect its
+        rendering, other than its defaults, or None if the form cannot be
+        told apart from others by one (see ``definition_fingerprint``) """
+        if (self._shared_token is not None and self._shared_item_data and
+            self._shared_actions):
+            definition = self._shared_token
+        else:
+            definition = self.definition_fingerprint()
+            if definition is None:
+                return None
+        text = repr((self.name, self.method, self.action_url,
+                     self.include_charset, definition))
+        return md5(text).hexdigest()
+
+    def definition_fingerprint(self):
+        """ Return a digest of the schema (with its validators), the
+        widgets and the actions of the form, or None if one of them has the
+        default repr of objects """
+        # the reprs of validatish validators and the attributes of widgets
+        # stand for their state; the default repr only shows an address,
+        # which another object may have later
+        item_data = []
+        for key, data in self.item_data.items():
+            for name, value in data.items():
+                if name == 'widget':
+                    value = (type(value).__name__, vars(value))
+                item_data.append((key, name, value))
+        item_data.sort()
+        text = repr((attr_state(self.structure.attr),
+                     [ (a.name, a.value) for a in self._actions ],
+                     item_data))
+        if ADDRESS_REPR.search(text):
+            return None
+        return md5(text).hexdigest()
+
+    def render_key(self):
+        """ Return the key of the rendering of the form in its render
+        cache, or None if it may not be cached """
+        fingerprint = self.fingerprint()
+        if fingerprint is None:
+            return None
+        request = get_current_request()
+        locale_name = request is not None and get_locale_name(request) or None
+        return (self.name, fingerprint, digest(self._defaults),
+                locale_name, tuple(self.classes))
         
 class ValidationError(Exception):
     def __init__(self, **errors):
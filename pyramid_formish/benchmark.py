@@ -0,0 +1,350 @@
+""" Time each stage of the life of a form request, and print the results as
+JSON.  Run ``formish_benchmark --help`` for options. """
+import atexit
+import gc
+import json
+import optparse
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import pkg_resources
+import schemaish
+import validatish
+from webob.multidict import MultiDict
+from zope.configuration.config import ConfigurationMachine
+
+from pyramid import testing
+from pyramid.config import Configurator
+from pyramid.response import Response
+from pyramid.threadlocal import get_current_registry
+from pyramid.view import render_view_to_response
+
+from pyramid_formish import TemplateLoader
+from pyramid_formish import compile_template
+from pyramid_formish import ZPTRenderer
+from pyramid_formish.precompile import search_path
+from pyramid_formish.zcml import FormAction
+from pyramid_formish.zcml import FormDirective
+from pyramid_formish.zcml import FormView
+from pyramid_formish.zcml import FormsDirective
+from pyramid_formish.zcml import form_from_controller
+
+SCHEMA_SIZES = (('small', 5), ('medium', 50), ('huge', 500))
+GROUP_SIZES = (1, 10, 50)
+# the number of actions of each form of the groups submitted through the last
+# of their actions
+GROUP_ACTIONS = 20
+STARTUP_SIZES = (10, 100)
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+DISTRIBUTIONS = ('pyramid', 'formish', 'Chameleon', 'pyramid_formish')
+
+def schema_fields(size):
+    """ Return ``size`` form fields, alternately required strings and
+    integers """
+    fields = []
+    for i in range(size):
+        if i % 2:
+            fields.append(('count%s' % i, schemaish.Integer()))
+        else:
+            fields.append(('name%s' % i,
+                           schemaish.String(validator=validatish.Required())))
+    return fields
+
+def submission(size, form_id='form', action='submit'):
+    """ Return POST data which validates against ``schema_fields(size)`` """
+    data = MultiDict()
+    for name, attr in schema_fields(size):
+        if isinstance(attr, schemaish.Integer):
+            data[name] = '1'
+        else:
+            data[name] = 'value'
+    data['__formish_form__'] = form_id
+    data[action] = action.capitalize()
+    return data
+
+def controller_factory(size):
+    """ Return a form controller class with ``size`` fields, whose display
+    method renders its form """
+    fields = schema_fields(size)
+    class Controller(object):
+        def __init__(self, context, request):
+            self.context = context
+            self.request = request
+
+        def form_fields(self):
+            return fields
+
+        def form_defaults(self):
+            return {}
+
+        def __call__(self):
+            return Response(self.request.form().encode('utf-8'))
+
+        def handle_submit(self, converted):
+            return Response('submitted')
+
+    return Controller
+
+# referred to by dotted name from the configuration of the startup stages
+class StartupController(controller_factory(dict(SCHEMA_SIZES)['small'])):
+    pass
+
+def startup_zcml(count):
+    """ Write a ZCML file declaring ``count`` forms to a temporary file
+    (removed at exit); return its name """
+    lines = ['<configure xmlns="http://pylonshq.com/pyramid_formish">',
+             '<include xmlns="http://namespaces.zope.org/zope"',
+             '         package="pyramid_formish" file="meta.zcml"/>']
+    for i in range(count):
+        lines.extend([
+            '<form controller="pyramid_formish.benchmark.StartupController"',
+            '      name="form%s" form_id="form%s">' % (i, i),
+            '  <action name="submit"/>',
+            '</form>'])
+    lines.append('</configure>')
+    fd, filename = tempfile.mkstemp(suffix='.zcml')
+    f = os.fdopen(fd, 'w')
+    try:
+        f.write('\n'.join(lines))
+    finally:
+        f.close()
+    atexit.register(os.remove, filename)
+    return filename
+
+def startup_stages(count):
+    """ Return functions configuring an application with ``count`` forms
+    from ZCML, from ZCML through a cached registration plan (written by the
+    first call) and through ``config.add_form`` respectively """
+    filename = startup_zcml(count)
+    fd, cache_file = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    atexit.register(os.remove, cache_file)
+    def zcml():
+        config = Configurator()
+        config.include('pyramid_zcml')
+        config.load_zcml(filename)
+        config.commit()
+        return config
+    def cached():
+        config = Configurator()
+        config.include('pyramid_formish')
+        config.load_formish_zcml(filename, cache_file)
+        config.commit()
+        return config
+    def imperative():
+        config = Configurator()
+        config.include('pyramid_formish')
+        for i in range(count):
+            config.add_form('pyramid_formish.benchmark.StartupController',
+                            ['submit'], name='form%s' % i,
+                            form_id='form%s' % i)
+        config.commit()
+        return config
+    return zcml, cached, imperative
+
+def make_request(post=None):
+    request = testing.DummyRequest()
+    if post is not None:
+        request.method = 'POST'
+        request.POST = post
+        request.params = post
+    return request
+
+def submitted(controller, converted):
+    return Response('submitted')
+
+def forms_view(size, count, actions=1):
+    """ Configure a ``formish:forms`` group of ``count`` forms with ``size``
+    fields and ``actions`` actions (``submit``, ``action1``, ``action2``...)
+    each, and return a function which calls its view with a request """
+    def display(context, request):
+        html = u''.join([ form() for form in request.forms ])
+        return Response(html.encode('utf-8'))
+    name = 'forms%s.%s' % (count, actions)
+    context = ConfigurationMachine()
+    context.route_prefix = ''
+    context.registry = get_current_registry()
+    context.autocommit = True
+    group = FormsDirective(context, view=display, name=name)
+    controller = controller_factory(size)
+    for i in range(count):
+        formdef = FormDirective(group, controller, form_id='form%s' % i)
+        formdef._actions.append(FormAction('submit'))
+        for j in range(1, actions):
+            formdef._actions.append(FormAction('action%s' % j,
+                                               success=submitted))
+        formdef.after()
+    group.after()
+    def view(post=None):
+        return render_view_to_response(None, make_request(post), name)
+    return view
+
+def stages(options):
+    """ Return a list of ``(name, function)`` pairs, each function
+    performing one run of a benchmarked stage """
+    result = []
+    actions = [FormAction('submit')]
+    for label, size in SCHEMA_SIZES:
+        Controller = controller_factory(size)
+        controller = Controller(None, make_request())
+        def build(controller=controller):
+            return form_from_controller(controller, 'form', actions)
+        result.append(('form_from_controller.%s' % label, build))
+
+    for label, size in SCHEMA_SIZES:
+        form = form_from_controller(
+            controller_factory(size)(None, make_request()), 'form', actions)
+        result.append(('render.%s' % label, form))
+
+    Controller = controller_factory(dict(SCHEMA_SIZES)['medium'])
+    display_view = FormView(Controller, FormAction(None), actions, 'form')
+    submit_view = FormView(Controller, actions[0], actions, 'form')
+    post = submission(dict(SCHEMA_SIZES)['medium'])
+    result.append(('form_view.display.medium',
+                   lambda: display_view(None, make_request())))
+    result.append(('form_view.submit.medium',
+                   lambda: submit_view(None, make_request(post))))
+
+    size = dict(SCHEMA_SIZES)['small']
+    for count in GROUP_SIZES:
+        view = forms_view(size, count)
+        post = submission(size, 'form%s' % (count - 1))
+        result.append(('forms_view.display.%s' % count, view))
+        result.append(('forms_view.submit.%s' % count,
+                       lambda view=view, post=post: view(post)))
+    for count in GROUP_SIZES:
+        view = forms_view(size, count, GROUP_ACTIONS)
+        post = submission(size, 'form%s' % (count - 1),
+                          'action%s' % (GROUP_ACTIONS - 1))
+        result.append(('forms_view.submit_last_action.%s' % count,
+                       lambda view=view, post=post: view(post)))
+
+    for count in STARTUP_SIZES:
+        zcml, cached, imperative = startup_stages(count)
+        result.append(('startup.zcml.%s' % count, zcml))
+        result.append(('startup.cached.%s' % count, cached))
+        result.append(('startup.imperative.%s' % count, imperative))
+
+    directories = search_path([])
+    def load_cold():
+        loader = TemplateLoader(directories)
+        loader.load('formish/form/main.html')
+    loader = TemplateLoader(directories)
+    loader.load('formish/form/main.html')
+    def load_warm():
+        loader.load('formish/form/main.html')
+    def compile_cold():
+        loader = TemplateLoader(directories)
+        compile_template(loader.load('formish/form/main.html'))
+    result.append(('template_loader.load.cold', load_cold))
+    result.append(('template_loader.load.warm', load_warm))
+    result.append(('template_loader.compile', compile_cold))
+
+    renderer = ZPTRenderer()
+    field = form_from_controller(
+        controller_factory(1)(None, make_request()), 'form', actions)['name0']
+    result.append(('zpt_renderer.field',
+                   lambda: renderer('/formish/field/main.html',
+                                    {'field':field})))
+
+    if options.stages:
+        result = [ (name, func) for name, func in result
+                   if [ s for s in options.stages if name.startswith(s) ] ]
+    return result
+
+def measure(func, repeat, min_time):
+    """ Call ``func`` enough times in a row to take at least ``min_time``
+    seconds, ``repeat`` times over; return the number of calls in each run
+    and the time per call of each run """
+    number = 1
+    while True:
+        elapsed = timed(func, number)
+        if elapsed >= min_time or number >= 1000000:
+            break
+        number *= 10
+    times = [ elapsed / number ]
+    for i in range(repeat - 1):
+        times.append(timed(func, number) / number)
+    return number, times
+
+def timed(func, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.time()
+        for i in xrange(number):
+            func()
+        return time.time() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def versions():
+    result = {}
+    for name in DISTRIBUTIONS:
+        try:
+            result[name] = pkg_resources.get_distribution(name).version
+        except pkg_resources.DistributionNotFound:
+            result[name] = None
+    return result
+
+def run(options):
+    testing.setUp()
+    try:
+        results = []
+        for name, func in stages(options):
+            func() # load and compile templates outside of the timings
+            number, times = measure(func, options.repeat, options.min_time)
+            times.sort()
+            results.append({'name':name,
+                            'number':number,
+                            'best':times[0],
+                            'median':times[len(times) // 2],
+                            'times':times})
+    finally:
+        testing.tearDown()
+    return {'python':platform.python_version(),
+            'platform':platform.platform(),
+            'versions':versions(),
+            'repeat':options.repeat,
+            'min_time':options.min_time,
+            'results':results}
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    parser = optparse.OptionParser(
+        usage='%prog [options] [stage prefix ...]',
+        description='Time each stage of handling a form request and print '
+                    'the results (seconds per call) as JSON.')
+    parser.add_option('-r', '--repeat', type='int', default=DEFAULT_REPEAT,
+                      help='number of timed runs of each stage '
+                           '(default %default)')
+    parser.add_option('-t', '--min-time', type='float',
+                      default=DEFAULT_MIN_TIME,
+                      help='minimum duration in seconds of each timed run '
+                           '(default %default)')
+    parser.add_option('-o', '--output', default=None,
+                      help='write the results to this file instead of '
+                           'standard output')
+    options, args = parser.parse_args(argv[1:])
+    options.stages = args
+    results = run(options)
+    if options.output:
+        out = open(options.output, 'w')
+    else:
+        out = sys.stdout
+    try:
+        json.dump(results, out, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+        out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
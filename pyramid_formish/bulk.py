@@ -0,0 +1,221 @@
+import collections
+import itertools
+from multiprocessing import Pool
+
+import formish
+import schemaish
+from convertish.convert import ConvertError
+from convertish.convert import string_converter
+from dottedish import unflatten
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# options used by formish widgets when converting request data
+CONVERTER_OPTIONS = {'delimiter':','}
+
+_marker = object()
+
+# the RecordValidator of a worker process started by ``validate_records``
+_worker_validator = None
+
+class RecordValidator(object):
+    """ Converts and validates flat records (dictionaries mapping field
+    names to values) against the schema described by ``fields``, a sequence
+    of ``(name, schemaish attribute)`` pairs as returned by the
+    ``form_fields`` method of a form controller.
+
+    String values are stripped and converted as if they had been entered
+    in a text input; empty strings and missing values become None.  Values
+    which are not strings are validated as they are. """
+    def __init__(self, fields):
+        self.schema = schemaish.Structure()
+        self.converters = []
+        for name, attr in fields:
+            self.schema.add(name, attr)
+            self.converters.append((name, string_converter(attr)))
+
+    def __call__(self, record):
+        """ Return the converted data of ``record`` and a dictionary mapping
+        the name of each invalid field to its error message """
+        data = {}
+        errors = {}
+        for name, converter in self.converters:
+            value, error = convert_value(converter, record.get(name))
+            if error is not None:
+                errors[name] = error
+            data[name] = value
+        try:
+            self.schema.validate(data)
+        except schemaish.attr.Invalid, e:
+            for key, error in e.error_dict.items():
+                if key not in errors:
+                    errors[key] = error.message
+        return data, errors
+
+    def validate_chunk(self, chunk):
+        start, records = chunk
+        return [ (index,) + self(record)
+                 for index, record in enumerate(records, start) ]
+
+class FieldValidator(object):
+    """ Converts and validates some of the fields of a submission of the
+    form whose fields are described by ``fields`` (as ``RecordValidator``
+    does), ignoring the others.  Each field is converted from the request
+    data by its widget, as when the form is submitted; ``widgets`` maps the
+    dotted keys of fields to their widgets, as returned by the
+    ``form_widgets`` method of a form controller, and other fields have the
+    default widgets of formish.  Fields of nested structures are named by
+    their dotted keys, e.g. ``address.city``. """
+    def __init__(self, fields, widgets=None):
+        schema = schemaish.Structure()
+        for name, attr in fields:
+            schema.add(name, attr)
+        self.form = formish.Form(schema, add_default_action=False)
+        if widgets:
+            for name, widget in widgets.items():
+                self.form[name].widget = widget
+        self.fields = {}
+
+    def field(self, name):
+        """ Return the formish field whose dotted key is ``name``, or None
+        if the form has none or it is not validated on its own (structures,
+        sequences and their fields, read-only fields and file uploads) """
+        field = self.fields.get(name, _marker)
+        if field is _marker:
+            field = find_field(self.form.structure, name.split('.'))
+            if field is not None:
+                widget = field.widget.widget
+                if (getattr(field, 'fields', None) is not None or
+                    widget.readonly is True or
+                    isinstance(widget, formish.FileUpload)):
+                    field = None
+            self.fields[name] = field
+        return field
+
+    def __call__(self, names, record):
+        """ Return a dictionary mapping each of the ``names`` of fields of
+        ``record`` (a ``MultiDict`` of request parameters, or a dictionary)
+        which are invalid to its error message; names of fields which are
+        not validated on their own (see ``field``) are ignored """
+        errors = {}
+        for name in names:
+            field = self.field(name)
+            if field is None:
+                continue
+            widget = field.widget
+            request_data = widget.pre_parse_incoming_request_data(
+                field, field_request_data(record, name))
+            try:
+                value = widget.from_request_data(field, request_data)
+            except ConvertError, e:
+                errors[name] = e.message
+                continue
+            try:
+                field.attr.validate(value)
+            except schemaish.attr.Invalid, e:
+                errors[name] = e.error_dict[''].message
+        return errors
+
+def find_field(group, segments):
+    """ Return the field of the formish ``group`` (e.g. the structure of a
+    form) whose dotted key relative to it is made of ``segments``, or None;
+    fields of sequences are not found.  Only the fields on the way are
+    bound. """
+    attr = dict(group.attr.attrs).get(segments[0])
+    if attr is None:
+        return None
+    field = group.bind(segments[0], attr)
+    if len(segments) == 1:
+        return field
+    if not isinstance(attr, schemaish.Structure):
+        return None
+    return find_field(field, segments[1:])
+
+def field_request_data(record, name):
+    """ Return the request data of the field whose dotted key is ``name``
+    in the flat ``record``, as formish widgets expect it: the list of its
+    values, a dictionary of those of its parts (e.g. the ``day``, ``month``
+    and ``year`` of a date), or None if it has none """
+    getall = getattr(record, 'getall', None)
+    def values(key):
+        if getall is not None:
+            return getall(key)
+        return [record[key]]
+    if name in record:
+        return values(name)
+    prefix = name + '.'
+    keys = []
+    for key in record:
+        if key.startswith(prefix) and key not in keys:
+            keys.append(key)
+    if not keys:
+        return None
+    return unflatten([ (key[len(prefix):], values(key)) for key in keys ])
+
+def convert_value(converter, value):
+    """ Return ``value`` converted by ``converter`` and the error message of
+    the conversion, or None.  String values are stripped and converted as if
+    they had been entered in a text input; empty strings and missing values
+    become None.  Other values are returned as they are. """
+    if not isinstance(value, basestring):
+        return value, None
+    value = value.strip()
+    if not value:
+        return None, None
+    try:
+        return converter.to_type(value,
+                                 converter_options=CONVERTER_OPTIONS), None
+    except ConvertError, e:
+        return None, e.message
+
+def chunked(records, chunk_size):
+    """ Yield ``(index of first record, list of records)`` pairs of at most
+    ``chunk_size`` records of ``records`` """
+    records = iter(records)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+def _init_worker(fields):
+    global _worker_validator
+    _worker_validator = RecordValidator(fields)
+
+def _validate_chunk(chunk):
+    return _worker_validator.validate_chunk(chunk)
+
+def validate_records(fields, records, chunk_size=DEFAULT_CHUNK_SIZE,
+                     processes=None):
+    """ Validate each of the flat ``records`` against the schema described
+    by ``fields`` (see ``RecordValidator``), ``chunk_size`` records at a
+    time.  Yield an ``(index, data, errors)`` triple for each record, in
+    order, as soon as its chunk has been validated.
+
+    If ``processes`` is given, chunks are validated by that many worker
+    processes, no more than two chunks per process being read ahead of
+    those yielded.  The workers are forked, so ``fields`` need not be
+    picklable, but records and converted data must be. """
+    chunks = chunked(records, chunk_size)
+    if not processes:
+        validator = RecordValidator(fields)
+        for chunk in chunks:
+            for result in validator.validate_chunk(chunk):
+                yield result
+        return
+
+    pool = Pool(processes, _init_worker, (fields,))
+    try:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_validate_chunk, (chunk,)))
+            if len(pending) > 2 * processes:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
@@ -0,0 +1,92 @@
+""" Configurator directives declaring forms, added by ``includeme``; they
+register the same views as the ``formish:form`` and ``formish:forms`` ZCML
+directives. """
+import os
+from pkg_resources import resource_filename
+
+from pyramid_formish.zcml import FormAction
+from pyramid_formish.zcml import add_search_path
+from pyramid_formish.zcml import check_method
+from pyramid_formish.zcml import make_render_cache
+from pyramid_formish.zcml import make_result_cache
+from pyramid_formish.zcml import register_form_views
+from pyramid_formish.zcml import register_forms_view
+
+class FormDefinition(object):
+    """ A form of a group added by ``config.add_form_group``.  Each of
+    ``actions`` is either a ``FormAction`` or the name of an action, whose
+    title is then the capitalized name. """
+    def __init__(self, controller, form_id, actions=(), method=None,
+                 render_cache_size=None, validate_fields=False,
+                 render_fields=False, export_schema=False,
+                 result_cache_size=None, result_cache_ttl=None):
+        self.controller = controller
+        self.form_id = form_id
+        self.method = check_method(method)
+        self.render_cache = make_render_cache(render_cache_size)
+        self.validate_fields = validate_fields
+        self.render_fields = render_fields
+        self.export_schema = export_schema
+        self.result_cache = make_result_cache(
+            result_cache_size, result_cache_ttl, self.method)
+        self._actions = [ as_action(action) for action in actions ]
+
+def as_action(action):
+    if isinstance(action, basestring):
+        return FormAction(action, action.capitalize())
+    return action
+
+def add_form(config, controller, actions=(), form_id=None, method=None,
+             render_cache_size=None, context=None, name='', renderer=None,
+             permission=None, containment=None, route_name=None,
+             wrapper=None, validate_fields=False, render_fields=False,
+             export_schema=False, result_cache_size=None,
+             result_cache_ttl=None):
+    """ Add the views of a form whose controller is ``controller`` (an
+    object or a dotted name), as the ``formish:form`` ZCML directive does.
+    ``actions`` are ``FormAction`` objects or action names. """
+    formdef = FormDefinition(config.maybe_dotted(controller), form_id,
+                             actions, method, render_cache_size,
+                             validate_fields, render_fields, export_schema,
+                             result_cache_size, result_cache_ttl)
+    register_form_views(config, formdef,
+                        context=context,
+                        name=name,
+                        renderer=renderer,
+                        permission=permission,
+                        containment=containment,
+                        route_name=route_name,
+                        wrapper=wrapper)
+
+def add_form_group(config, view, forms, context=None, name='',
+                   renderer=None, permission=None, containment=None,
+                   route_name=None, wrapper=None):
+    """ Add a view which displays ``view`` with the ``FormDefinition``
+    objects ``forms`` as ``request.forms``, as the ``formish:forms`` ZCML
+    directive does """
+    forms = list(forms)
+    for formdef in forms:
+        formdef.controller = config.maybe_dotted(formdef.controller)
+    register_forms_view(config, config.maybe_dotted(view), forms,
+                        context=context,
+                        name=name,
+                        renderer=renderer,
+                        permission=permission,
+                        containment=containment,
+                        route_name=route_name,
+                        wrapper=wrapper)
+
+def add_formish_template_path(config, path):
+    """ Add ``path`` to the template search path, as the
+    ``formish:add_template_path`` ZCML directive does.  ``path`` is an
+    absolute path, a ``package:path`` resource spec, or a path relative to
+    the package of the configurator. """
+    if os.path.isabs(path):
+        fullpath = path
+    else:
+        if ':' in path:
+            package_name, path = path.split(':', 1)
+        else:
+            package_name = config.package_name
+        fullpath = resource_filename(package_name, path)
+    config.action(None, add_search_path, (config.registry, fullpath))
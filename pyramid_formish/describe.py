@@ -0,0 +1,95 @@
+""" JSON descriptions of the fields and validators of forms, with which
+browsers can check input before submitting it. """
+import json
+from hashlib import md5
+
+import schemaish
+import validatish
+
+from pyramid_formish.validators import IOBound
+
+# validatish validators described by their type and the attributes with
+# which they were created
+VALIDATOR_TYPES = (
+    (validatish.Required, 'required', ()),
+    (validatish.String, 'string', ()),
+    (validatish.PlainText, 'plaintext', ('extra',)),
+    (validatish.Email, 'email', ()),
+    (validatish.DomainName, 'domain_name', ()),
+    (validatish.URL, 'url', ('with_scheme',)),
+    (validatish.Integer, 'integer', ()),
+    (validatish.Number, 'number', ()),
+    (validatish.Equal, 'equal', ('compared_to',)),
+    (validatish.OneOf, 'one_of', ('set_of_values',)),
+    (validatish.Length, 'length', ('min', 'max')),
+    (validatish.Range, 'range', ('min', 'max')),
+    (validatish.Always, 'always', ()),
+    )
+
+def describe_validator(validator):
+    """ Return a JSON-serializable description of the validatish
+    ``validator``, or None if there is none.  Validators which can only be
+    run on the server (I/O-bound ones, those of other types and those
+    created with values which are not JSON-serializable) are described as
+    ``{"type": "server"}``. """
+    if validator is None:
+        return None
+    if isinstance(validator, IOBound):
+        return {'type':'server'}
+    if isinstance(validator, (validatish.All, validatish.Any)):
+        if isinstance(validator, validatish.All):
+            kind = 'all'
+        else:
+            kind = 'any'
+        children = [ describe_validator(child)
+                     for child in validator.validators ]
+        return {'type':kind,
+                'validators':[ child for child in children if child ]}
+    for cls, kind, names in VALIDATOR_TYPES:
+        if type(validator) is cls:
+            description = {'type':kind}
+            for name in names:
+                value = getattr(validator, name)
+                if isinstance(value, (set, frozenset, tuple)):
+                    value = list(value)
+                description[name] = value
+            try:
+                json.dumps(description)
+            except (TypeError, ValueError):
+                break
+            return description
+    return {'type':'server'}
+
+def describe_attr(key, attr):
+    """ Return a JSON-serializable description of the schemaish attribute
+    ``attr`` of a form, whose dotted key is ``key`` """
+    description = {'name':key,
+                   'type':type(attr).__name__,
+                   'title':attr.title,
+                   'description':attr.description,
+                   'validator':describe_validator(attr.validator)}
+    if isinstance(attr, schemaish.Structure):
+        description['fields'] = describe_fields(attr.attrs, key)
+    elif isinstance(attr, schemaish.Sequence):
+        description['item'] = describe_attr('%s.*' % key, attr.attr)
+    return description
+
+def describe_fields(fields, prefix=None):
+    """ Return a list of descriptions of ``fields``, a sequence of ``(name,
+    schemaish attribute)`` pairs as returned by the ``form_fields`` method
+    of a form controller """
+    result = []
+    for name, attr in fields:
+        if prefix:
+            name = '%s.%s' % (prefix, name)
+        result.append(describe_attr(name, attr))
+    return result
+
+class FormDescription(object):
+    """ The JSON description of a form with the id ``form_id`` and the
+    fields ``fields``, as ``body``, and an entity tag of it as ``etag`` """
+    def __init__(self, fields, form_id=None):
+        self.body = json.dumps({'form_id':form_id,
+                                'fields':describe_fields(fields)},
+                               sort_keys=True, separators=(',', ':'))
+        self.etag = md5(self.body).hexdigest()
@@ -0,0 +1,122 @@
+import bisect
+import threading
+import time
+
+from zope.interface import Attribute
+from zope.interface import Interface
+from zope.interface import implements
+
+from pyramid.threadlocal import get_current_registry
+
+# upper bounds, in seconds, of the buckets of a Histogram: 100us doubling
+# up to about 13 seconds; longer durations go into a last, unbounded bucket
+BUCKET_BOUNDS = tuple([ 0.0001 * 2 ** i for i in range(18) ])
+
+class IFormPhaseEvent(Interface):
+    """ An event notified when a phase of handling a form has finished """
+    phase = Attribute('The phase: "build", "validate", "handle" or "render"')
+    form_id = Attribute('The id (name) of the form')
+    action = Attribute('The name of the action being performed, or None '
+                       'when the form is being displayed')
+    duration = Attribute('The time the phase took, in seconds')
+
+class FormPhaseEvent(object):
+    implements(IFormPhaseEvent)
+    def __init__(self, phase, form_id, action, duration):
+        self.phase = phase
+        self.form_id = form_id
+        self.action = action
+        self.duration = duration
+
+def listening(registry):
+    """ Return True if anything subscribes to form phase events in
+    ``registry`` """
+    if not registry.has_listeners:
+        return False
+    return bool(registry.adapters.subscriptions((IFormPhaseEvent,), None))
+
+def timed(phase, form_id, action, func, *arg, **kw):
+    """ Return ``func(*arg, **kw)``.  If anything subscribes to form phase
+    events in the current registry, notify a ``FormPhaseEvent`` for
+    ``phase`` carrying the time the call took, even if it raised. """
+    registry = get_current_registry()
+    if not listening(registry):
+        return func(*arg, **kw)
+    start = time.time()
+    try:
+        return func(*arg, **kw)
+    finally:
+        duration = time.time() - start
+        registry.notify(FormPhaseEvent(phase, form_id, action, duration))
+
+class Histogram(object):
+    """ Counts durations in exponentially sized buckets (see
+    ``BUCKET_BOUNDS``), and keeps their number, total and maximum """
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def quantile(self, q):
+        """ Return an upper bound of the ``q`` quantile (0 < q <= 1) of the
+        durations counted, or None if none have been """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {'count':self.count,
+                'total':self.total,
+                'max':self.max,
+                'median':self.quantile(0.5),
+                'p99':self.quantile(0.99),
+                'buckets':zip(BUCKET_BOUNDS + (None,), self.counts)}
+
+class FormTimings(object):
+    """ A form phase event subscriber which keeps a ``Histogram`` of the
+    durations of each phase of each form, keyed on ``(phase, form_id)`` """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def __call__(self, event):
+        key = (event.phase, event.form_id)
+        self.lock.acquire()
+        try:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(event.duration)
+        finally:
+            self.lock.release()
+
+    def snapshot(self):
+        """ Return a dictionary mapping ``(phase, form_id)`` to a dictionary
+        describing the histogram of its durations """
+        self.lock.acquire()
+        try:
+            return dict([ (key, histogram.as_dict()) for key, histogram
+                          in self.histograms.items() ])
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        self.lock.acquire()
+        try:
+            self.histograms = {}
+        finally:
+            self.lock.release()
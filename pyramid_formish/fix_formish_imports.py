@@ -1,6 +1,13 @@
+import json
+import optparse
 import os
 import re
+import shutil
 import sys
+import tempfile
+import time
+from hashlib import sha1
+from multiprocessing import Pool
 
 from lib2to3.refactor import get_fixers_from_package
 from lib2to3.refactor import RefactoringTool
@@ -126,34 +133,252 @@ NS = re.compile(BFG_NS_RE, re.MULTILINE)
 def replace(match):
     return 'pyramid_formish'
 
-def fix_zcml(path):
+# every ZCML file which NS or ATTR match contains this
+ZCML_NEEDLE = 'repoze'
+
+def zcml_files(path):
+    """ Return the names of the ZCML files under ``path``, skipping
+    directories whose names start with a dot """
+    result = []
     for root, dirs, files in os.walk(path):
+        dirs[:] = [ dir for dir in dirs if not dir.startswith('.') ]
         for file in files:
             if file.endswith('.zcml'):
-                absfile = os.path.join(root, file)
-                text = open(absfile, 'rb').read()
-                newt = NS.sub('xmlns:formish="http://pylonshq.com/pyramid_formish"',
-                              text)
-                newt = ATTR.sub(replace, newt)
-                if text != newt:
-                    newf = open(absfile, 'wb')
-                    newf.write(newt)
-                    newf.flush()
-                    newf.close()
-                
-        for dir in dirs:
-            if dir.startswith('.'):
-                dirs.remove(dir)
+                result.append(os.path.join(root, file))
+    result.sort()
+    return result
+
+def fix_zcml_file(filename):
+    """ Convert the ZCML file ``filename``; return its name if it changed,
+    else None """
+    f = open(filename, 'rb')
+    try:
+        text = f.read()
+    finally:
+        f.close()
+    # most files need no conversion; don't run the expressions over them
+    if ZCML_NEEDLE not in text:
+        return None
+    newt = NS.sub('xmlns:formish="http://pylonshq.com/pyramid_formish"',
+                  text)
+    newt = ATTR.sub(replace, newt)
+    if text == newt:
+        return None
+    write_atomically(filename, newt, filename)
+    return filename
+
+def fix_zcml(path, workers=1):
+    """ Convert the ZCML files under ``path`` using ``workers`` processes;
+    return the names of those changed """
+    changed = parallel_map(fix_zcml_file, zcml_files(path), workers)
+    return sorted([ filename for filename in changed if filename ])
+
+def parallel_map(func, items, workers, initializer=None):
+    """ Return ``map(func, items)``, in any order, calling ``func`` in
+    ``workers`` processes if there are more than one """
+    if workers > 1 and len(items) > 1:
+        pool = Pool(workers, initializer)
+        try:
+            return list(pool.imap_unordered(func, items, chunksize=8))
+        finally:
+            pool.terminate()
+    return map(func, items)
+
+def write_atomically(filename, data, like=None):
+    """ Replace the file ``filename`` with one containing ``data``, with the
+    permissions of the file ``like`` if given """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(data)
+        finally:
+            f.close()
+        if like is not None:
+            shutil.copymode(like, tmp)
+        os.rename(tmp, filename)
+    except:
+        os.remove(tmp)
+        raise
+
+MANIFEST_FORMAT = 1
+
+# the RefactoringTool of a process converting files
+_tool = None
+
+class ConversionTool(RefactoringTool):
+    """ Collects errors instead of raising them """
+    def log_error(self, msg, *args, **kw):
+        self.errors.append(msg % args)
+
+def fixer_version():
+    """ A digest of the conversions made, stored in manifests so that they
+    are ignored when the conversions change """
+    return sha1(repr(sorted(MAPPING.items()))).hexdigest()
+
+def python_files(path):
+    """ Return the names of the Python files under ``path`` (or ``path``
+    itself if it is a file), skipping those whose names start with a dot,
+    like ``RefactoringTool.refactor`` """
+    if not os.path.isdir(path):
+        return [path]
+    result = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [ dir for dir in dirs if not dir.startswith('.') ]
+        for file in files:
+            if file.endswith('.py') and not file.startswith('.'):
+                result.append(os.path.join(root, file))
+    result.sort()
+    return result
+
+def digest(filename):
+    f = open(filename, 'rb')
+    try:
+        return sha1(f.read()).hexdigest()
+    finally:
+        f.close()
+
+def _init_worker():
+    global _tool
+    _tool = ConversionTool(get_fixers_from_package('pyramid_formish'))
+
+def convert_file(filename):
+    """ Convert the imports of the Python file ``filename`` in place;
+    return ``(filename, digest before, digest after, seconds, errors)`` """
+    if _tool is None:
+        _init_worker()
+    start = time.time()
+    f = open(filename, 'rb')
+    try:
+        text = f.read()
+    finally:
+        f.close()
+    before = after = sha1(text).hexdigest()
+    errors = []
+    # every import the fixer converts names the formish module
+    if 'formish' in text:
+        _tool.errors = errors
+        try:
+            _tool.refactor_file(filename, write=True)
+        except Exception, e:
+            errors.append('%s: %s' % (filename, e))
+        after = digest(filename)
+    return filename, before, after, time.time() - start, errors
+
+def read_manifest(filename):
+    """ Return the mapping of file names to digests stored in the manifest
+    ``filename``, or an empty mapping if it is missing or was written for
+    other conversions """
+    try:
+        f = open(filename, 'rb')
+    except IOError:
+        return {}
+    try:
+        try:
+            manifest = json.load(f)
+        except ValueError:
+            return {}
+    finally:
+        f.close()
+    if (manifest.get('format') != MANIFEST_FORMAT or
+        manifest.get('fixer') != fixer_version()):
+        return {}
+    return manifest['files']
+
+def write_manifest(filename, files):
+    manifest = {'format':MANIFEST_FORMAT,
+                'fixer':fixer_version(),
+                'files':files}
+    write_atomically(filename, json.dumps(manifest, indent=2, sort_keys=True))
+
+def convert(path, workers=1, manifest=None):
+    """ Convert the Python files and ZCML files under ``path`` using
+    ``workers`` processes.  If ``manifest`` names a file, Python files whose
+    contents have not changed since they were recorded there are skipped,
+    and the digests of all files are recorded there afterwards.  Return a
+    summary of the conversion. """
+    start = time.time()
+    recorded = {}
+    if manifest is not None:
+        recorded = read_manifest(manifest)
+    digests = {}
+    pending = []
+    filenames = python_files(path)
+    for filename in filenames:
+        key = os.path.abspath(filename)
+        known = recorded.get(key)
+        if known is not None and digest(filename) == known:
+            digests[key] = known
+        else:
+            pending.append(filename)
+
+    results = parallel_map(convert_file, pending, workers, _init_worker)
+    python_time = time.time() - start
+
+    changed = []
+    errors = []
+    for filename, before, after, seconds, file_errors in results:
+        if file_errors:
+            errors.extend(file_errors)
+        else:
+            digests[os.path.abspath(filename)] = after
+        if before != after:
+            changed.append(filename)
+    changed.sort()
+
+    zcml_start = time.time()
+    changed_zcml = fix_zcml(path, workers)
+    zcml_time = time.time() - zcml_start
+
+    if manifest is not None:
+        write_manifest(manifest, digests)
+
+    return {'changed':changed + changed_zcml,
+            'errors':errors,
+            'python_files':len(filenames),
+            'converted':len(pending),
+            'skipped':len(filenames) - len(pending),
+            'workers':workers,
+            'seconds':{'python':python_time,
+                       'zcml':zcml_time,
+                       'total':time.time() - start}}
 
 def main(argv=None):
     if argv is None:
         argv = sys.argv
-    path = argv[1]
-    fixer_names = get_fixers_from_package('pyramid_formish')
-    tool = RefactoringTool(fixer_names)
-    tool.refactor([path], write=True)
-    fix_zcml(path)
+    parser = optparse.OptionParser(
+        usage='%prog [options] path',
+        description='Convert the repoze.bfg.formish imports and ZCML of the '
+                    'application at path to pyramid_formish in place, and '
+                    'print a summary of the conversion as JSON.')
+    parser.add_option('-j', '--workers', type='int', default=1,
+                      help='number of processes converting files '
+                           '(default %default)')
+    parser.add_option('-m', '--manifest', default=None,
+                      help='skip the Python files whose contents are those '
+                           'recorded in this file by a previous run, and '
+                           'record the contents of all files in it')
+    parser.add_option('-o', '--output', default=None,
+                      help='write the summary to this file instead of '
+                           'standard output')
+    options, args = parser.parse_args(argv[1:])
+    if len(args) != 1:
+        parser.error('a path is required')
+    summary = convert(args[0], options.workers, options.manifest)
+    if options.output:
+        out = open(options.output, 'w')
+    else:
+        out = sys.stdout
+    try:
+        json.dump(summary, out, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+        out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if summary['errors']:
+        return 1
 
 if __name__ == '__main__':
-    main()
-    
+    sys.exit(main())
@@ -0,0 +1,263 @@
+""" Cached registration plans of ZCML files which only declare forms.
+
+Loading such a file through ``config.load_formish_zcml`` records what its
+``formish:form``, ``formish:forms`` and ``formish:add_template_path``
+directives register, by dotted name, and writes that plan to a cache file
+along with the SHA-1 hash of each ZCML file read.  Later loads replay the
+plan through the ``config.add_form`` family of directives, without parsing
+ZCML, as long as none of the files has changed. """
+import json
+import os
+import tempfile
+from hashlib import sha1
+from xml.etree import cElementTree
+
+import pyramid_zcml
+from pyramid.util import DottedNameResolver
+
+from pyramid_formish.config import FormDefinition
+from pyramid_formish.config import add_form
+from pyramid_formish.config import add_form_group
+from pyramid_formish.config import add_formish_template_path
+from pyramid_formish.zcml import FormAction
+
+PLAN_FORMAT = 5
+
+FORMISH_NAMESPACE = 'http://pylonshq.com/pyramid_formish'
+ZOPE_NAMESPACE = 'http://namespaces.zope.org/zope'
+META_NAMESPACE = 'http://namespaces.zope.org/meta'
+ZCML_NAMESPACE = 'http://namespaces.zope.org/zcml'
+
+_resolver = DottedNameResolver(None)
+
+class Uncacheable(Exception):
+    """ Raised when the registrations of a ZCML file can't be replayed from
+    a plan """
+
+class PlanRecorder(object):
+    """ Records the registrations of the formish directives of a ZCML file
+    as they are parsed; set as ``registry.formish_plan_recorder`` """
+    def __init__(self):
+        self.plan = []
+        self.files = None
+        self.error = None
+
+    def _record(self, context, entry):
+        if self.files is None:
+            # the set of files read by the configuration machine, which
+            # grows as the rest of the ZCML is parsed
+            self.files = context._seen_files
+        if self.error is not None:
+            return
+        try:
+            entry = entry()
+        except Uncacheable, e:
+            self.error = e
+            return
+        entry['package'] = context.package and context.package.__name__
+        self.plan.append(entry)
+
+    def form(self, directive):
+        def entry():
+            return {'directive':'form',
+                    'controller':dotted_name(directive.controller),
+                    'actions':[ action_args(a) for a in directive._actions ],
+                    'form_id':directive.form_id,
+                    'method':directive.method,
+                    'render_cache_size':directive.render_cache_size,
+                    'validate_fields':directive.validate_fields,
+                    'render_fields':directive.render_fields,
+                    'export_schema':directive.export_schema,
+                    'result_cache_size':directive.result_cache_size,
+                    'result_cache_ttl':directive.result_cache_ttl,
+                    'view_args':view_args(directive)}
+        self._record(directive.context, entry)
+
+    def forms(self, directive):
+        def entry():
+            forms = [ {'controller':dotted_name(formdef.controller),
+                       'form_id':formdef.form_id,
+                       'actions':[ action_args(a) for a in formdef._actions ],
+                       'render_cache_size':formdef.render_cache_size}
+                      for formdef in directive.forms ]
+            return {'directive':'forms',
+                    'view':dotted_name(directive.view),
+                    'forms':forms,
+                    'view_args':view_args(directive)}
+        self._record(directive.context, entry)
+
+    def template_path(self, context, fullpath):
+        self._record(context, lambda: {'directive':'add_template_path',
+                                       'path':fullpath})
+
+def dotted_name(obj):
+    """ Return the dotted name of the global object ``obj`` (or None) """
+    if obj is None:
+        return None
+    name = '%s.%s' % (getattr(obj, '__module__', None),
+                      getattr(obj, '__name__', None))
+    try:
+        resolved = _resolver.resolve(name)
+    except ImportError:
+        resolved = None
+    if resolved is not obj:
+        raise Uncacheable('%r has no dotted name' % (obj,))
+    return name
+
+def action_args(action):
+    return [action.name, action.title, action.validate,
+            dotted_name(action.success)]
+
+def view_args(directive):
+    return {'context':dotted_name(directive.for_),
+            'name':directive.name,
+            'renderer':directive.renderer,
+            'permission':directive.permission,
+            'containment':dotted_name(directive.containment),
+            'route_name':directive.route_name,
+            'wrapper':directive.wrapper}
+
+def check_formish_only(filename):
+    """ Raise ``Uncacheable`` unless the ZCML file ``filename`` contains
+    only formish directives, meta directives and plain includes """
+    for event, element in cElementTree.iterparse(filename):
+        if not element.tag.startswith('{'):
+            raise Uncacheable('%s: %s directive' % (filename, element.tag))
+        namespace, tag = element.tag[1:].split('}', 1)
+        if ('{%s}condition' % ZCML_NAMESPACE) in element.attrib:
+            raise Uncacheable('%s: conditional directive' % filename)
+        if namespace in (FORMISH_NAMESPACE, META_NAMESPACE):
+            continue
+        if namespace == ZOPE_NAMESPACE:
+            if tag == 'configure':
+                continue
+            if tag == 'include' and 'files' not in element.attrib:
+                continue
+        raise Uncacheable('%s: %s directive' % (filename, element.tag))
+
+def file_hashes(filenames):
+    result = []
+    for filename in sorted(filenames):
+        f = open(filename, 'rb')
+        try:
+            result.append([filename, sha1(f.read()).hexdigest()])
+        finally:
+            f.close()
+    return result
+
+def read_plan(cache_file, key):
+    """ Return the plan cached in ``cache_file`` for ``key`` if none of the
+    ZCML files it was recorded from have changed, else None """
+    try:
+        f = open(cache_file, 'rb')
+    except IOError:
+        return None
+    try:
+        try:
+            cached = json.load(f)
+        except ValueError:
+            return None
+    finally:
+        f.close()
+    if cached.get('format') != PLAN_FORMAT or cached.get('key') != key:
+        return None
+    files = cached['files']
+    try:
+        if file_hashes([ filename for filename, digest in files ]) != files:
+            return None
+    except IOError:
+        return None
+    return cached['plan']
+
+def write_plan(cache_file, key, files, plan):
+    """ Atomically replace ``cache_file`` with ``plan`` """
+    cached = {'format':PLAN_FORMAT,
+              'key':key,
+              'files':file_hashes(files),
+              'plan':plan}
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            json.dump(cached, f)
+        finally:
+            f.close()
+        os.rename(tmp, cache_file)
+    except:
+        os.remove(tmp)
+        raise
+
+def replay(config, plan):
+    """ Register the forms of ``plan`` through the ``config.add_form``
+    family of directives """
+    def actions(args):
+        return [ FormAction(name, title, validate,
+                            config.maybe_dotted(success))
+                 for name, title, validate, success in args ]
+    def view_kw(args):
+        # keyword argument names must not be unicode under Python 2.6
+        return dict([ (str(key), value) for key, value in args.items() ])
+    configs = {}
+    for entry in plan:
+        package_config = config
+        package = entry['package']
+        if package:
+            package_config = configs.get(package)
+            if package_config is None:
+                package_config = configs[package] = config.with_package(
+                    package)
+        directive = entry['directive']
+        if directive == 'add_template_path':
+            add_formish_template_path(package_config, entry['path'])
+        elif directive == 'form':
+            add_form(package_config, entry['controller'],
+                     actions(entry['actions']),
+                     form_id=entry['form_id'],
+                     method=entry['method'],
+                     render_cache_size=entry['render_cache_size'],
+                     validate_fields=entry['validate_fields'],
+                     render_fields=entry['render_fields'],
+                     export_schema=entry['export_schema'],
+                     result_cache_size=entry['result_cache_size'],
+                     result_cache_ttl=entry['result_cache_ttl'],
+                     **view_kw(entry['view_args']))
+        else:
+            forms = [ FormDefinition(
+                          form['controller'], form['form_id'],
+                          actions(form['actions']),
+                          render_cache_size=form['render_cache_size'])
+                      for form in entry['forms'] ]
+            add_form_group(package_config, entry['view'], forms,
+                           **view_kw(entry['view_args']))
+
+def load_formish_zcml(config, spec='configure.zcml', cache_file=None):
+    """ Load the ZCML file ``spec`` like ``config.load_zcml``.  If it only
+    declares forms, cache its registration plan in ``cache_file`` (by
+    default the ``formish.zcml_plan_cache`` setting) and replay the plan
+    instead of parsing the ZCML while the files are unchanged. """
+    if cache_file is None:
+        settings = config.registry.settings or {}
+        cache_file = settings.get('formish.zcml_plan_cache')
+    if cache_file is None:
+        return pyramid_zcml.load_zcml(config, spec)
+    key = '%s:%s' % (config.package_name, spec)
+    plan = read_plan(cache_file, key)
+    if plan is not None:
+        replay(config, plan)
+        return config.registry
+
+    recorder = PlanRecorder()
+    config.registry.formish_plan_recorder = recorder
+    try:
+        result = pyramid_zcml.load_zcml(config, spec)
+    finally:
+        del config.registry.formish_plan_recorder
+    if recorder.files and recorder.error is None:
+        try:
+            for filename in recorder.files:
+                check_formish_only(filename)
+        except Uncacheable:
+            return result
+        write_plan(cache_file, key, recorder.files, recorder.plan)
+    return result
@@ -0,0 +1,32 @@
+import os
+import sys
+
+from chameleon.core import config
+from pkg_resources import resource_filename
+
+from pyramid_formish import TemplateLoader
+
+def search_path(specs):
+    directories = []
+    for spec in specs:
+        if not os.path.isabs(spec) and ':' in spec:
+            package_name, path = spec.split(':', 1)
+            spec = resource_filename(package_name, path)
+        directories.append(spec)
+    directories.append(resource_filename('pyramid_formish', 'templates/zpt'))
+    return directories
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    # compiled templates are only reused across processes when they are
+    # written to Chameleon's disk cache (``CHAMELEON_CACHE=true``)
+    config.DISK_CACHE = True
+    loader = TemplateLoader(search_path(argv[1:]))
+    compiled, failed = loader.warm()
+    for filename, e in failed:
+        print >> sys.stderr, 'Could not compile %s: %s' % (filename, e)
+    print 'Compiled %s templates' % len(compiled)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,116 @@
 import unittest
 from pyramid import testing
 
+class TestLRUCache(unittest.TestCase):
+    def _makeOne(self, maxsize=10):
+        from pyramid_formish import LRUCache
+        return LRUCache(maxsize)
+
+    def test_get_miss(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('a', 1), 1)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 0)
+
+    def test_put_get(self):
+        cache = self._makeOne()
+        cache.put('a', 1)
+        cache.put('a', 2)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = self._makeOne(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_unbounded(self):
+        cache = self._makeOne(None)
+        for i in range(100):
+            cache.put(i, i)
+        self.assertEqual(len(cache), 100)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_invalidate(self):
+        cache = self._makeOne()
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.invalidate('a')
+        cache.invalidate('notthere')
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), 2)
+
+    def test_clear(self):
+        cache = self._makeOne()
+        cache.put('a', 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('b'), 2)
+
+    def test_load(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.load('a', lambda: 1), 1)
+        self.assertEqual(cache.load('a', lambda: 2), 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_load_invalid(self):
+        cache = self._makeOne()
+        cache.load('a', lambda: 1)
+        self.assertEqual(cache.load('a', lambda: 2, lambda value: value > 1),
+                         2)
+        self.assertEqual(cache.load('a', lambda: 3, lambda value: value > 1),
+                         2)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 1)
+
+    def test_load_raises(self):
+        cache = self._makeOne()
+        def factory():
+            raise ValueError
+        self.assertRaises(ValueError, cache.load, 'a', factory)
+        self.assertEqual(cache.load('a', lambda: 1), 1)
+        self.assertEqual(cache.loading, {})
+
+    def test_load_single_flight(self):
+        import threading
+        import time
+        cache = self._makeOne()
+        calls = []
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+        results = []
+        def worker():
+            results.append(cache.load('a', factory))
+        threads = [ threading.Thread(target=worker) for x in range(5) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['value'] * 5)
+
 class TestTemplateLoader(unittest.TestCase):
+    def setUp(self):
+        self.dirs = []
+
+    def tearDown(self):
+        import shutil
+        for path in self.dirs:
+            shutil.rmtree(path)
+
     def _makeOne(self, **kw):
         from pyramid_formish import TemplateLoader
         return TemplateLoader(**kw)
@@ -14,6 +123,16 @@ class TestTemplateLoader(unittest.TestCase):
         loader = self._makeOne(search_path='path')
         self.assertEqual(loader.search_path, ['path'])
 
+    def test_cache_size(self):
+        import os
+        fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
+        loader = self._makeOne(search_path=[fixtures], cache_size=5)
+        self.assertEqual(loader.registry.maxsize, 5)
+        loader.load('test.html')
+        loader.load('test.html')
+        self.assertEqual(loader.registry.misses, 1)
+        self.assertEqual(loader.registry.hits, 1)
+
     def test_load_exists(self):
         import os
         fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
@@ -28,31 +147,139 @@ class TestTemplateLoader(unittest.TestCase):
         loader = self._makeOne(search_path=[fixtures])
         self.assertRaises(mako.exceptions.TopLevelLookupException,
                           loader.load, 'doesnt.html')
-        self.failUnless(
-            os.path.join(fixtures, 'doesnt.html') in loader.notexists)
 
-    def test_load_negative_cache(self):
+    def test_load_notexists_in_first_path(self):
         import os
         fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
-        path = os.path.join(fixtures, 'test.html')
-        loader = self._makeOne(search_path=[fixtures], auto_reload=True)
-        loader.notexists[path] = True
+        loader = self._makeOne(search_path=['/nonexistent', fixtures])
         result = loader.load('test.html')
-        self.failUnless(result)
+        self.assertEqual(result.filename, os.path.join(fixtures, 'test.html'))
 
-    def test_load_negative_cache2(self):
+    def test_index(self):
         import os
-        import mako
         fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
-        path = os.path.join(fixtures, 'test.html')
-        loader = self._makeOne(search_path=[fixtures], auto_reload=False)
-        loader.notexists[path] = True
+        templates = os.path.join(os.path.dirname(fixtures), '..', 'templates',
+                                 'zpt')
+        loader = self._makeOne(search_path=[fixtures, templates])
+        self.assertEqual(loader.index['test.html'],
+                         os.path.join(fixtures, 'test.html'))
+        self.assertEqual(loader.index['formish/test/test.html'],
+                         os.path.join(templates, 'formish', 'test',
+                                      'test.html'))
+
+    def test_index_first_path_wins(self):
+        first = self._makeDir({'test.html':'<div>first</div>'})
+        second = self._makeDir({'test.html':'<div>second</div>'})
+        loader = self._makeOne(search_path=[first, second])
+        self.assertEqual(loader.load('test.html')(), '<div>first</div>')
+
+    def test_index_symlinked_directory(self):
+        import os
+        target = self._makeDir({'linked.html':'<div>linked</div>'})
+        path = self._makeDir({})
+        os.symlink(target, os.path.join(path, 'sub'))
+        # a link back to a directory already seen is not followed again
+        os.symlink(path, os.path.join(target, 'loop'))
+        loader = self._makeOne(search_path=[path])
+        self.assertEqual(loader.load('sub/linked.html')(),
+                         '<div>linked</div>')
+        self.failIf([ name for name in loader.index
+                      if name.startswith('sub/loop') ])
+
+    def test_load_no_reload_ignores_new_files(self):
+        import mako
+        path = self._makeDir({})
+        loader = self._makeOne(search_path=[path], auto_reload=False)
+        self._write(path, 'new.html', '<div>new</div>')
         self.assertRaises(mako.exceptions.TopLevelLookupException,
-                          loader.load, 'test.html')
+                          loader.load, 'new.html')
+
+    def test_load_reload_rebuilds_index(self):
+        import os
+        import mako
+        path = self._makeDir({})
+        loader = self._makeOne(search_path=[path], auto_reload=True,
+                               reload_interval=0)
+        self.assertRaises(mako.exceptions.TopLevelLookupException,
+                          loader.load, 'new.html')
+        self._write(path, 'new.html', '<div>new</div>')
+        # directory mtimes may have a one second granularity
+        os.utime(path, (0, 0))
+        self.assertEqual(loader.load('new.html')(), '<div>new</div>')
+
+    def test_load_reload_throttled(self):
+        import os
+        import mako
+        path = self._makeDir({})
+        loader = self._makeOne(search_path=[path], auto_reload=True,
+                               reload_interval=3600)
+        self.assertRaises(mako.exceptions.TopLevelLookupException,
+                          loader.load, 'new.html')
+        self._write(path, 'new.html', '<div>new</div>')
+        os.utime(path, (0, 0))
+        self.assertRaises(mako.exceptions.TopLevelLookupException,
+                          loader.load, 'new.html')
+        loader.next_check = 0
+        self.assertEqual(loader.load('new.html')(), '<div>new</div>')
+
+    def test_load_reload_changed_template(self):
+        import os
+        path = self._makeDir({'test.html':'<div>old</div>'})
+        loader = self._makeOne(search_path=[path], auto_reload=True,
+                               reload_interval=0)
+        self.assertEqual(loader.load('test.html')(), '<div>old</div>')
+        self._write(path, 'test.html', '<div>new</div>')
+        os.utime(os.path.join(path, 'test.html'), (0, 0))
+        self.assertEqual(loader.load('test.html')(), '<div>new</div>')
+
+    def test_load_no_reload_no_stat(self):
+        import os
+        path = self._makeDir({'test.html':'<div>old</div>'})
+        loader = self._makeOne(search_path=[path], auto_reload=False)
+        template = loader.load('test.html')
+        self.assertEqual(template.auto_reload, False)
+        os.utime(os.path.join(path, 'test.html'), (0, 0))
+        self.failUnless(loader.load('test.html') is template)
+
+    def test_warm(self):
+        import os
+        fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
+        loader = self._makeOne(search_path=[fixtures])
+        compiled, failed = loader.warm()
+        self.assertEqual(compiled, ['test.html'])
+        self.assertEqual(failed, [])
+        template = loader.load('test.html')
+        self.failUnless((None, True, template.signature) in template.registry)
+
+    def test_warm_uncompilable(self):
+        path = self._makeDir({'good.html':'<div>good</div>',
+                              'bad.html':'<%page args="field" />',
+                              'other.txt':'<div>'})
+        loader = self._makeOne(search_path=[path])
+        compiled, failed = loader.warm()
+        self.assertEqual(compiled, ['good.html'])
+        self.assertEqual([x[0] for x in failed], ['bad.html'])
+
+    def _makeDir(self, files):
+        import tempfile
+        path = tempfile.mkdtemp()
+        self.dirs.append(path)
+        for name, text in files.items():
+            self._write(path, name, text)
+        return path
+
+    def _write(self, path, name, text):
+        import os
+        f = open(os.path.join(path, name), 'w')
+        f.write(text)
+        f.close()
 
 class TestZPTRenderer(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
     def tearDown(self):
-        testing.cleanUp()
+        testing.tearDown()
 
     def _getTargetClass(self):
         from pyramid_formish import ZPTRenderer
@@ -69,6 +296,27 @@ class TestZPTRenderer(unittest.TestCase):
         renderer = self._makeOne(directories='tests')
         self.assertEqual(renderer.directories, ['tests'])
 
+    def test_ctor_cache_size_setting(self):
+        from pyramid_formish import DEFAULT_CACHE_SIZE
+        renderer = self._makeOne()
+        self.assertEqual(renderer.loader.registry.maxsize, DEFAULT_CACHE_SIZE)
+        testing.setUp(
+            settings={'formish.template_cache_size':'10',
+                      'reload_templates':False})
+        renderer = self._makeOne()
+        self.assertEqual(renderer.loader.registry.maxsize, 10)
+
+    def test_ctor_reload_interval_setting(self):
+        from pyramid_formish import DEFAULT_RELOAD_INTERVAL
+        renderer = self._makeOne()
+        self.assertEqual(renderer.loader.reload_interval,
+                         DEFAULT_RELOAD_INTERVAL)
+        testing.setUp(settings={'formish.reload_interval':'2.5',
+                                'reload_templates':True})
+        renderer = self._makeOne()
+        self.assertEqual(renderer.loader.reload_interval, 2.5)
+        self.assertEqual(renderer.loader.auto_reload, True)
+
     def test_call_defaultdir(self):
         renderer = self._makeOne()
         result = renderer('formish/test/test.html', {})
@@ -89,16 +337,259 @@ class TestZPTRenderer(unittest.TestCase):
         
     def test_call_with_utility_registrations(self):
         from pkg_resources import resource_filename
-        from zope.component import getSiteManager
         from pyramid_formish import IFormishSearchPath
-        sm = getSiteManager()
-        sm.registerUtility([resource_filename('pyramid_formish.tests',
-                                              'fixtures')],
-                           IFormishSearchPath)
-        renderer = self._makeOne(
-            [])
+        search_path = [resource_filename('pyramid_formish.tests', 'fixtures')]
+        self.config.registry.registerUtility(search_path, IFormishSearchPath)
+        directories = []
+        renderer = self._makeOne(directories)
         result = renderer('test.html', {})
         self.assertEqual(result, u'<div>Fixtures</div>')
+        self.assertEqual(directories, [])
+        self.assertEqual(len(search_path), 1)
+
+    def test_ctor_registry(self):
+        from pyramid.registry import Registry
+        registry = Registry('other')
+        registry.settings = {'formish.template_cache_size':'5'}
+        renderer = self._makeOne(registry=registry)
+        self.assertEqual(renderer.loader.registry.maxsize, 5)
+
+class TestGetDefaultRenderer(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, registry=None):
+        from pyramid_formish import get_default_renderer
+        return get_default_renderer(registry)
+
+    def test_default(self):
+        from pyramid_formish import ZPTRenderer
+        renderer = self._callFUT()
+        self.assertEqual(renderer.__class__, ZPTRenderer)
+        self.failUnless(self._callFUT() is renderer)
+        self.failUnless(self.config.registry.formish_renderer is renderer)
+
+    def test_utility(self):
+        from pyramid_formish import IFormishRenderer
+        renderer = DummyRenderer()
+        self.config.registry.registerUtility(renderer, IFormishRenderer)
+        self.failUnless(self._callFUT() is renderer)
+
+    def test_per_registry(self):
+        from pyramid.registry import Registry
+        from pyramid_formish import IFormishSearchPath
+        from pkg_resources import resource_filename
+        other = Registry('other')
+        other.registerUtility(
+            [resource_filename('pyramid_formish.tests', 'fixtures')],
+            IFormishSearchPath)
+        renderer = self._callFUT()
+        other_renderer = self._callFUT(other)
+        self.failIf(renderer is other_renderer)
+        self.assertEqual(other_renderer('test.html', {}),
+                         u'<div>Fixtures</div>')
+        from mako.exceptions import TopLevelLookupException
+        self.assertRaises(TopLevelLookupException, renderer, 'test.html', {})
+
+    def test_reset(self):
+        from pyramid_formish import reset_default_renderer
+        renderer = self._callFUT()
+        reset_default_renderer(self.config.registry)
+        reset_default_renderer(self.config.registry)
+        self.failIf(self._callFUT() is renderer)
+
+class TestRenderCache(unittest.TestCase):
+    def _makeOne(self, maxsize=10):
+        from pyramid_formish import RenderCache
+        return RenderCache(maxsize)
+
+    def test_admits_on_second_put(self):
+        cache = self._makeOne()
+        cache.put('a', 'html')
+        self.assertEqual(cache.get('a'), None)
+        cache.put('a', 'html')
+        self.assertEqual(cache.get('a'), 'html')
+
+    def test_bounded(self):
+        cache = self._makeOne(1)
+        for key in ('a', 'a', 'b', 'b'):
+            cache.put(key, key)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), 'b')
+
+    def test_clear(self):
+        cache = self._makeOne()
+        cache.put('a', 'html')
+        cache.put('a', 'html')
+        cache.clear()
+        self.assertEqual(cache.get('a'), None)
+        cache.put('a', 'html')
+        self.assertEqual(cache.get('a'), None)
+
+class TestResultCache(unittest.TestCase):
+    def _makeOne(self, maxsize=10, ttl=60):
+        from pyramid_formish import ResultCache
+        return ResultCache(maxsize, ttl)
+
+    def test_load(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.load('a', lambda: 'one'), 'one')
+        self.assertEqual(cache.load('a', lambda: 'two'), 'one')
+
+    def test_load_expired(self):
+        cache = self._makeOne(ttl=-1)
+        self.assertEqual(cache.load('a', lambda: 'one'), 'one')
+        self.assertEqual(cache.load('a', lambda: 'two'), 'two')
+        self.assertEqual((cache.results.hits, cache.results.misses), (0, 2))
+
+    def test_load_counted_once(self):
+        cache = self._makeOne()
+        cache.load('a', lambda: 'one')
+        cache.load('a', lambda: 'two')
+        self.assertEqual((cache.results.hits, cache.results.misses), (1, 1))
+
+    def test_load_copies_responses(self):
+        from pyramid.response import Response
+        cache = self._makeOne()
+        first = cache.load('a', lambda: Response('body'))
+        first.body = 'changed'
+        second = cache.load('a', lambda: None)
+        self.assertEqual(second.body, 'body')
+        self.failIf(first is second)
+
+    def test_bounded(self):
+        cache = self._makeOne(1)
+        cache.load('a', lambda: 'a')
+        cache.load('b', lambda: 'b')
+        self.assertEqual(cache.load('a', lambda: 'again'), 'again')
+
+    def test_clear(self):
+        cache = self._makeOne()
+        cache.load('a', lambda: 'one')
+        cache.clear()
+        self.assertEqual(cache.load('a', lambda: 'two'), 'two')
+
+class TestInvalidateResults(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, form_id=None, registry=None):
+        from pyramid_formish import invalidate_results
+        return invalidate_results(form_id, registry)
+
+    def _addCache(self, form_id):
+        from pyramid_formish import ResultCache
+        from pyramid_formish import get_result_caches
+        cache = ResultCache()
+        cache.load('key', lambda: 'result')
+        caches = get_result_caches(self.config.registry)
+        caches.setdefault(form_id, []).append(cache)
+        return cache
+
+    def test_form_id(self):
+        one = self._addCache('one')
+        two = self._addCache('two')
+        self._callFUT('one', self.config.registry)
+        self.assertEqual(len(one.results), 0)
+        self.assertEqual(len(two.results), 1)
+
+    def test_all(self):
+        one = self._addCache('one')
+        two = self._addCache('two')
+        self._callFUT()
+        self.assertEqual(len(one.results), 0)
+        self.assertEqual(len(two.results), 0)
+
+    def test_unknown_form_id(self):
+        self._callFUT('unknown')
+
+class TestCanonical(unittest.TestCase):
+    def _callFUT(self, value):
+        from pyramid_formish import canonical
+        return canonical(value)
+
+    def test_dict_order_independent(self):
+        one = {}
+        two = {}
+        for i in range(20):
+            one[str(i)] = [i, {'a':i}]
+        for i in reversed(range(20)):
+            two[str(i)] = [i, {'a':i}]
+        self.assertEqual(repr(self._callFUT(one)), repr(self._callFUT(two)))
+
+    def test_list_and_tuple_differ(self):
+        self.failIfEqual(self._callFUT([1]), self._callFUT((1,)))
+
+class TestWarmTemplates(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, event):
+        from pyramid_formish import warm_templates
+        return warm_templates(event)
+
+    def test_warms_default_renderer(self):
+        from pyramid_formish import get_default_renderer
+        self._callFUT(None)
+        template = get_default_renderer().loader.load('formish/test/test.html')
+        self.failUnless((None, True, template.signature) in template.registry)
+
+    def test_renderer_without_loader(self):
+        from pyramid_formish import IFormishRenderer
+        self.config.registry.registerUtility(lambda *arg: '', IFormishRenderer)
+        self._callFUT(None)
+
+class TestIncludeme(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_resolves_default_renderer(self):
+        from pyramid_formish import includeme
+        includeme(self.config)
+        self.failUnless(hasattr(self.config.registry, 'formish_renderer'))
+
+    def test_timings_setting(self):
+        from pyramid_formish import includeme
+        from pyramid_formish.events import FormPhaseEvent
+        self.config.registry.settings['formish.timings'] = 'true'
+        includeme(self.config)
+        self.config.registry.notify(FormPhaseEvent('build', 'form', None, 1))
+        snapshot = self.config.registry.formish_timings.snapshot()
+        self.assertEqual(snapshot[('build', 'form')]['count'], 1)
+
+    def test_timings_off_by_default(self):
+        from pyramid_formish import includeme
+        includeme(self.config)
+        self.failIf(hasattr(self.config.registry, 'formish_timings'))
+
+    def test_subscribes_warm_templates(self):
+        from pyramid.events import ApplicationCreated
+        from pyramid_formish import includeme
+        from pyramid_formish import get_default_renderer
+        includeme(self.config)
+        self.config.registry.notify(ApplicationCreated(None))
+        template = get_default_renderer().loader.load('formish/test/test.html')
+        self.failUnless((None, True, template.signature) in template.registry)
+
+    def test_adds_directives(self):
+        from pyramid_formish import includeme
+        includeme(self.config)
+        self.failUnless(callable(self.config.add_form))
+        self.failUnless(callable(self.config.add_form_group))
+        self.failUnless(callable(self.config.add_formish_template_path))
+        self.failUnless(callable(self.config.load_formish_zcml))
 
 class TestForm(unittest.TestCase):
     def _makeOne(self, *arg, **kw):
@@ -117,6 +608,192 @@ class TestForm(unittest.TestCase):
         form = self._makeOne(Structure())
         self.failUnlessEqual(form.renderer.__class__, ZPTRenderer)
 
+    def _makeCachedForm(self, defaults=None):
+        import schemaish
+        from pyramid_formish import RenderCache
+        class DummySchema(schemaish.Structure):
+            title = schemaish.String()
+        renderer = DummyRenderer()
+        form = self._makeOne(DummySchema(), name='form', renderer=renderer)
+        form.defaults = defaults or {}
+        form.render_cache = RenderCache()
+        return form, renderer
+
+    def test_call_render_cache(self):
+        form, renderer = self._makeCachedForm()
+        for i in range(3):
+            self.assertEqual(form(), 'rendered')
+        self.assertEqual(len(renderer.calls), 2)
+
+    def test_call_render_cache_keyed_on_defaults(self):
+        form, renderer = self._makeCachedForm({'title':'one'})
+        form()
+        form()
+        form.defaults = {'title':'two'}
+        form()
+        self.assertEqual(len(renderer.calls), 3)
+
+    def test_call_render_cache_keyed_on_widgets(self):
+        import formish
+        form, renderer = self._makeCachedForm()
+        form()
+        form()
+        form.set_widget('title', formish.TextArea())
+        form()
+        self.assertEqual(len(renderer.calls), 3)
+
+    def test_call_render_cache_bypassed_with_errors(self):
+        form, renderer = self._makeCachedForm()
+        form()
+        form()
+        form.errors['title'] = 'Bad'
+        form()
+        self.assertEqual(len(renderer.calls), 3)
+
+    def test_call_render_cache_bypassed_after_validation(self):
+        form, renderer = self._makeCachedForm()
+        form()
+        form()
+        import webob.multidict
+        request = testing.DummyRequest()
+        request.POST = webob.multidict.MultiDict({'title':'x'})
+        form.validate(request, check_form_name=False)
+        form()
+        self.assertEqual(len(renderer.calls), 3)
+
+    def test_call_without_render_cache(self):
+        form, renderer = self._makeCachedForm()
+        form.render_cache = None
+        form()
+        form()
+        self.assertEqual(len(renderer.calls), 2)
+
+    def test_call_render_cache_bypassed_with_address_repr(self):
+        import formish
+        form, renderer = self._makeCachedForm()
+        widget = formish.Input()
+        widget.helper = object()
+        form.set_widget('title', widget)
+        self.assertEqual(form.fingerprint(), None)
+        form()
+        form()
+        form()
+        self.assertEqual(len(renderer.calls), 3)
+
+    def _makeGroupForm(self, title=None, description=None, validator=None,
+                       sequence_title=None):
+        import schemaish
+        group = schemaish.Structure(title=title, description=description,
+                                    validator=validator)
+        group.add('name', schemaish.String())
+        schema = schemaish.Structure()
+        schema.add('group', group)
+        schema.add('items', schemaish.Sequence(schemaish.String(),
+                                               title=sequence_title))
+        return self._makeOne(schema, name='form')
+
+    def test_fingerprint_of_group_title(self):
+        self.assertNotEqual(self._makeGroupForm('One').fingerprint(),
+                            self._makeGroupForm('Two').fingerprint())
+        self.assertEqual(self._makeGroupForm('One').fingerprint(),
+                         self._makeGroupForm('One').fingerprint())
+
+    def test_fingerprint_of_containers(self):
+        import validatish
+        fingerprints = [
+            self._makeGroupForm().fingerprint(),
+            self._makeGroupForm(description='One').fingerprint(),
+            self._makeGroupForm(validator=validatish.Required()).fingerprint(),
+            self._makeGroupForm(sequence_title='One').fingerprint(),
+            ]
+        self.assertEqual(len(set(fingerprints)), 4)
+
+    def test_fingerprint_of_shared_definition(self):
+        from pyramid_formish import definition_token
+        prototype, form1, form2 = self._makeSharedForms()
+        token = definition_token()
+        form1.share(prototype.item_data, prototype._actions, token)
+        form2.share(prototype.item_data, prototype._actions, token)
+        def definition_fingerprint():
+            raise AssertionError('shared definition fingerprinted')
+        form1.definition_fingerprint = definition_fingerprint
+        self.assertEqual(form1.fingerprint(), form2.fingerprint())
+        form3 = self._makeOne(prototype.structure.attr,
+                              add_default_action=False)
+        form3.share(prototype.item_data, prototype._actions,
+                    definition_token())
+        self.assertNotEqual(form1.fingerprint(), form3.fingerprint())
+
+    def test_fingerprint_of_changed_shared_definition(self):
+        import formish
+        from pyramid_formish import definition_token
+        prototype, form1, form2 = self._makeSharedForms()
+        token = definition_token()
+        form1.share(prototype.item_data, prototype._actions, token)
+        form2.share(prototype.item_data, prototype._actions, token)
+        form1.set_widget('title', formish.TextArea())
+        self.failIf(form1._shared_item_data)
+        self.assertNotEqual(form1.fingerprint(), form2.fingerprint())
+
+    def _makeStreamedForm(self, items=()):
+        import schemaish
+        from pyramid_formish import ZPTRenderer
+        item = schemaish.Structure()
+        item.add('name', schemaish.String())
+        item.add('count', schemaish.Integer())
+        schema = schemaish.Structure()
+        schema.add('title', schemaish.String())
+        schema.add('items', schemaish.Sequence(item))
+        schema.add('group', item)
+        form = self._makeOne(schema, name='form', renderer=ZPTRenderer())
+        form.defaults = {'title':'Title', 'items':list(items)}
+        return form
+
+    def test_iter_render_matches_call(self):
+        items = [{'name':'one', 'count':1}, {'name':'two', 'count':2}]
+        form = self._makeStreamedForm(items)
+        chunks = list(form.iter_render(encoding=None))
+        self.assertEqual(u''.join(chunks), form())
+        self.failUnless(len(chunks) > 10)
+
+    def test_iter_render_empty_sequence(self):
+        form = self._makeStreamedForm()
+        self.assertEqual(u''.join(form.iter_render(encoding=None)), form())
+
+    def test_iter_render_with_errors(self):
+        form = self._makeStreamedForm([{'name':'one', 'count':1}])
+        form.errors['title'] = 'Bad'
+        self.assertEqual(u''.join(form.iter_render(encoding=None)), form())
+
+    def test_iter_render_encoding(self):
+        form = self._makeStreamedForm()
+        form.defaults = {'title':u'\xe9t\xe9'}
+        chunks = list(form.iter_render())
+        for chunk in chunks:
+            self.failUnless(isinstance(chunk, str))
+        self.assertEqual(''.join(chunks), form().encode('utf-8'))
+
+    def test_iter_render_classes(self):
+        form = self._makeStreamedForm()
+        list(form.iter_render(classes=['big']))
+        self.failUnless('big' in form.classes)
+
+    def test_iter_render_template_without_fields(self):
+        form, renderer = self._makeCachedForm()
+        form.render_cache = None
+        self.assertEqual(list(form.iter_render()), ['rendered'])
+
+    def test_errors_empty(self):
+        form = self._makeStreamedForm([{'name':'one', 'count':1}])
+        self.assertEqual(form.errors.keys(), [])
+        self.failIf(form['items'].contains_error)
+
+    def test_errors(self):
+        from formish.forms import ErrorDict
+        form = self._makeStreamedForm([{'name':'one', 'count':1}])
+        form.errors['items.0.name'] = 'Bad'
+        self.assertEqual(form.errors.keys(), ErrorDict.keys(form.errors))
+
     def test_set_widget(self):
         import schemaish
         from formish.widgets import Widget
@@ -126,5 +803,105 @@ class TestForm(unittest.TestCase):
         widget = Widget()
         form.set_widget('title', widget)
         self.assertEqual(form['title'].widget.widget, widget)
-        
-        
+
+    def test_render_field(self):
+        form = self._makeStreamedForm()
+        html = form.render_field('title')
+        self.failUnless('value="Title"' in html)
+        self.failUnless(html in form())
+
+    def test_render_field_collection(self):
+        form = self._makeStreamedForm()
+        html = form.render_field('group')
+        self.failUnless('name="group.count"' in html)
+        self.failIf('name="title"' in html)
+        self.failUnless(html in form())
+
+    def test_render_field_nested(self):
+        form = self._makeStreamedForm()
+        form.defaults = {'group':{'count':3}}
+        html = form.render_field('group.count')
+        self.failUnless('name="group.count"' in html)
+        self.failUnless('value="3"' in html)
+        self.failUnless(html in form())
+
+    def test_render_field_in_sequence(self):
+        form = self._makeStreamedForm([{'name':'one', 'count':1}])
+        html = form.render_field('items.0.name')
+        self.failUnless('value="one"' in html)
+        self.failUnless(html in form())
+
+    def test_render_field_missing(self):
+        form = self._makeStreamedForm()
+        self.assertRaises(KeyError, form.render_field, 'missing')
+        self.assertRaises(KeyError, form.render_field, 'title.missing')
+
+    def test_render_field_cache(self):
+        form, renderer = self._makeCachedForm()
+        for i in range(3):
+            self.assertEqual(form.render_field('title'), 'rendered')
+        self.assertEqual(len(renderer.calls), 2)
+        form.errors['title'] = 'Bad'
+        form.render_field('title')
+        self.assertEqual(len(renderer.calls), 3)
+
+    def _makeSharedForms(self):
+        import schemaish
+        class DummySchema(schemaish.Structure):
+            title = schemaish.String()
+        prototype = self._makeOne(DummySchema(), add_default_action=False)
+        prototype.add_action('submit', 'Submit')
+        prototype['title'].widget
+        form1 = self._makeOne(DummySchema(), add_default_action=False)
+        form1.share(prototype.item_data, prototype._actions)
+        form2 = self._makeOne(DummySchema(), add_default_action=False)
+        form2.share(prototype.item_data, prototype._actions)
+        return prototype, form1, form2
+
+    def test_share(self):
+        prototype, form1, form2 = self._makeSharedForms()
+        self.failUnless(form1.item_data is prototype.item_data)
+        self.failUnless(form1._actions is prototype._actions)
+        self.failUnless(form1['title'].widget.widget is
+                        form2['title'].widget.widget)
+        self.failIf(form1.structure._fields)
+
+    def test_share_set_widget_copies(self):
+        from formish.widgets import Widget
+        prototype, form1, form2 = self._makeSharedForms()
+        shared = prototype['title'].widget.widget
+        widget = Widget()
+        form1.set_widget('title', widget)
+        self.failUnless(form1['title'].widget.widget is widget)
+        self.failUnless(form2['title'].widget.widget is shared)
+        self.failUnless(prototype['title'].widget.widget is shared)
+
+    def test_share_add_action_copies(self):
+        prototype, form1, form2 = self._makeSharedForms()
+        form1.add_action('cancel', 'Cancel')
+        self.assertEqual([a.name for a in form1._actions], ['submit', 'cancel'])
+        self.assertEqual([a.name for a in form2._actions], ['submit'])
+        self.assertEqual([a.name for a in prototype._actions], ['submit'])
+
+    def test_iter_render_classes_not_shared(self):
+        form1 = self._makeStreamedForm()
+        form2 = self._makeStreamedForm()
+        list(form1.iter_render(classes=['big']))
+        self.failIf('big' in form2.classes)
+
+    def test_call_classes_not_shared(self):
+        import formish
+        form1 = self._makeStreamedForm()
+        form2 = self._makeStreamedForm()
+        form1(classes=['big'])
+        self.failUnless('big' in form1.classes)
+        self.failIf('big' in form2.classes)
+        self.assertEqual(formish.Form.base_classes, ['formish-form'])
+
+class DummyRenderer(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, template, args):
+        self.calls.append((template, args))
+        return 'rendered'
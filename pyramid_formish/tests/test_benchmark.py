@@ -0,0 +1,98 @@
+import unittest
+from pyramid import testing
+
+class TestSubmission(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def test_validates(self):
+        from pyramid_formish.benchmark import controller_factory
+        from pyramid_formish.benchmark import make_request
+        from pyramid_formish.benchmark import submission
+        from pyramid_formish.zcml import FormAction
+        from pyramid_formish.zcml import FormView
+        controller = controller_factory(4)
+        action = FormAction('submit')
+        view = FormView(controller, action, [action], 'form')
+        response = view(None, make_request(submission(4)))
+        self.assertEqual(response.body, 'submitted')
+
+    def test_forms_view(self):
+        from pyramid_formish.benchmark import forms_view
+        from pyramid_formish.benchmark import submission
+        view = forms_view(2, 3)
+        self.assertEqual(view(submission(2, 'form2')).body, 'submitted')
+        self.assertEqual(view().body.count('<form'), 3)
+
+    def test_forms_view_actions(self):
+        from pyramid_formish.benchmark import forms_view
+        from pyramid_formish.benchmark import submission
+        view = forms_view(2, 3, 4)
+        self.assertEqual(view(submission(2, 'form2', 'action3')).body,
+                         'submitted')
+
+    def test_startup_stages(self):
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.benchmark import make_request
+        from pyramid_formish.benchmark import startup_stages
+        from pyramid_formish.benchmark import submission
+        for configure in startup_stages(2):
+            registry = configure().registry
+            request = make_request()
+            request.registry = registry
+            response = render_view_to_response(None, request, 'form1')
+            self.assertEqual(response.body.count('<form'), 1)
+            request = make_request(submission(5, 'form1'))
+            request.registry = registry
+            response = render_view_to_response(None, request, 'form1')
+            self.assertEqual(response.body, 'submitted')
+
+class TestMeasure(unittest.TestCase):
+    def _callFUT(self, func, repeat, min_time):
+        from pyramid_formish.benchmark import measure
+        return measure(func, repeat, min_time)
+
+    def test_calibrates(self):
+        import time
+        calls = []
+        def func():
+            calls.append(1)
+            if len(calls) > 11:
+                time.sleep(0.001)
+        number, times = self._callFUT(func, 3, 0.05)
+        self.assertEqual(number, 100)
+        self.assertEqual(len(times), 3)
+        self.assertEqual(len(calls), 1 + 10 + 100 * 3)
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, argv):
+        from pyramid_formish.benchmark import main
+        return main(argv)
+
+    def test_json_output(self):
+        import json
+        import os
+        filename = os.path.join(self.tempdir, 'results.json')
+        self._callFUT(['formish_benchmark', '-r', '2', '-t', '0',
+                       '-o', filename, 'template_loader.load',
+                       'form_from_controller.small'])
+        results = json.load(open(filename))
+        names = [ result['name'] for result in results['results'] ]
+        self.assertEqual(names, ['form_from_controller.small',
+                                 'template_loader.load.cold',
+                                 'template_loader.load.warm'])
+        for result in results['results']:
+            self.assertEqual(len(result['times']), 2)
+            self.assertEqual(result['best'], min(result['times']))
+        self.failUnless('formish' in results['versions'])
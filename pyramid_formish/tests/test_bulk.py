@@ -0,0 +1,176 @@
+import unittest
+
+def make_fields():
+    import schemaish
+    import validatish
+    return [('name', schemaish.String(validator=validatish.Required())),
+            ('age', schemaish.Integer()),
+            ('tags', schemaish.Sequence(schemaish.String()))]
+
+class TestRecordValidator(unittest.TestCase):
+    def _makeOne(self):
+        from pyramid_formish.bulk import RecordValidator
+        return RecordValidator(make_fields())
+
+    def test_valid(self):
+        validator = self._makeOne()
+        data, errors = validator({'name':' fred ', 'age':'42',
+                                  'tags':'a,b'})
+        self.assertEqual(data, {'name':u'fred', 'age':42,
+                                'tags':[u'a', u'b']})
+        self.assertEqual(errors, {})
+
+    def test_missing_and_empty(self):
+        validator = self._makeOne()
+        data, errors = validator({'name':'', 'extra':'ignored'})
+        self.assertEqual(data, {'name':None, 'age':None, 'tags':None})
+        self.assertEqual(errors.keys(), ['name'])
+
+    def test_conversion_error(self):
+        validator = self._makeOne()
+        data, errors = validator({'name':'fred', 'age':'old'})
+        self.assertEqual(data['age'], None)
+        self.assertEqual(errors, {'age':'Not a valid integer'})
+
+    def test_not_strings(self):
+        validator = self._makeOne()
+        data, errors = validator({'name':u'fred', 'age':7, 'tags':[u'a']})
+        self.assertEqual(data, {'name':u'fred', 'age':7, 'tags':[u'a']})
+        self.assertEqual(errors, {})
+
+class TestFieldValidator(unittest.TestCase):
+    def _makeOne(self, fields=None, widgets=None):
+        from pyramid_formish.bulk import FieldValidator
+        if fields is None:
+            fields = make_fields()
+        return FieldValidator(fields, widgets)
+
+    def test_valid(self):
+        validator = self._makeOne()
+        self.assertEqual(validator(['name', 'age'], {'name':'fred',
+                                                     'age':' 42 '}), {})
+
+    def test_only_named_fields(self):
+        validator = self._makeOne()
+        self.assertEqual(validator(['age'], {'name':'', 'age':'1'}), {})
+        self.assertEqual(validator(['name'], {'age':'old'}).keys(), ['name'])
+
+    def test_conversion_error(self):
+        validator = self._makeOne()
+        self.assertEqual(validator(['age'], {'age':'old'}),
+                         {'age':'Not a valid integer'})
+
+    def test_unknown_and_sequence_fields_ignored(self):
+        validator = self._makeOne()
+        self.assertEqual(validator(['missing', 'tags'], {'tags':'a'}), {})
+
+    def test_nested(self):
+        import schemaish
+        import validatish
+        address = schemaish.Structure()
+        address.add('city', schemaish.String(validator=validatish.Required()))
+        validator = self._makeOne([('address', address)])
+        self.assertEqual(validator(['address.city'], {}).keys(),
+                         ['address.city'])
+        self.assertEqual(validator(['address.city'],
+                                   {'address.city':'Paris'}), {})
+
+    def test_deeply_nested(self):
+        import schemaish
+        import validatish
+        city = schemaish.Structure()
+        city.add('name', schemaish.String(validator=validatish.Required()))
+        address = schemaish.Structure()
+        address.add('city', city)
+        validator = self._makeOne([('address', address)])
+        self.assertEqual(validator(['address.city.name'], {}).keys(),
+                         ['address.city.name'])
+        self.assertEqual(validator(['address.city.name', 'address.city'],
+                                   {'address.city.name':'Paris'}), {})
+
+    def test_fields_reused(self):
+        validator = self._makeOne()
+        validator(['age'], {'age':'1'})
+        field = validator.fields['age']
+        validator(['age'], {'age':'2'})
+        self.failUnless(validator.fields['age'] is field)
+
+    def test_date_parts(self):
+        import formish
+        import schemaish
+        import validatish
+        from webob.multidict import MultiDict
+        fields = [('born', schemaish.Date(validator=validatish.Required()))]
+        validator = self._makeOne(fields, {'born':formish.DateParts()})
+        self.assertEqual(validator(['born'], MultiDict(
+            [('born.day', '1'), ('born.month', '2'), ('born.year', '2011')])),
+                         {})
+        self.assertEqual(validator(['born'], MultiDict(
+            [('born.day', ''), ('born.month', ''), ('born.year', '')])).keys(),
+                         ['born'])
+        self.assertEqual(validator(['born'], MultiDict(
+            [('born.day', '31'), ('born.month', '2'),
+             ('born.year', '2011')])).keys(), ['born'])
+
+    def test_checkbox(self):
+        import formish
+        import schemaish
+        import validatish
+        fields = [('agreed', schemaish.Boolean(
+            validator=validatish.Equal(True)))]
+        validator = self._makeOne(fields, {'agreed':formish.Checkbox()})
+        self.assertEqual(validator(['agreed'], {'agreed':'True'}), {})
+        self.assertEqual(validator(['agreed'], {}).keys(), ['agreed'])
+
+    def test_default_boolean_widget(self):
+        import schemaish
+        import validatish
+        fields = [('agreed', schemaish.Boolean(
+            validator=validatish.Required()))]
+        validator = self._makeOne(fields)
+        self.assertEqual(validator(['agreed'], {'agreed':'True'}), {})
+
+    def test_read_only_and_file_fields_ignored(self):
+        import formish
+        import schemaish
+        import validatish
+        fields = [('code', schemaish.Integer()),
+                  ('upload', schemaish.File(validator=validatish.Required()))]
+        validator = self._makeOne(fields, {'code':formish.Input(
+            readonly=True)})
+        self.assertEqual(validator(['code', 'upload'], {'code':'x'}), {})
+
+class TestChunked(unittest.TestCase):
+    def _callFUT(self, records, chunk_size):
+        from pyramid_formish.bulk import chunked
+        return list(chunked(records, chunk_size))
+
+    def test_it(self):
+        self.assertEqual(self._callFUT(iter(range(5)), 2),
+                         [(0, [0, 1]), (2, [2, 3]), (4, [4])])
+
+    def test_empty(self):
+        self.assertEqual(self._callFUT([], 2), [])
+
+class TestValidateRecords(unittest.TestCase):
+    def _callFUT(self, records, **kw):
+        from pyramid_formish.bulk import validate_records
+        return validate_records(make_fields(), records, **kw)
+
+    def _records(self):
+        return [ {'name':'n%s' % i, 'age':i % 3 and str(i) or 'x'}
+                 for i in range(10) ]
+
+    def test_in_process(self):
+        results = list(self._callFUT(self._records(), chunk_size=3))
+        self.assertEqual([ index for index, data, errors in results ],
+                         range(10))
+        invalid = [ index for index, data, errors in results if errors ]
+        self.assertEqual(invalid, [0, 3, 6, 9])
+        self.assertEqual(results[1][1]['age'], 1)
+
+    def test_processes(self):
+        results = list(self._callFUT(iter(self._records()), chunk_size=2,
+                                     processes=2))
+        expected = list(self._callFUT(self._records()))
+        self.assertEqual(results, expected)
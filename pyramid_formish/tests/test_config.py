@@ -0,0 +1,244 @@
+import unittest
+from pyramid import testing
+
+class TestFormDefinition(unittest.TestCase):
+    def _makeOne(self, *arg, **kw):
+        from pyramid_formish.config import FormDefinition
+        return FormDefinition(*arg, **kw)
+
+    def test_defaults(self):
+        formdef = self._makeOne(None, 'form')
+        self.assertEqual(formdef.form_id, 'form')
+        self.assertEqual(formdef.method, 'POST')
+        self.assertEqual(formdef.render_cache, None)
+        self.assertEqual(formdef._actions, [])
+
+    def test_action_names(self):
+        from pyramid_formish.zcml import FormAction
+        cancel = FormAction('cancel', 'Go back', validate=False)
+        formdef = self._makeOne(None, 'form', ['submit', cancel])
+        submit = formdef._actions[0]
+        self.assertEqual(submit.name, 'submit')
+        self.assertEqual(submit.title, 'Submit')
+        self.failUnless(submit.validate)
+        self.failUnless(formdef._actions[1] is cancel)
+
+    def test_render_cache_size(self):
+        formdef = self._makeOne(None, 'form', render_cache_size=10)
+        self.assertEqual(formdef.render_cache.renderings.maxsize, 10)
+
+    def test_bad_method(self):
+        from zope.configuration.exceptions import ConfigurationError
+        self.assertRaises(ConfigurationError, self._makeOne, None, 'form',
+                          method='PUT')
+
+    def test_result_cache_size(self):
+        formdef = self._makeOne(None, 'form', method='GET',
+                                result_cache_size=10, result_cache_ttl=5)
+        self.assertEqual(formdef.result_cache.results.maxsize, 10)
+        self.assertEqual(formdef.result_cache.ttl, 5)
+
+class TestAddForm(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, *arg, **kw):
+        from pyramid_formish.config import add_form
+        return add_form(self.config, *arg, **kw)
+
+    def test_display(self):
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        self._callFUT(make_controller_factory(), ['submit'], name='edit')
+        request = testing.DummyRequest()
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.body, '123')
+        self.assertEqual(request.form.name, None)
+        self.assertEqual(request.form.method, 'POST')
+
+    def test_submit(self):
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        self._callFUT(make_controller_factory(), ['submit', 'cancel'],
+                      form_id='form', method='GET', name='edit')
+        request = testing.DummyRequest()
+        request.params = {'__formish_form__':'form', 'submit':'Submit'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.body, 'submitted')
+        self.assertEqual(request.form.name, 'form')
+        self.assertEqual(request.form.method, 'GET')
+
+    def test_validate_fields(self):
+        import json
+        import schemaish
+        import validatish
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        title = schemaish.String(validator=validatish.Required())
+        self._callFUT(make_controller_factory(fields=[('title', title)]),
+                      ['submit'], name='edit', validate_fields=True)
+        request = testing.DummyRequest()
+        request.params = {'__formish_validate__':'title', 'title':''}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(json.loads(response.body).keys(), ['title'])
+        self.failIf(hasattr(request, 'form'))
+
+    def test_render_fields(self):
+        import schemaish
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        self._callFUT(make_controller_factory(
+                          fields=[('title', schemaish.String())]),
+                      ['submit'], name='edit', render_fields=True)
+        request = testing.DummyRequest()
+        request.params = {'__formish_field__':'title'}
+        response = render_view_to_response(None, request, 'edit')
+        self.failUnless('name="title"' in response.body)
+
+    def test_export_schema(self):
+        import json
+        import schemaish
+        from pyramid.view import render_view_to_response
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        self._callFUT(make_controller_factory(
+                          fields=[('title', schemaish.String())]),
+                      ['submit'], name='edit', export_schema=True)
+        request = testing.DummyRequest()
+        request.params = {'__formish_schema__':'1'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(json.loads(response.body)['fields'][0]['name'],
+                         'title')
+
+    def test_result_cache(self):
+        import schemaish
+        from pyramid.view import render_view_to_response
+        from pyramid_formish import get_result_caches
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        self._callFUT(make_controller_factory(
+                          fields=[('title', schemaish.String())]),
+                      ['submit'], name='edit', form_id='search',
+                      method='GET', result_cache_size=10)
+        caches = get_result_caches(self.config.registry)
+        self.assertEqual(len(caches['search']), 1)
+        request = testing.DummyRequest()
+        request.params = {'submit':'1', '__formish_form__':'search'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.body, 'submitted')
+        self.assertEqual(len(caches['search'][0].results), 1)
+
+    def test_dotted_controller(self):
+        from pyramid.view import render_view_to_response
+        self._callFUT('pyramid_formish.tests.test_config.Controller',
+                      name='edit')
+        response = render_view_to_response(None, testing.DummyRequest(),
+                                           'edit')
+        self.assertEqual(response.body, 'dotted')
+
+    def test_directive(self):
+        from pyramid.view import render_view_to_response
+        from pyramid_formish import includeme
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        includeme(self.config)
+        self.config.add_form(make_controller_factory(), name='edit')
+        response = render_view_to_response(None, testing.DummyRequest(),
+                                           'edit')
+        self.assertEqual(response.body, '123')
+
+class TestAddFormGroup(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, *arg, **kw):
+        from pyramid_formish.config import add_form_group
+        return add_form_group(self.config, *arg, **kw)
+
+    def _makeForms(self):
+        from pyramid_formish.config import FormDefinition
+        from pyramid_formish.tests.test_zcml import make_controller_factory
+        return [FormDefinition(make_controller_factory(), 'one', ['submit']),
+                FormDefinition('pyramid_formish.tests.test_config.Controller',
+                               'two', ['submit'], method='GET')]
+
+    def test_display(self):
+        from pyramid.view import render_view_to_response
+        from pyramid.response import Response
+        def view(context, request):
+            return Response(','.join([ f.name for f in request.forms ]))
+        self._callFUT(view, self._makeForms(), name='forms')
+        response = render_view_to_response(None, testing.DummyRequest(),
+                                           'forms')
+        self.assertEqual(response.body, 'one,two')
+
+    def test_submit(self):
+        from pyramid.view import render_view_to_response
+        self._callFUT(None, self._makeForms(), name='forms')
+        request = testing.DummyRequest()
+        request.params = {'__formish_form__':'two', 'submit':'Submit'}
+        response = render_view_to_response(None, request, 'forms')
+        self.assertEqual(response.body, 'submitted dotted')
+        self.assertEqual(request.forms[1].method, 'GET')
+
+class TestAddFormishTemplatePath(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, path):
+        from pyramid_formish.config import add_formish_template_path
+        return add_formish_template_path(self.config, path)
+
+    def _getSearchPath(self):
+        from pyramid_formish import IFormishSearchPath
+        return self.config.registry.getUtility(IFormishSearchPath)
+
+    def test_abspath(self):
+        import os.path
+        here = os.path.abspath(os.path.dirname(__file__))
+        self._callFUT(here)
+        self.assertEqual(self._getSearchPath(), [here])
+
+    def test_pkg_abspath(self):
+        import os.path
+        here = os.path.abspath(os.path.dirname(__file__))
+        self._callFUT('pyramid_formish.tests:fixtures')
+        self.assertEqual(self._getSearchPath(),
+                         [os.path.join(here, 'fixtures')])
+
+    def test_pkg_relpath(self):
+        import os.path
+        import pyramid_formish.tests
+        here = os.path.abspath(os.path.dirname(__file__))
+        self.config.package = pyramid_formish.tests
+        self.config.package_name = 'pyramid_formish.tests'
+        self._callFUT('fixtures')
+        self.assertEqual(self._getSearchPath(),
+                         [os.path.join(here, 'fixtures')])
+
+    def test_resets_default_renderer(self):
+        from pyramid_formish import get_default_renderer
+        registry = self.config.registry
+        before = get_default_renderer(registry)
+        self._callFUT('pyramid_formish.tests:fixtures')
+        renderer = get_default_renderer(registry)
+        self.failIf(renderer is before)
+        self.assertEqual(renderer('test.html', {}), u'<div>Fixtures</div>')
+
+class Controller(object):
+    def __init__(self, context, request):
+        self.request = request
+    def form_fields(self):
+        return []
+    def __call__(self):
+        from pyramid.response import Response
+        return Response('dotted')
+    def handle_submit(self, converted):
+        from pyramid.response import Response
+        return Response('submitted dotted')
@@ -0,0 +1,87 @@
+import unittest
+
+class TestDescribeValidator(unittest.TestCase):
+    def _callFUT(self, validator):
+        from pyramid_formish.describe import describe_validator
+        return describe_validator(validator)
+
+    def test_none(self):
+        self.assertEqual(self._callFUT(None), None)
+
+    def test_required(self):
+        import validatish
+        self.assertEqual(self._callFUT(validatish.Required()),
+                         {'type':'required'})
+
+    def test_arguments(self):
+        import validatish
+        self.assertEqual(self._callFUT(validatish.Length(min=2)),
+                         {'type':'length', 'min':2, 'max':None})
+        self.assertEqual(self._callFUT(validatish.OneOf(('a', 'b'))),
+                         {'type':'one_of', 'set_of_values':['a', 'b']})
+
+    def test_compound(self):
+        import validatish
+        validator = validatish.All(validatish.Required(),
+                                   validatish.Any(validatish.Email(),
+                                                  validatish.URL()))
+        self.assertEqual(self._callFUT(validator),
+                         {'type':'all',
+                          'validators':[{'type':'required'},
+                                        {'type':'any',
+                                         'validators':[
+                                             {'type':'email'},
+                                             {'type':'url',
+                                              'with_scheme':False}]}]})
+
+    def test_server_only(self):
+        import validatish
+        from pyramid_formish.validators import io_bound
+        class Custom(validatish.Validator):
+            pass
+        self.assertEqual(self._callFUT(io_bound(validatish.Required())),
+                         {'type':'server'})
+        self.assertEqual(self._callFUT(Custom()), {'type':'server'})
+        self.assertEqual(self._callFUT(validatish.Equal(object())),
+                         {'type':'server'})
+
+class TestDescribeFields(unittest.TestCase):
+    def _callFUT(self, fields):
+        from pyramid_formish.describe import describe_fields
+        return describe_fields(fields)
+
+    def test_it(self):
+        import schemaish
+        import validatish
+        address = schemaish.Structure()
+        address.add('city', schemaish.String(title='Town'))
+        fields = [('count', schemaish.Integer(
+                      validator=validatish.Range(min=1))),
+                  ('address', address),
+                  ('tags', schemaish.Sequence(schemaish.String()))]
+        count, address, tags = self._callFUT(fields)
+        self.assertEqual(count, {'name':'count', 'type':'Integer',
+                                 'title':None, 'description':None,
+                                 'validator':{'type':'range', 'min':1,
+                                              'max':None}})
+        self.assertEqual(address['fields'][0]['name'], 'address.city')
+        self.assertEqual(address['fields'][0]['title'], 'Town')
+        self.assertEqual(tags['item']['name'], 'tags.*')
+        self.assertEqual(tags['item']['type'], 'String')
+
+class TestFormDescription(unittest.TestCase):
+    def _makeOne(self, fields, form_id='form'):
+        from pyramid_formish.describe import FormDescription
+        return FormDescription(fields, form_id)
+
+    def test_it(self):
+        import json
+        import schemaish
+        fields = [('title', schemaish.String())]
+        description = self._makeOne(fields)
+        body = json.loads(description.body)
+        self.assertEqual(body['form_id'], 'form')
+        self.assertEqual(body['fields'][0]['name'], 'title')
+        self.assertEqual(description.etag, self._makeOne(fields).etag)
+        self.failIfEqual(description.etag,
+                         self._makeOne(fields, 'other').etag)
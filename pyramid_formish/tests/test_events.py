@@ -0,0 +1,145 @@
+import unittest
+from pyramid import testing
+
+class TestFormPhaseEvent(unittest.TestCase):
+    def test_provides_interface(self):
+        from zope.interface.verify import verifyObject
+        from pyramid_formish.events import FormPhaseEvent
+        from pyramid_formish.events import IFormPhaseEvent
+        event = FormPhaseEvent('build', 'form', None, 0.5)
+        verifyObject(IFormPhaseEvent, event)
+
+class TestTimed(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, *arg, **kw):
+        from pyramid_formish.events import timed
+        return timed(*arg, **kw)
+
+    def _subscribe(self):
+        from pyramid_formish.events import IFormPhaseEvent
+        events = []
+        self.config.add_subscriber(events.append, IFormPhaseEvent)
+        return events
+
+    def test_no_subscribers(self):
+        from pyramid.events import INewRequest
+        self.config.add_subscriber(lambda event: None, INewRequest)
+        result = self._callFUT('build', 'form', None, lambda x, y=1: x + y,
+                               1, y=2)
+        self.assertEqual(result, 3)
+
+    def test_notifies(self):
+        events = self._subscribe()
+        result = self._callFUT('validate', 'form', 'submit', lambda: 'ok')
+        self.assertEqual(result, 'ok')
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual(event.phase, 'validate')
+        self.assertEqual(event.form_id, 'form')
+        self.assertEqual(event.action, 'submit')
+        self.failUnless(event.duration >= 0)
+
+    def test_notifies_when_raising(self):
+        events = self._subscribe()
+        def fail():
+            raise ValueError
+        self.assertRaises(ValueError, self._callFUT, 'handle', 'form',
+                          'submit', fail)
+        self.assertEqual(len(events), 1)
+
+class TestHistogram(unittest.TestCase):
+    def _makeOne(self):
+        from pyramid_formish.events import Histogram
+        return Histogram()
+
+    def test_empty(self):
+        histogram = self._makeOne()
+        self.assertEqual(histogram.quantile(0.5), None)
+        self.assertEqual(histogram.as_dict()['count'], 0)
+
+    def test_add(self):
+        from pyramid_formish.events import BUCKET_BOUNDS
+        histogram = self._makeOne()
+        for duration in (0.00005, 0.00005, 0.00015, 100.0):
+            histogram.add(duration)
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.max, 100.0)
+        self.assertEqual(histogram.counts[0], 2)
+        self.assertEqual(histogram.counts[1], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.quantile(0.5), BUCKET_BOUNDS[0])
+        self.assertEqual(histogram.quantile(0.75), BUCKET_BOUNDS[1])
+        self.assertEqual(histogram.quantile(1), 100.0)
+
+    def test_quantile_at_most_max(self):
+        histogram = self._makeOne()
+        histogram.add(0.00011)
+        self.assertEqual(histogram.quantile(0.5), 0.00011)
+
+class TestFormTimings(unittest.TestCase):
+    def _makeOne(self):
+        from pyramid_formish.events import FormTimings
+        return FormTimings()
+
+    def test_snapshot_and_reset(self):
+        from pyramid_formish.events import FormPhaseEvent
+        timings = self._makeOne()
+        timings(FormPhaseEvent('build', 'one', None, 0.1))
+        timings(FormPhaseEvent('build', 'one', 'submit', 0.3))
+        timings(FormPhaseEvent('render', 'two', None, 0.2))
+        snapshot = timings.snapshot()
+        self.assertEqual(sorted(snapshot.keys()),
+                         [('build', 'one'), ('render', 'two')])
+        self.assertEqual(snapshot[('build', 'one')]['count'], 2)
+        self.assertEqual(snapshot[('build', 'one')]['max'], 0.3)
+        timings.reset()
+        self.assertEqual(timings.snapshot(), {})
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        from pyramid_formish.events import IFormPhaseEvent
+        self.config = testing.setUp()
+        self.events = []
+        self.config.add_subscriber(self.events.append, IFormPhaseEvent)
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _phases(self):
+        return [ (e.phase, e.form_id, e.action) for e in self.events ]
+
+    def test_form_view_submit(self):
+        import schemaish
+        from webob.multidict import MultiDict
+        from pyramid.response import Response
+        from pyramid_formish.zcml import FormAction
+        from pyramid_formish.zcml import FormView
+        class Controller(object):
+            def __init__(self, context, request):
+                pass
+            def form_fields(self):
+                return [('title', schemaish.String())]
+            def handle_submit(self, converted):
+                return Response('submitted')
+        action = FormAction('submit')
+        view = FormView(Controller, action, [action], 'form')
+        request = testing.DummyRequest()
+        request.POST = request.params = MultiDict({'submit':'Submit'})
+        request.method = 'POST'
+        self.assertEqual(view(None, request).body, 'submitted')
+        self.assertEqual(self._phases(), [('build', 'form', 'submit'),
+                                          ('validate', 'form', 'submit'),
+                                          ('handle', 'form', 'submit')])
+
+    def test_form_render(self):
+        import schemaish
+        from pyramid_formish import Form
+        form = Form(schemaish.Structure(), name='form',
+                    renderer=lambda template, vars: 'rendered')
+        self.assertEqual(form(), 'rendered')
+        self.assertEqual(self._phases(), [('render', 'form', None)])
@@ -0,0 +1,212 @@
+import unittest
+
+BFG_MODULE = """\
+import repoze.bfg.formish
+from repoze.bfg.formish import Form
+from repoze.bfg.formish.zcml import FormAction
+"""
+
+CONVERTED_MODULE = """\
+import pyramid_formish
+from pyramid_formish import Form
+from pyramid_formish.zcml import FormAction
+"""
+
+OTHER_MODULE = """\
+import os
+"""
+
+BFG_ZCML = """\
+<configure xmlns:formish="http://namespaces.repoze.org/formish">
+  <include package="repoze.bfg.formish" file="meta.zcml"/>
+</configure>
+"""
+
+class TestConvert(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, path, workers=1, manifest=None):
+        from pyramid_formish.fix_formish_imports import convert
+        return convert(path, workers, manifest)
+
+    def _write(self, name, text):
+        import os
+        filename = os.path.join(self.tempdir, name)
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        f = open(filename, 'w')
+        f.write(text)
+        f.close()
+        return filename
+
+    def _read(self, filename):
+        return open(filename).read()
+
+    def _makeTree(self):
+        bfg = self._write('app/views.py', BFG_MODULE)
+        other = self._write('app/other.py', OTHER_MODULE)
+        hidden = self._write('.hidden/views.py', BFG_MODULE)
+        zcml = self._write('app/configure.zcml', BFG_ZCML)
+        return bfg, other, hidden, zcml
+
+    def test_converts(self):
+        bfg, other, hidden, zcml = self._makeTree()
+        summary = self._callFUT(self.tempdir)
+        self.assertEqual(self._read(bfg), CONVERTED_MODULE)
+        self.assertEqual(self._read(other), OTHER_MODULE)
+        self.assertEqual(self._read(hidden), BFG_MODULE)
+        self.failUnless('pyramid_formish' in self._read(zcml))
+        self.assertEqual(summary['changed'], [bfg, zcml])
+        self.assertEqual(summary['errors'], [])
+        self.assertEqual(summary['python_files'], 2)
+        self.assertEqual(summary['converted'], 2)
+        self.assertEqual(summary['skipped'], 0)
+        self.failUnless(summary['seconds']['total'] >= 0)
+
+    def test_single_file(self):
+        bfg, other, hidden, zcml = self._makeTree()
+        summary = self._callFUT(bfg)
+        self.assertEqual(self._read(bfg), CONVERTED_MODULE)
+        self.assertEqual(summary['changed'], [bfg])
+
+    def test_workers(self):
+        bfg, other, hidden, zcml = self._makeTree()
+        summary = self._callFUT(self.tempdir, workers=2)
+        self.assertEqual(self._read(bfg), CONVERTED_MODULE)
+        self.assertEqual(summary['changed'], [bfg, zcml])
+        self.assertEqual(summary['workers'], 2)
+
+    def test_manifest(self):
+        import os
+        bfg, other, hidden, zcml = self._makeTree()
+        manifest = os.path.join(self.tempdir, 'manifest.json')
+        self._callFUT(self.tempdir, manifest=manifest)
+        summary = self._callFUT(self.tempdir, manifest=manifest)
+        self.assertEqual(summary['changed'], [])
+        self.assertEqual(summary['converted'], 0)
+        self.assertEqual(summary['skipped'], 2)
+        self._write('app/other.py', BFG_MODULE)
+        summary = self._callFUT(self.tempdir, manifest=manifest)
+        self.assertEqual(summary['changed'], [other])
+        self.assertEqual(summary['converted'], 1)
+        self.assertEqual(self._read(other), CONVERTED_MODULE)
+
+    def test_manifest_for_other_conversions(self):
+        import json
+        import os
+        from pyramid_formish.fix_formish_imports import MANIFEST_FORMAT
+        bfg, other, hidden, zcml = self._makeTree()
+        manifest = os.path.join(self.tempdir, 'manifest.json')
+        from pyramid_formish.fix_formish_imports import digest
+        json.dump({'format':MANIFEST_FORMAT, 'fixer':'other',
+                   'files':{os.path.abspath(bfg):digest(bfg)}},
+                  open(manifest, 'w'))
+        summary = self._callFUT(self.tempdir, manifest=manifest)
+        self.assertEqual(self._read(bfg), CONVERTED_MODULE)
+        self.assertEqual(summary['skipped'], 0)
+
+    def test_errors(self):
+        bad = self._write('bad.py', 'import repoze.bfg.formish\ndef (:\n')
+        summary = self._callFUT(self.tempdir)
+        self.assertEqual(summary['changed'], [])
+        self.assertEqual(len(summary['errors']), 1)
+        self.failUnless(bad in summary['errors'][0])
+
+class TestFixZCML(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, path, workers=1):
+        from pyramid_formish.fix_formish_imports import fix_zcml
+        return fix_zcml(path, workers)
+
+    def _write(self, name, text):
+        import os
+        filename = os.path.join(self.tempdir, name)
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        f = open(filename, 'w')
+        f.write(text)
+        f.close()
+        return filename
+
+    def test_converts(self):
+        bfg = self._write('app/configure.zcml', BFG_ZCML)
+        self.assertEqual(self._callFUT(self.tempdir), [bfg])
+        self.assertEqual(open(bfg).read(), """\
+<configure xmlns:formish="http://pylonshq.com/pyramid_formish">
+  <include package="pyramid_formish" file="meta.zcml"/>
+</configure>
+""")
+
+    def test_skips_hidden_directories(self):
+        # consecutive hidden directories are all skipped
+        one = self._write('.one/configure.zcml', BFG_ZCML)
+        two = self._write('.two/configure.zcml', BFG_ZCML)
+        self.assertEqual(self._callFUT(self.tempdir), [])
+        self.assertEqual(open(one).read(), BFG_ZCML)
+        self.assertEqual(open(two).read(), BFG_ZCML)
+
+    def test_unchanged(self):
+        plain = self._write('plain.zcml', '<configure/>')
+        empty = self._write('empty.zcml', '')
+        self.assertEqual(self._callFUT(self.tempdir), [])
+        self.assertEqual(open(plain).read(), '<configure/>')
+        self.assertEqual(open(empty).read(), '')
+
+    def test_keeps_mode(self):
+        import os
+        import stat
+        bfg = self._write('configure.zcml', BFG_ZCML)
+        os.chmod(bfg, 0644)
+        self._callFUT(self.tempdir)
+        self.assertEqual(stat.S_IMODE(os.stat(bfg).st_mode), 0644)
+        self.assertEqual(os.listdir(self.tempdir), ['configure.zcml'])
+
+    def test_workers(self):
+        one = self._write('one.zcml', BFG_ZCML)
+        two = self._write('two.zcml', BFG_ZCML)
+        self._write('three.zcml', '<configure/>')
+        self.assertEqual(self._callFUT(self.tempdir, 2), [one, two])
+        self.failIf('repoze' in open(two).read())
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, argv):
+        from pyramid_formish.fix_formish_imports import main
+        return main(argv)
+
+    def test_json_output(self):
+        import json
+        import os
+        app = os.path.join(self.tempdir, 'app')
+        os.mkdir(app)
+        filename = os.path.join(app, 'views.py')
+        open(filename, 'w').write(BFG_MODULE)
+        output = os.path.join(self.tempdir, 'summary.json')
+        result = self._callFUT(['bfgformish2pyramidformish', '-j', '1',
+                                '-o', output, app])
+        self.assertEqual(result, None)
+        summary = json.load(open(output))
+        self.assertEqual(summary['changed'], [filename])
+        self.assertEqual(open(filename).read(), CONVERTED_MODULE)
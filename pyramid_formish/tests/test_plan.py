@@ -0,0 +1,301 @@
+import unittest
+from pyramid import testing
+
+FORMS_ZCML = """\
+<configure xmlns="http://namespaces.zope.org/zope"
+           xmlns:formish="http://pylonshq.com/pyramid_formish">
+  <include package="pyramid_formish" file="meta.zcml"/>
+  <formish:form
+      controller="pyramid_formish.tests.test_plan.Controller"
+      name="%(name)s"
+      form_id="edit"
+      render_cache_size="10"
+      validate_fields="true"
+      render_fields="true"
+      export_schema="true"
+      method="GET"
+      result_cache_size="10"
+      result_cache_ttl="30">
+    <formish:action name="submit"/>
+    <formish:action name="cancel"
+        success="pyramid_formish.tests.test_plan.cancelled"/>
+  </formish:form>
+  <formish:forms
+      view="pyramid_formish.tests.test_plan.forms_view"
+      name="forms">
+    <formish:form
+        controller="pyramid_formish.tests.test_plan.Controller"
+        form_id="one">
+      <formish:action name="submit"/>
+    </formish:form>
+  </formish:forms>
+</configure>
+"""
+
+VIEW_ZCML = """\
+<configure xmlns="http://pylonshq.com/pyramid">
+  <include xmlns="http://namespaces.zope.org/zope" package="pyramid_zcml"/>
+  <view view="pyramid_formish.tests.test_plan.other_view" name="other"/>
+</configure>
+"""
+
+class TestLoadFormishZCML(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        import shutil
+        testing.tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, spec, cache_file=None):
+        from pyramid_formish.plan import load_formish_zcml
+        return load_formish_zcml(self.config, spec, cache_file)
+
+    def _write(self, name, text):
+        import os
+        filename = os.path.join(self.tempdir, name)
+        f = open(filename, 'w')
+        f.write(text)
+        f.close()
+        return filename
+
+    def _cacheFile(self):
+        import os
+        return os.path.join(self.tempdir, 'plan.json')
+
+    def _readCache(self):
+        import json
+        return json.load(open(self._cacheFile()))
+
+    def _render(self, name, params=None):
+        from pyramid.view import render_view_to_response
+        request = testing.DummyRequest()
+        if params is not None:
+            request.params = params
+        return render_view_to_response(None, request, name).body
+
+    def _assertRegistered(self, name='edit'):
+        self.assertEqual(self._render(name), 'display')
+        self.assertEqual(self._render(name, {'submit':'Submit'}), 'submitted')
+        self.assertEqual(self._render(name, {'cancel':'Cancel'}), 'cancelled')
+        self.assertEqual(self._render(name, {'__formish_validate__':'title'}),
+                         '{}')
+        self.failUnless('name="title"' in
+                        self._render(name, {'__formish_field__':'title'}))
+        self.failUnless('"title"' in
+                        self._render(name, {'__formish_schema__':'1'}))
+        self.assertEqual(self._render('forms'), 'one')
+        self.assertEqual(
+            self._render('forms', {'__formish_form__':'one',
+                                   'submit':'Submit'}),
+            'submitted')
+
+    def test_without_cache_file(self):
+        import os
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        self._callFUT(zcml)
+        self._assertRegistered()
+        self.assertEqual(os.listdir(self.tempdir), ['configure.zcml'])
+
+    def test_writes_plan(self):
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        self._callFUT(zcml, self._cacheFile())
+        self._assertRegistered()
+        cached = self._readCache()
+        self.assertEqual([ entry['directive'] for entry in cached['plan'] ],
+                         ['form', 'forms'])
+        self.assertEqual(cached['plan'][0]['validate_fields'], True)
+        self.assertEqual(cached['plan'][0]['render_fields'], True)
+        self.assertEqual(cached['plan'][0]['export_schema'], True)
+        self.assertEqual(cached['plan'][0]['result_cache_size'], 10)
+        self.assertEqual(cached['plan'][0]['result_cache_ttl'], 30)
+        filenames = [ filename for filename, digest in cached['files'] ]
+        self.failUnless(zcml in filenames)
+        self.failUnless([ f for f in filenames if f.endswith('meta.zcml') ])
+
+    def test_replays_plan(self):
+        import json
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        self._callFUT(zcml, self._cacheFile())
+        cached = self._readCache()
+        # a view name only present in the plan shows it was replayed
+        cached['plan'][0]['view_args']['name'] = 'replayed'
+        json.dump(cached, open(self._cacheFile(), 'w'))
+        testing.tearDown()
+        self.config = testing.setUp()
+        self._callFUT(zcml, self._cacheFile())
+        self._assertRegistered('replayed')
+
+    def test_setting(self):
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        self.config.registry.settings['formish.zcml_plan_cache'] = \
+            self._cacheFile()
+        self._callFUT(zcml)
+        self.assertEqual(len(self._readCache()['plan']), 2)
+
+    def test_changed_zcml(self):
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        self._callFUT(zcml, self._cacheFile())
+        testing.tearDown()
+        self.config = testing.setUp()
+        self._write('configure.zcml', FORMS_ZCML % {'name':'changed'})
+        self._callFUT(zcml, self._cacheFile())
+        self._assertRegistered('changed')
+        cached = self._readCache()
+        self.assertEqual(cached['plan'][0]['view_args']['name'], 'changed')
+
+    def test_other_spec(self):
+        zcml = self._write('configure.zcml', FORMS_ZCML % {'name':'edit'})
+        other = self._write('other.zcml', FORMS_ZCML % {'name':'other'})
+        self._callFUT(zcml, self._cacheFile())
+        testing.tearDown()
+        self.config = testing.setUp()
+        self._callFUT(other, self._cacheFile())
+        self._assertRegistered('other')
+
+    def test_not_formish_only(self):
+        import os
+        self._write('views.zcml', VIEW_ZCML)
+        zcml = self._write('configure.zcml', FORMS_ZCML.replace(
+            '</configure>', '<include file="views.zcml"/></configure>') %
+                           {'name':'edit'})
+        self._callFUT(zcml, self._cacheFile())
+        self._assertRegistered()
+        self.assertEqual(self._render('other'), 'other')
+        self.failIf(os.path.exists(self._cacheFile()))
+
+    def test_replays_template_path(self):
+        from pyramid_formish import IFormishSearchPath
+        from pyramid_formish.plan import replay
+        replay(self.config, [{'directive':'add_template_path',
+                              'path':'pyramid_formish.tests:fixtures',
+                              'package':'pyramid_formish'}])
+        search_path = self.config.registry.getUtility(IFormishSearchPath)
+        self.failUnless(search_path[0].endswith('fixtures'))
+
+class TestPlanRecorder(unittest.TestCase):
+    def _makeOne(self):
+        from pyramid_formish.plan import PlanRecorder
+        return PlanRecorder()
+
+    def test_template_path(self):
+        from pyramid_formish.zcml import add_template_path
+        import pyramid_formish.tests
+        recorder = self._makeOne()
+        context = DummyZCMLContext(pyramid_formish.tests)
+        context.registry.formish_plan_recorder = recorder
+        add_template_path(context, '/templates')
+        self.assertEqual(recorder.plan,
+                         [{'directive':'add_template_path',
+                           'path':'/templates',
+                           'package':'pyramid_formish.tests'}])
+        self.failUnless(recorder.files is context._seen_files)
+
+    def test_uncacheable(self):
+        from pyramid_formish.zcml import FormDirective
+        import pyramid_formish.tests
+        class Local(object):
+            pass
+        recorder = self._makeOne()
+        context = DummyZCMLContext(pyramid_formish.tests)
+        recorder.form(FormDirective(context, Local))
+        self.assertEqual(recorder.plan, [])
+        self.failIf(recorder.error is None)
+
+class TestCheckFormishOnly(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, text):
+        import os
+        from pyramid_formish.plan import check_formish_only
+        filename = os.path.join(self.tempdir, 'configure.zcml')
+        f = open(filename, 'w')
+        f.write(text)
+        f.close()
+        return check_formish_only(filename)
+
+    def test_formish_only(self):
+        self._callFUT(FORMS_ZCML % {'name':'edit'})
+
+    def test_other_directive(self):
+        from pyramid_formish.plan import Uncacheable
+        self.assertRaises(Uncacheable, self._callFUT, VIEW_ZCML)
+
+    def test_include_files(self):
+        from pyramid_formish.plan import Uncacheable
+        self.assertRaises(Uncacheable, self._callFUT,
+                          '<configure xmlns="http://namespaces.zope.org/zope">'
+                          '<include files="*.zcml"/></configure>')
+
+    def test_condition(self):
+        from pyramid_formish.plan import Uncacheable
+        self.assertRaises(Uncacheable, self._callFUT,
+                          '<configure xmlns="http://namespaces.zope.org/zope" '
+                          'xmlns:zcml="http://namespaces.zope.org/zcml">'
+                          '<include package="pyramid_formish" '
+                          'zcml:condition="have foo"/></configure>')
+
+class TestDottedName(unittest.TestCase):
+    def _callFUT(self, obj):
+        from pyramid_formish.plan import dotted_name
+        return dotted_name(obj)
+
+    def test_global(self):
+        self.assertEqual(self._callFUT(Controller),
+                         'pyramid_formish.tests.test_plan.Controller')
+
+    def test_none(self):
+        self.assertEqual(self._callFUT(None), None)
+
+    def test_local(self):
+        from pyramid_formish.plan import Uncacheable
+        class Controller(object):
+            pass
+        self.assertRaises(Uncacheable, self._callFUT, Controller)
+
+class Controller(object):
+    def __init__(self, context, request):
+        self.request = request
+    def form_fields(self):
+        import schemaish
+        return [('title', schemaish.String())]
+    def __call__(self):
+        from pyramid.response import Response
+        return Response('display')
+    def handle_submit(self, converted):
+        from pyramid.response import Response
+        return Response('submitted')
+
+def cancelled(controller, converted):
+    from pyramid.response import Response
+    return Response('cancelled')
+
+def forms_view(context, request):
+    from pyramid.response import Response
+    return Response(','.join([ form.name for form in request.forms ]))
+
+def other_view(context, request):
+    from pyramid.response import Response
+    return Response('other')
+
+class DummyZCMLContext(object):
+    def __init__(self, package):
+        self.package = package
+        self.registry = DummyRegistry()
+        self._seen_files = set()
+    def resolve(self, package_name):
+        return self.package
+    def action(self, **kw):
+        pass
+
+class DummyRegistry(object):
+    pass
@@ -0,0 +1,17 @@
+import unittest
+
+class TestSearchPath(unittest.TestCase):
+    def _callFUT(self, specs):
+        from pyramid_formish.precompile import search_path
+        return search_path(specs)
+
+    def test_default_last(self):
+        from pkg_resources import resource_filename
+        default = resource_filename('pyramid_formish', 'templates/zpt')
+        self.assertEqual(self._callFUT(['/a']), ['/a', default])
+
+    def test_package_spec(self):
+        from pkg_resources import resource_filename
+        fixtures = resource_filename('pyramid_formish.tests', 'fixtures')
+        result = self._callFUT(['pyramid_formish.tests:fixtures'])
+        self.assertEqual(result[0], fixtures)
@@ -0,0 +1,99 @@
+import unittest
+from pyramid import testing
+
+class DummyFieldStorage(object):
+    def __init__(self, data, filename='upload.txt', type='text/plain'):
+        import tempfile
+        self.file = tempfile.TemporaryFile()
+        self.file.write(data)
+        self.file.seek(0)
+        self.filename = filename
+        self.type = type
+
+class TestSpooledFileUpload(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.config = testing.setUp()
+        self.spool_dir = tempfile.mkdtemp()
+        self.dest_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.spool_dir)
+        shutil.rmtree(self.dest_dir)
+        testing.tearDown()
+
+    def _makeForm(self, **kw):
+        import schemaish
+        from pyramid_formish import Form
+        from pyramid_formish.uploads import SpooledFileUpload
+        schema = schemaish.Structure()
+        schema.add('upload', schemaish.File())
+        form = Form(schema, name='form')
+        form['upload'].widget = SpooledFileUpload(spool_dir=self.spool_dir,
+                                                  **kw)
+        return form
+
+    def _submit(self, form, data=None, name=''):
+        from webob.multidict import MultiDict
+        post = MultiDict({'upload.name':name, 'upload.default':'',
+                          'upload.mimetype':''})
+        if data is not None:
+            post['upload.file'] = DummyFieldStorage(data)
+        request = testing.DummyRequest()
+        request.POST = request.params = post
+        request.method = 'POST'
+        return form.validate(request, check_form_name=False)
+
+    def test_spools(self):
+        import os
+        from pyramid_formish.uploads import SpooledFile
+        form = self._makeForm()
+        upload = self._submit(form, 'hello')['upload']
+        self.failUnless(isinstance(upload, SpooledFile))
+        self.assertEqual(upload.filename, 'upload.txt')
+        self.assertEqual(upload.mimetype, 'text/plain')
+        self.assertEqual(upload.size, 5)
+        self.assertEqual(os.path.dirname(upload.path), self.spool_dir)
+        self.assertEqual(upload.file.read(), 'hello')
+        destination = os.path.join(self.dest_dir, 'hello.txt')
+        upload.move_to(destination)
+        self.assertEqual(open(destination).read(), 'hello')
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_resubmitted(self):
+        form = self._makeForm()
+        self._submit(form, 'hello')
+        name = form._request_data['upload']['name'][0]
+        upload = self._submit(self._makeForm(), name=name)['upload']
+        self.assertEqual(upload.file.read(), 'hello')
+        upload.discard()
+
+    def test_bad_key(self):
+        form = self._makeForm()
+        self.assertEqual(self._submit(form, name='@spool/../../etc')['upload'],
+                         None)
+
+    def test_too_large(self):
+        import os
+        from formish.validation import FormError
+        form = self._makeForm(max_size=4)
+        self.assertRaises(FormError, self._submit, form, 'hello')
+        self.assertEqual(form.errors['upload'], 'File is larger than 4 bytes')
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_too_large_while_copying(self):
+        import os
+        from StringIO import StringIO
+        from pyramid_formish.uploads import SpooledFileUpload
+        from pyramid_formish.uploads import UploadTooLarge
+        widget = SpooledFileUpload(spool_dir=self.spool_dir, max_size=4)
+        fieldstorage = DummyFieldStorage('')
+        fieldstorage.file = StringIO('hello')
+        self.assertRaises(UploadTooLarge, widget.spool, fieldstorage)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_spool_dir_setting(self):
+        from pyramid_formish.uploads import SpooledFileUpload
+        self.config.registry.settings['formish.upload_spool_dir'] = '/spool'
+        self.assertEqual(SpooledFileUpload().get_spool_dir(), '/spool')
@@ -0,0 +1,200 @@
+import unittest
+from pyramid import testing
+
+def make_check(name, seen=None, delay=0):
+    import time
+    import validatish
+    from pyramid_formish.validators import io_bound
+    @io_bound
+    def check(value):
+        if delay:
+            time.sleep(delay)
+        if seen is not None:
+            seen.append(value)
+        if value == 'taken':
+            raise validatish.Invalid('%s is taken' % name)
+    return check
+
+class TestIOBound(unittest.TestCase):
+    def test_runs_outside_submission(self):
+        import validatish
+        check = make_check('name')
+        check('free')
+        self.assertRaises(validatish.Invalid, check, 'taken')
+
+class TestIterChecks(unittest.TestCase):
+    def _callFUT(self, attr, value):
+        from pyramid_formish.validators import iter_checks
+        return list(iter_checks(attr, value))
+
+    def test_nested(self):
+        import schemaish
+        import validatish
+        name = make_check('name')
+        email = make_check('email')
+        item = schemaish.Structure()
+        item.add('email', schemaish.String(validator=email))
+        schema = schemaish.Structure()
+        schema.add('name', schemaish.String(
+            validator=validatish.All(validatish.Required(), name)))
+        schema.add('title', schemaish.String(
+            validator=validatish.Required()))
+        schema.add('items', schemaish.Sequence(item))
+        value = {'name':'a', 'title':'b',
+                 'items':[{'email':'c'}, {'email':'d'}]}
+        self.assertEqual(self._callFUT(schema, value),
+                         [('name', name, 'a'),
+                          ('items.0.email', email, 'c'),
+                          ('items.1.email', email, 'd')])
+
+    def test_none(self):
+        import schemaish
+        schema = schemaish.Structure()
+        schema.add('items', schemaish.Sequence(schemaish.String()))
+        self.assertEqual(self._callFUT(schema, {'items':None}), [])
+
+class TestDeferredValidators(unittest.TestCase):
+    def _callFUT(self, attr):
+        from pyramid_formish.validators import deferred_validators
+        return deferred_validators(attr)
+
+    def test_it(self):
+        import schemaish
+        import validatish
+        direct = make_check('direct')
+        combined = make_check('combined')
+        alternative = make_check('alternative')
+        nested = make_check('nested')
+        item = schemaish.Structure()
+        item.add('nested', schemaish.String(validator=nested))
+        schema = schemaish.Structure()
+        schema.add('direct', schemaish.String(validator=direct))
+        schema.add('combined', schemaish.String(
+            validator=validatish.All(validatish.Required(), combined)))
+        schema.add('alternative', schemaish.String(
+            validator=validatish.All(validatish.Required(), validatish.Any(
+                validatish.Email(), alternative))))
+        schema.add('items', schemaish.Sequence(item))
+        self.assertEqual(self._callFUT(schema),
+                         set([id(direct), id(combined), id(nested)]))
+
+    def test_also_inside_any(self):
+        import schemaish
+        import validatish
+        check = make_check('check')
+        schema = schemaish.Structure()
+        schema.add('one', schemaish.String(validator=check))
+        schema.add('two', schemaish.String(
+            validator=validatish.Any(validatish.Email(), check)))
+        self.assertEqual(self._callFUT(schema), set())
+
+class TestRunChecks(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp(
+            settings={'formish.validator_threads':'3'})
+
+    def tearDown(self):
+        pool = getattr(self.config.registry, 'formish_validator_pool', None)
+        if pool is not None:
+            pool.terminate()
+        testing.tearDown()
+
+    def _callFUT(self, checks):
+        from pyramid_formish.validators import run_checks
+        return run_checks(checks)
+
+    def test_concurrent(self):
+        import time
+        check = make_check('name', delay=0.1)
+        checks = [ ('f%s' % i, check, 'taken') for i in range(3) ]
+        start = time.time()
+        errors = self._callFUT(checks)
+        self.failUnless(time.time() - start < 0.25)
+        self.assertEqual(sorted(errors.keys()), ['f0', 'f1', 'f2'])
+        self.assertEqual(self.config.registry.formish_validator_pool._processes,
+                         3)
+
+    def test_threadlocals(self):
+        from pyramid.threadlocal import get_current_registry
+        from pyramid_formish.validators import io_bound
+        registries = []
+        @io_bound
+        def check(value):
+            registries.append(get_current_registry())
+        self._callFUT([('a', check, 1), ('b', check, 2)])
+        self.assertEqual(registries, [self.config.registry] * 2)
+
+class TestSubmitted(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        pool = getattr(self.config.registry, 'formish_validator_pool', None)
+        if pool is not None:
+            pool.terminate()
+        testing.tearDown()
+
+    def _submit(self, post, seen, fields=None):
+        import schemaish
+        import validatish
+        from webob.multidict import MultiDict
+        from pyramid.response import Response
+        from pyramid_formish.zcml import FormAction
+        from pyramid_formish.zcml import FormView
+        name = make_check('name', seen)
+        email = make_check('email', seen)
+        class Controller(object):
+            def __init__(self, context, request):
+                self.request = request
+            def form_fields(self):
+                if fields is not None:
+                    return fields
+                return [('name', schemaish.String(validator=name)),
+                        ('email', schemaish.String(validator=validatish.All(
+                            validatish.Required(), email)))]
+            def __call__(self):
+                return Response('display')
+            def handle_submit(self, converted):
+                return Response('submitted')
+        action = FormAction('submit')
+        view = FormView(Controller, action, [action], 'form')
+        request = testing.DummyRequest()
+        post['submit'] = 'Submit'
+        request.POST = request.params = MultiDict(post)
+        request.method = 'POST'
+        return view(None, request), request.form
+
+    def test_valid(self):
+        seen = []
+        response, form = self._submit({'name':'a', 'email':'b'}, seen)
+        self.assertEqual(response.body, 'submitted')
+        self.assertEqual(sorted(seen), ['a', 'b'])
+
+    def test_errors_merged(self):
+        seen = []
+        response, form = self._submit({'name':'taken', 'email':'taken'},
+                                      seen)
+        self.assertEqual(response.body, 'display')
+        self.assertEqual(sorted(form.errors.keys()), ['email', 'name'])
+        self.assertEqual(str(form['name'].error), 'name is taken')
+
+    def test_inside_any_run_inline(self):
+        import schemaish
+        import validatish
+        seen = []
+        name = make_check('name', seen)
+        fields = [('name', schemaish.String(validator=validatish.Any(
+            validatish.Email(), name)))]
+        response, form = self._submit({'name':'taken'}, seen, fields)
+        self.assertEqual(response.body, 'display')
+        self.failUnless('name' in form.errors)
+        self.assertEqual(seen, ['taken'])
+        response, form = self._submit({'name':'free'}, seen, fields)
+        self.assertEqual(response.body, 'submitted')
+        self.assertEqual(seen, ['taken', 'free'])
+
+    def test_not_run_when_invalid(self):
+        seen = []
+        response, form = self._submit({'name':'taken', 'email':''}, seen)
+        self.assertEqual(response.body, 'display')
+        self.assertEqual(seen, [])
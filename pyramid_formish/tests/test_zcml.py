@@ -73,6 +73,163 @@ class FormsDirectiveTests(unittest.TestCase):
         self.assertEqual(display.body, 'response')
         self.assertEqual(len(request.forms), 1)
 
+    def test_after_builds_only_submitted_form(self):
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = self._makeOne(context, view=None)
+        created = []
+        def make_formdef(form_id):
+            formdef = DummyFormDirective()
+            formdef.form_id = form_id
+            factory = formdef.controller
+            def controller(context, request):
+                created.append(form_id)
+                return factory(context, request)
+            formdef.controller = controller
+            return formdef
+        directive.forms = [make_formdef('one'), make_formdef('two')]
+        directive.actions = []
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_form__':'two', 'submit':True}
+        display = render_view_to_response(None, request, '')
+        self.assertEqual(display.body, 'submitted')
+        self.assertEqual(created, ['two'])
+        self.assertEqual([ f.name for f in request.forms ], ['one', 'two'])
+        self.assertEqual(created, ['two', 'one'])
+
+    def test_after_duplicate_form_id(self):
+        # as when submissions were dispatched by looping over the forms,
+        # a later form with the same id is submitted by its own actions
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormAction
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = self._makeOne(context, view=None)
+        one = DummyFormDirective()
+        one.form_id = 'one'
+        duplicate = DummyFormDirective()
+        duplicate.form_id = 'one'
+        duplicate._actions = [FormAction('cancel', validate=False)]
+        directive.forms = [one, duplicate]
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_form__':'one', 'cancel':True}
+        display = render_view_to_response(None, request, '')
+        self.assertEqual(display.body, 'cancelled')
+
+    def test_after_first_declared_action_wins(self):
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormAction
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = self._makeOne(context, view=None)
+        formdef = DummyFormDirective()
+        formdef._actions = [FormAction('cancel', validate=False),
+                            FormAction('submit')]
+        directive.forms = [formdef]
+        directive.actions = []
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_form__':'form_id', 'submit':True,
+                          'cancel':True}
+        display = render_view_to_response(None, request, '')
+        self.assertEqual(display.body, 'cancelled')
+
+class TestDispatchTable(unittest.TestCase):
+    def _callFUT(self, formdefs):
+        from pyramid_formish.zcml import dispatch_table
+        return dispatch_table(formdefs)
+
+    def test_it(self):
+        from pyramid_formish.zcml import FormAction
+        one = DummyFormDirective()
+        one.form_id = 'one'
+        one._actions = [FormAction('submit'), FormAction('cancel')]
+        two = DummyFormDirective()
+        two.form_id = 'two'
+        two._actions = [FormAction('submit')]
+        table, action_names = self._callFUT([one, two])
+        self.assertEqual(action_names, {'one':['submit', 'cancel'],
+                                        'two':['submit']})
+        self.assertEqual(table, {('one', 'submit'):(0, one._actions[0]),
+                                 ('one', 'cancel'):(0, one._actions[1]),
+                                 ('two', 'submit'):(1, two._actions[0])})
+
+    def test_duplicate_form_id(self):
+        from pyramid_formish.zcml import FormAction
+        one = DummyFormDirective()
+        one.form_id = 'one'
+        one._actions = [FormAction('submit')]
+        duplicate = DummyFormDirective()
+        duplicate.form_id = 'one'
+        duplicate._actions = [FormAction('submit'), FormAction('cancel')]
+        table, action_names = self._callFUT([one, duplicate])
+        self.assertEqual(action_names, {'one':['submit', 'cancel']})
+        self.assertEqual(table,
+                         {('one', 'submit'):(0, one._actions[0]),
+                          ('one', 'cancel'):(1, duplicate._actions[1])})
+
+    def test_empty(self):
+        self.assertEqual(self._callFUT([]), ({}, {}))
+
+class TestLazyForms(unittest.TestCase):
+    def setUp(self):
+        testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _makeOne(self, formdefs):
+        from pyramid_formish.zcml import LazyForms
+        return LazyForms(formdefs, None, testing.DummyRequest())
+
+    def _makeFormdefs(self, *form_ids):
+        formdefs = []
+        for form_id in form_ids:
+            formdef = DummyFormDirective()
+            formdef.form_id = form_id
+            formdefs.append(formdef)
+        return formdefs
+
+    def test_len_builds_nothing(self):
+        forms = self._makeOne(self._makeFormdefs('one', 'two'))
+        self.assertEqual(len(forms), 2)
+        self.assertEqual(forms.forms, {})
+
+    def test_getitem_builds_once(self):
+        formdefs = self._makeFormdefs('one', 'two')
+        forms = self._makeOne(formdefs)
+        form = forms[1]
+        self.assertEqual(form.name, 'two')
+        self.assertEqual(form.bfg_actions, formdefs[1]._actions)
+        self.failUnless(forms[1] is form)
+        self.failUnless(forms[-1] is form)
+        self.assertEqual(forms.forms.keys(), [1])
+
+    def test_getitem_out_of_range(self):
+        forms = self._makeOne(self._makeFormdefs('one'))
+        self.assertRaises(IndexError, forms.__getitem__, 1)
+        self.assertRaises(IndexError, forms.__getitem__, -2)
+
+    def test_slice(self):
+        forms = self._makeOne(self._makeFormdefs('one', 'two', 'three'))
+        self.assertEqual([ f.name for f in forms[1:] ], ['two', 'three'])
+
+    def test_iter(self):
+        forms = self._makeOne(self._makeFormdefs('one', 'two'))
+        self.assertEqual([ f.name for f in forms ], ['one', 'two'])
+
 class FormDirectiveTests(unittest.TestCase):
     def setUp(self):
         self.config = testing.setUp()
@@ -129,7 +286,39 @@ class FormDirectiveTests(unittest.TestCase):
         context.forms = []
         inst = self._makeOne(context, None, method='GET')
         self.assertEqual(inst.method, 'GET')
-        
+
+    def test_render_cache_size(self):
+        from pyramid_formish import RenderCache
+        context = DummyZCMLContext()
+        context.forms = []
+        inst = self._makeOne(context, None)
+        self.assertEqual(inst.render_cache, None)
+        inst = self._makeOne(context, None, render_cache_size=10)
+        self.failUnless(isinstance(inst.render_cache, RenderCache))
+        self.assertEqual(inst.render_cache.renderings.maxsize, 10)
+
+    def test_result_cache_size(self):
+        from pyramid_formish import DEFAULT_RESULT_CACHE_TTL
+        from pyramid_formish import ResultCache
+        context = DummyZCMLContext()
+        context.forms = []
+        inst = self._makeOne(context, None, method='GET')
+        self.assertEqual(inst.result_cache, None)
+        inst = self._makeOne(context, None, method='GET',
+                             result_cache_size=10)
+        self.failUnless(isinstance(inst.result_cache, ResultCache))
+        self.assertEqual(inst.result_cache.results.maxsize, 10)
+        self.assertEqual(inst.result_cache.ttl, DEFAULT_RESULT_CACHE_TTL)
+        inst = self._makeOne(context, None, method='GET',
+                             result_cache_size=10, result_cache_ttl=5)
+        self.assertEqual(inst.result_cache.ttl, 5)
+
+    def test_result_cache_size_POST(self):
+        from zope.configuration.exceptions import ConfigurationError
+        context = DummyZCMLContext()
+        context.forms = []
+        self.assertRaises(ConfigurationError, self._makeOne, context, None,
+                          result_cache_size=10)
 
 class ActionDirectiveTests(unittest.TestCase):
     def setUp(self):
@@ -165,11 +354,156 @@ class ActionDirectiveTests(unittest.TestCase):
         self.assertEqual(action.title, 'Name')
     
 class TestFormView(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
     def _makeOne(self, controller_factory, action, actions, form_id=None,
-                 method='POST'):
+                 method='POST', render_cache=None, result_cache=None,
+                 wrapper=None):
         from pyramid_formish.zcml import FormView
         return FormView(controller_factory, action, actions, form_id=form_id,
-                        method=method)
+                        method=method, render_cache=render_cache,
+                        result_cache=result_cache, wrapper=wrapper)
+
+    def test_render_cache(self):
+        from pyramid_formish.zcml import FormAction
+        from pyramid_formish import RenderCache
+        action = FormAction(None)
+        factory = make_controller_factory()
+        cache = RenderCache()
+        view = self._makeOne(factory, action, [], render_cache=cache)
+        request = testing.DummyRequest()
+        view(testing.DummyModel(), request)
+        self.failUnless(request.form.render_cache is cache)
+
+    def _makeConditionalView(self, version='v1', last_modified=None,
+                             result=None, wrapper=None):
+        from pyramid_formish.zcml import FormAction
+        factory = make_controller_factory()
+        class VersionedController(factory):
+            built = []
+            def form_fields(self):
+                self.built.append(True)
+                return factory.form_fields(self)
+            def form_version(self):
+                return version
+            def form_last_modified(self):
+                return last_modified
+            if result is not None:
+                def __call__(self):
+                    return result
+        view = self._makeOne(VersionedController, FormAction(None), [],
+                             wrapper=wrapper)
+        return view, VersionedController.built
+
+    def _makeConditionalRequest(self, **headers):
+        from pyramid.request import Request
+        request = Request.blank('/', headers=headers)
+        request.registry = self.config.registry
+        return request
+
+    def test_conditional_sets_validators(self):
+        import datetime
+        view, built = self._makeConditionalView(
+            last_modified=datetime.datetime(2011, 8, 1, 12, 0, 0, 5))
+        response = view(None, self._makeConditionalRequest())
+        self.assertEqual(response.body, '123')
+        self.assertEqual(response.headers['ETag'], '"v1"')
+        self.assertEqual(response.headers['Last-Modified'],
+                         'Mon, 01 Aug 2011 12:00:00 GMT')
+        self.assertEqual(built, [True])
+
+    def test_conditional_if_none_match(self):
+        view, built = self._makeConditionalView()
+        request = self._makeConditionalRequest(**{'If-None-Match':'"v1"'})
+        response = view(None, request)
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.headers['ETag'], '"v1"')
+        self.assertEqual(built, [])
+        self.failIf(hasattr(request, 'form'))
+
+    def test_conditional_if_none_match_changed(self):
+        view, built = self._makeConditionalView(version=2)
+        request = self._makeConditionalRequest(**{'If-None-Match':'"1"'})
+        response = view(None, request)
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.headers['ETag'], '"2"')
+
+    def test_conditional_if_none_match_precedes_if_modified_since(self):
+        import datetime
+        view, built = self._makeConditionalView(
+            version='v2', last_modified=datetime.datetime(2011, 8, 1))
+        request = self._makeConditionalRequest(**{
+            'If-None-Match':'"v1"',
+            'If-Modified-Since':'Tue, 02 Aug 2011 00:00:00 GMT'})
+        self.assertEqual(view(None, request).status_int, 200)
+
+    def test_conditional_if_modified_since(self):
+        import datetime
+        view, built = self._makeConditionalView(
+            version=None,
+            last_modified=datetime.datetime(2011, 8, 1, 12, 0, 0, 5))
+        request = self._makeConditionalRequest(**{
+            'If-Modified-Since':'Mon, 01 Aug 2011 12:00:00 GMT'})
+        response = view(None, request)
+        self.assertEqual(response.status_int, 304)
+        self.failIf('ETag' in response.headers)
+        request = self._makeConditionalRequest(**{
+            'If-Modified-Since':'Mon, 01 Aug 2011 11:59:59 GMT'})
+        self.assertEqual(view(None, request).status_int, 200)
+
+    def test_conditional_not_get(self):
+        view, built = self._makeConditionalView()
+        request = self._makeConditionalRequest(**{'If-None-Match':'"v1"'})
+        request.method = 'POST'
+        self.assertEqual(view(None, request).status_int, 200)
+
+    def test_conditional_wrapped(self):
+        view, built = self._makeConditionalView(wrapper='wrap')
+        request = self._makeConditionalRequest(**{'If-None-Match':'"v1"'})
+        response = view(None, request)
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, '123')
+        self.failIf('ETag' in response.headers)
+        self.assertEqual(built, [True])
+
+    def test_conditional_wrapped_registered(self):
+        from pyramid.response import Response
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormDirective
+        view, built = self._makeConditionalView()
+        def wrap(context, request):
+            return Response('<%s>' % request.wrapped_body)
+        self.config.add_view(wrap, name='wrap')
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = FormDirective(context, view.controller_factory,
+                                  name='edit', wrapper='wrap')
+        directive.after()
+        request = self._makeConditionalRequest(**{'If-None-Match':'"v1"'})
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, '<123>')
+
+    def test_conditional_rendered_result(self):
+        view, built = self._makeConditionalView(result={'a':1})
+        request = self._makeConditionalRequest()
+        self.assertEqual(view(None, request), {'a':1})
+        self.assertEqual(request.response.headers['ETag'], '"v1"')
+
+    def test_unconditional(self):
+        from pyramid_formish.zcml import FormAction
+        view = self._makeOne(make_controller_factory(), FormAction(None), [])
+        request = self._makeConditionalRequest(**{'If-None-Match':'"v1"'})
+        response = view(None, request)
+        self.assertEqual(response.status_int, 200)
+        self.failIf('ETag' in response.headers)
 
     def test_noname(self):
         import schemaish
@@ -226,6 +560,59 @@ class TestFormView(unittest.TestCase):
         self.assertEqual(result, 'success')
         self.assertEqual(L, [{'title':None}])
 
+    def _makeSearchView(self, result_cache, exception=None):
+        import schemaish
+        from pyramid_formish.zcml import FormAction
+        action = FormAction('submit', 'submit', True)
+        factory = make_controller_factory(
+            fields=[('title', schemaish.String())], exception=exception)
+        calls = []
+        class CountingController(factory):
+            def handle_submit(self, converted):
+                calls.append(converted)
+                return factory.handle_submit(self, converted)
+        view = self._makeOne(CountingController, action, [action],
+                             method='GET', result_cache=result_cache)
+        return view, calls
+
+    def _makeSearchRequest(self, title, path='/search', extra=''):
+        from pyramid.request import Request
+        request = Request.blank('%s?submit=1&title=%s%s' % (path, title,
+                                                            extra))
+        request.registry = self.config.registry
+        return request
+
+    def test_result_cache(self):
+        from pyramid_formish import ResultCache
+        view, calls = self._makeSearchView(ResultCache())
+        first = view(None, self._makeSearchRequest('a'))
+        second = view(None, self._makeSearchRequest('a'))
+        self.assertEqual(second.body, 'submitted')
+        self.failIf(first is second)
+        self.assertEqual(calls, [{'title':'a'}])
+        view(None, self._makeSearchRequest('b'))
+        view(None, self._makeSearchRequest('a', '/other'))
+        self.assertEqual(len(calls), 3)
+
+    def test_result_cache_keyed_on_extra_params(self):
+        from pyramid_formish import ResultCache
+        view, calls = self._makeSearchView(ResultCache())
+        view(None, self._makeSearchRequest('a', extra='&page=2'))
+        view(None, self._makeSearchRequest('a', extra='&page=2'))
+        view(None, self._makeSearchRequest('a', extra='&page=3'))
+        self.assertEqual(len(calls), 2)
+
+    def test_result_cache_not_storing_errors(self):
+        from pyramid_formish import ResultCache
+        from pyramid_formish import ValidationError
+        cache = ResultCache()
+        view, calls = self._makeSearchView(
+            cache, exception=ValidationError(title='a'))
+        view(None, self._makeSearchRequest('a'))
+        view(None, self._makeSearchRequest('a'))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(cache.results), 0)
+
     def test_validate_no_error(self):
         import schemaish
         from pyramid_formish.zcml import FormAction
@@ -329,17 +716,453 @@ class TestFormView(unittest.TestCase):
         result = view(context, request)
         self.assertEqual(result.body, '123')
 
+class TestFormFromController(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, controller, form_id='form_id', actions=(),
+                 method='POST'):
+        from pyramid_formish.zcml import form_from_controller
+        return form_from_controller(controller, form_id, actions, method)
+
+    def _makeController(self, static=False):
+        import schemaish
+        factory = make_controller_factory(
+            fields=[('title', schemaish.String())],
+            defaults={'title':'the title'})
+        class CountingController(factory):
+            static_form = static
+            calls = []
+            def form_fields(self):
+                self.calls.append('fields')
+                return factory.form_fields(self)
+            def form_widgets(self, fields):
+                self.calls.append('widgets')
+                return factory.form_widgets(self, fields)
+        return CountingController
+
+    def test_nonstatic_rebuilds_schema(self):
+        factory = self._makeController()
+        self._callFUT(factory(None, None))
+        self._callFUT(factory(None, None))
+        self.assertEqual(factory.calls, ['fields', 'widgets'] * 2)
+
+    def test_nonstatic_builds_own_definition(self):
+        from pyramid_formish.zcml import FormAction
+        factory = self._makeController()
+        actions = [FormAction('submit', 'Submit')]
+        form1 = self._callFUT(factory(None, None), actions=actions)
+        form2 = self._callFUT(factory(None, None), actions=actions)
+        self.failIf(form1._shared_item_data or form1._shared_actions)
+        self.failIf(form1.item_data is form2.item_data)
+        self.failIf(form1._actions is form2._actions)
+        self.assertEqual([a.name for a in form2._actions], ['submit'])
+        self.assertEqual(dict(form2.defaults), {'title':'the title'})
+        self.failIf(hasattr(self.config.registry, 'formish_blueprints'))
+
+    def test_static_reuses_schema(self):
+        from pyramid_formish.zcml import FormAction
+        factory = self._makeController(static=True)
+        actions = [FormAction('submit', 'Submit')]
+        form1 = self._callFUT(factory(None, None), actions=actions)
+        form2 = self._callFUT(factory(None, None), actions=actions)
+        self.assertEqual(factory.calls, ['fields', 'widgets'])
+        self.failIf(form1 is form2)
+        self.failUnless(form1.structure.attr is form2.structure.attr)
+        self.assertEqual([a.name for a in form2._actions], ['submit'])
+        self.assertEqual(dict(form2.defaults), {'title':'the title'})
+
+    def test_static_keyed_on_form_id_and_method(self):
+        factory = self._makeController(static=True)
+        self._callFUT(factory(None, None), form_id='one')
+        self._callFUT(factory(None, None), form_id='two')
+        self._callFUT(factory(None, None), form_id='two', method='GET')
+        self.assertEqual(factory.calls, ['fields', 'widgets'] * 3)
+
+    def test_static_keyed_on_action_values(self):
+        from pyramid_formish.zcml import FormAction
+        factory = self._makeController(static=True)
+        self._callFUT(factory(None, None),
+                      actions=[FormAction('submit', 'Submit')])
+        self._callFUT(factory(None, None),
+                      actions=[FormAction('submit', 'Submit')])
+        self.assertEqual(factory.calls, ['fields', 'widgets'])
+        self._callFUT(factory(None, None),
+                      actions=[FormAction('submit', 'Search')])
+        self.assertEqual(factory.calls, ['fields', 'widgets'] * 2)
+
+    def test_static_kept_on_registry(self):
+        factory = self._makeController(static=True)
+        self._callFUT(factory(None, None))
+        testing.tearDown()
+        testing.setUp()
+        self._callFUT(factory(None, None))
+        self.assertEqual(factory.calls, ['fields', 'widgets'] * 2)
+
+    def test_static_binds_controller(self):
+        factory = self._makeController(static=True)
+        controller = factory(None, None)
+        self._callFUT(factory(None, None))
+        form = self._callFUT(controller)
+        self.failUnless(form.controller is controller)
+
+    def test_static_shares_definition(self):
+        from pyramid_formish.zcml import FormAction
+        factory = self._makeController(static=True)
+        actions = [FormAction('submit', 'Submit')]
+        form1 = self._callFUT(factory(None, None), actions=actions)
+        form2 = self._callFUT(factory(None, None), actions=actions)
+        self.failUnless(form1.item_data is form2.item_data)
+        self.failUnless(form1._actions is form2._actions)
+
+    def test_static_fingerprint_of_blueprint(self):
+        from pyramid_formish.zcml import FormAction
+        factory = self._makeController(static=True)
+        actions = [FormAction('submit', 'Submit')]
+        form1 = self._callFUT(factory(None, None), actions=actions)
+        form2 = self._callFUT(factory(None, None), actions=actions)
+        other = self._callFUT(factory(None, None), form_id='other',
+                              actions=actions)
+        self.failUnless(form1._shared_token)
+        self.assertEqual(form1._shared_token, form2._shared_token)
+        self.assertNotEqual(form1._shared_token, other._shared_token)
+        self.assertEqual(form1.fingerprint(), form2.fingerprint())
+
+    def test_static_allocations(self):
+        # a form bound from a shared definition holds no objects per field
+        import gc
+        import schemaish
+        from pyramid_formish.zcml import FormAction
+        fields = [ ('field%s' % i, schemaish.String()) for i in range(200) ]
+        factory = make_controller_factory(fields=fields)
+        class Controller(factory):
+            static_form = True
+        actions = [FormAction('submit', 'Submit')]
+        self._callFUT(Controller(None, None), actions=actions)
+        controller = Controller(None, None)
+        gc.collect()
+        before = len(gc.get_objects())
+        form = self._callFUT(controller, actions=actions)
+        # as rendering the form does
+        for field in form.allfields:
+            field.widget
+        gc.collect()
+        allocated = len(gc.get_objects()) - before
+        self.failUnless(allocated < len(fields) / 10, allocated)
+
+class TestFieldView(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _makeOne(self, controller_factory, actions=(), form_id='form',
+                 render_cache=None):
+        from pyramid_formish.zcml import FieldView
+        return FieldView(controller_factory, actions, form_id,
+                         render_cache=render_cache)
+
+    def _makeFactory(self):
+        import schemaish
+        address = schemaish.Structure()
+        address.add('city', schemaish.String())
+        fields = [('title', schemaish.String()), ('address', address)]
+        return make_controller_factory(fields=fields,
+                                       defaults={'title':'the title'},
+                                       result='display')
+
+    def _makeRequest(self, method='GET', **params):
+        from pyramid.request import Request
+        request = Request.blank('/', method=method)
+        request.registry = self.config.registry
+        if method == 'POST':
+            request.POST.update(params)
+        else:
+            request.GET.update(params)
+        return request
+
+    def test_field(self):
+        view = self._makeOne(self._makeFactory())
+        response = view(None, self._makeRequest(__formish_field__='title'))
+        self.failUnless('value="the title"' in response.body)
+        self.failIf('name="address.city"' in response.body)
+        self.failIf('<form' in response.body)
+
+    def test_structure(self):
+        view = self._makeOne(self._makeFactory())
+        request = self._makeRequest(__formish_field__='address')
+        response = view(None, request)
+        self.failUnless('name="address.city"' in response.body)
+        self.failIf('name="title"' in response.body)
+        self.assertEqual(request.form.name, 'form')
+
+    def test_submitted_data(self):
+        view = self._makeOne(self._makeFactory())
+        request = self._makeRequest('POST', __formish_field__='title',
+                                    __formish_form__='form', title='new')
+        response = view(None, request)
+        self.failUnless('value="new"' in response.body)
+
+    def test_other_form_submitted(self):
+        view = self._makeOne(self._makeFactory())
+        request = self._makeRequest('POST', __formish_field__='title',
+                                    __formish_form__='other', title='new')
+        response = view(None, request)
+        self.failUnless('value="the title"' in response.body)
+
+    def test_no_form_id(self):
+        view = self._makeOne(self._makeFactory(), form_id=None)
+        response = view(None, self._makeRequest(__formish_field__='title'))
+        self.failUnless('value="the title"' in response.body)
+
+    def test_no_form_id_submitted_data(self):
+        view = self._makeOne(self._makeFactory(), form_id=None)
+        request = self._makeRequest('POST', __formish_field__='title',
+                                    title='new')
+        response = view(None, request)
+        self.failUnless('value="new"' in response.body)
+
+    def test_missing(self):
+        view = self._makeOne(self._makeFactory())
+        response = view(None, self._makeRequest(__formish_field__='missing'))
+        self.assertEqual(response.status_int, 404)
+
+    def test_registered_by_directive(self):
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormDirective
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = FormDirective(context, self._makeFactory(),
+                                  name='edit', form_id='form',
+                                  render_fields=True)
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_field__':'title'}
+        response = render_view_to_response(None, request, 'edit')
+        self.failUnless('value="the title"' in response.body)
+        response = render_view_to_response(None, testing.DummyRequest(),
+                                           'edit')
+        self.assertEqual(response.body, 'display')
+
+class TestSchemaView(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _makeOne(self, controller_factory, actions=(), form_id='form'):
+        from pyramid_formish.zcml import SchemaView
+        return SchemaView(controller_factory, actions, form_id)
+
+    def _makeFactory(self, static=False):
+        import schemaish
+        import validatish
+        fields = [('title', schemaish.String(validator=validatish.Required()))]
+        factory = make_controller_factory(fields=fields)
+        class Controller(factory):
+            static_form = static
+            calls = []
+            def form_fields(self):
+                self.calls.append('fields')
+                return factory.form_fields(self)
+        return Controller
+
+    def _makeRequest(self, **headers):
+        from pyramid.request import Request
+        request = Request.blank('/?__formish_schema__=1', headers=headers)
+        request.registry = self.config.registry
+        return request
+
+    def test_static(self):
+        import json
+        factory = self._makeFactory(static=True)
+        view = self._makeOne(factory)
+        response = view(None, self._makeRequest())
+        self.assertEqual(response.content_type, 'application/json')
+        body = json.loads(response.body)
+        self.assertEqual(body['fields'][0]['validator'], {'type':'required'})
+        self.assertEqual(response.cache_control.max_age, 86400)
+        self.failUnless(response.cache_control.public)
+        self.failUnless(response.etag)
+        view(None, self._makeRequest())
+        self.assertEqual(factory.calls, ['fields'])
+
+    def test_max_age_setting(self):
+        self.config.registry.settings['formish.schema_max_age'] = '60'
+        view = self._makeOne(self._makeFactory(static=True))
+        response = view(None, self._makeRequest())
+        self.assertEqual(response.cache_control.max_age, 60)
+
+    def test_not_static(self):
+        factory = self._makeFactory()
+        view = self._makeOne(factory)
+        response = view(None, self._makeRequest())
+        self.failUnless(response.cache_control.no_cache)
+        self.failUnless(response.cache_control.private)
+        view(None, self._makeRequest())
+        self.assertEqual(factory.calls, ['fields', 'fields'])
+
+    def test_if_none_match(self):
+        view = self._makeOne(self._makeFactory(static=True))
+        etag = view(None, self._makeRequest()).etag
+        response = view(None, self._makeRequest(**{'If-None-Match':
+                                                   '"%s"' % etag}))
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.etag, etag)
+
+    def test_registered_by_directive(self):
+        import json
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormDirective
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = FormDirective(context, self._makeFactory(),
+                                  name='edit', form_id='form',
+                                  export_schema=True)
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_schema__':'1'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(json.loads(response.body)['form_id'], 'form')
+
+class TestFieldValidationView(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _makeOne(self, controller_factory, actions=(), form_id='form'):
+        from pyramid_formish.zcml import FieldValidationView
+        return FieldValidationView(controller_factory, actions, form_id)
+
+    def _makeFactory(self, static=False):
+        import schemaish
+        import validatish
+        fields = [('title', schemaish.String(validator=validatish.Required())),
+                  ('count', schemaish.Integer())]
+        factory = make_controller_factory(fields=fields)
+        class Controller(factory):
+            static_form = static
+        return Controller
+
+    def _callView(self, view, params):
+        request = testing.DummyRequest()
+        request.params = params
+        result = view(None, request)
+        self.failIf(hasattr(request, 'form'))
+        return result
+
+    def test_errors(self):
+        view = self._makeOne(self._makeFactory())
+        result = self._callView(view, {'__formish_validate__':'title, count',
+                                       'title':'', 'count':'x'})
+        self.assertEqual(sorted(result.keys()), ['count', 'title'])
+        self.assertEqual(result['count'], 'Not a valid integer')
+
+    def test_valid(self):
+        view = self._makeOne(self._makeFactory())
+        self.assertEqual(self._callView(view, {'__formish_validate__':'title',
+                                               'title':'x', 'count':'x'}),
+                         {})
+
+    def test_widgets(self):
+        import formish
+        import schemaish
+        import validatish
+        from webob.multidict import MultiDict
+        fields = [('born', schemaish.Date(validator=validatish.Required())),
+                  ('agreed', schemaish.Boolean())]
+        factory = make_controller_factory(
+            fields=fields, widgets={'born':formish.DateParts(),
+                                    'agreed':formish.Checkbox()})
+        view = self._makeOne(factory)
+        params = MultiDict([('__formish_validate__', 'born,agreed'),
+                            ('born.day', '1'), ('born.month', '2'),
+                            ('born.year', '2011'), ('agreed', 'True')])
+        self.assertEqual(self._callView(view, params), {})
+        params['born.month'] = '13'
+        self.assertEqual(self._callView(view, params).keys(), ['born'])
+
+    def test_no_names(self):
+        view = self._makeOne(self._makeFactory())
+        self.assertEqual(self._callView(view, {'__formish_validate__':''}),
+                         {})
+
+    def test_static_validator_kept(self):
+        from pyramid_formish.zcml import field_validator
+        factory = self._makeFactory(static=True)
+        view = self._makeOne(factory)
+        self._callView(view, {'__formish_validate__':'count', 'count':'1'})
+        validator = field_validator(factory(None, None), 'form')
+        self.failUnless('count' in validator.fields)
+        self.failUnless(field_validator(factory(None, None), 'form')
+                        is validator)
+
+    def test_registered_by_directive(self):
+        import json
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormDirective
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = FormDirective(context, self._makeFactory(),
+                                  name='edit', form_id='form',
+                                  validate_fields=True)
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_validate__':'title'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(json.loads(response.body).keys(), ['title'])
+        request = testing.DummyRequest()
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.body, '123')
+
+    def test_not_registered_by_default(self):
+        from pyramid.view import render_view_to_response
+        from zope.configuration.config import ConfigurationMachine
+        from pyramid_formish.zcml import FormDirective
+        context = ConfigurationMachine()
+        context.route_prefix = ''
+        context.registry = self.config.registry
+        context.autocommit = True
+        directive = FormDirective(context, self._makeFactory(),
+                                  name='edit', form_id='form')
+        directive.after()
+        request = testing.DummyRequest()
+        request.params = {'__formish_validate__':'title'}
+        response = render_view_to_response(None, request, 'edit')
+        self.assertEqual(response.body, '123')
+
 class TestAddTemplatePath(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
     def tearDown(self):
-        testing.cleanUp()
+        testing.tearDown()
         
     def _callFUT(self, context, path):
         from pyramid_formish.zcml import add_template_path
+        context.registry = self.config.registry
         return add_template_path(context, path)
 
     def test_abspath(self):
         from pyramid_formish.zcml import IFormishSearchPath
-        from zope.component import getUtility
+        getUtility = self.config.registry.getUtility
         import os.path
         here = os.path.dirname(__file__)
         abspath = os.path.abspath(here)
@@ -351,7 +1174,7 @@ class TestAddTemplatePath(unittest.TestCase):
     def test_pkg_relpath(self):
         from pyramid_formish.zcml import IFormishSearchPath
         import pyramid_formish.tests
-        from zope.component import getUtility
+        getUtility = self.config.registry.getUtility
         import os.path
         context = DummyZCMLContext(pyramid_formish.tests)
         self._callFUT(context, 'fixtures')
@@ -365,7 +1188,7 @@ class TestAddTemplatePath(unittest.TestCase):
     def test_pkg_abspath(self):
         from pyramid_formish.zcml import IFormishSearchPath
         import pyramid_formish.tests
-        from zope.component import getUtility
+        getUtility = self.config.registry.getUtility
         import os.path
         context = DummyZCMLContext(pyramid_formish.tests)
         self._callFUT(context, 'chameleon.formish.tests:fixtures')
@@ -375,6 +1198,18 @@ class TestAddTemplatePath(unittest.TestCase):
         self.assertEqual(getUtility(IFormishSearchPath),
                          [os.path.join(abspath, 'fixtures')]
                           )
+
+    def test_resets_default_renderer(self):
+        from pyramid_formish import get_default_renderer
+        import pyramid_formish.tests
+        registry = self.config.registry
+        before = get_default_renderer(registry)
+        context = DummyZCMLContext(pyramid_formish.tests)
+        self._callFUT(context, 'fixtures')
+        context.ac[0]['callable']()
+        renderer = get_default_renderer(registry)
+        self.failIf(renderer is before)
+        self.assertEqual(renderer('test.html', {}), u'<div>Fixtures</div>')
         
         
 class DummyZCMLContext:
@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+from convertish.convert import ConvertError
+from formish import util
+from formish.widgets import FileUpload
+from schemaish.type import File
+
+from pyramid.threadlocal import get_current_registry
+
+# the name under which spooled files are referred to in request data
+SPOOL_NAME = 'spool'
+COPY_BUFFER_SIZE = 64 * 1024
+
+_key_re = re.compile('^[0-9a-f]{32}$')
+
+class UploadTooLarge(Exception):
+    pass
+
+class SpooledFile(File):
+    """ An uploaded file spooled to disk by ``SpooledFileUpload``.  Its
+    ``file`` is opened when first used; ``path`` is the name of the spooled
+    file and ``size`` its size in bytes. """
+    def __init__(self, path, filename, mimetype, size):
+        self._file = None
+        File.__init__(self, None, filename, mimetype)
+        self.path = path
+        self.size = size
+
+    def _get_file(self):
+        if self._file is None and self.path is not None:
+            self._file = open(self.path, 'rb')
+        return self._file
+
+    def _set_file(self, file):
+        self._file = file
+
+    file = property(_get_file, _set_file)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def move_to(self, destination):
+        """ Move the spooled file to ``destination``.  This is a rename, and
+        so does not copy the file, when ``destination`` is on the same
+        filesystem as the spool directory. """
+        self.close()
+        shutil.move(self.path, destination)
+        remove(metadata_path(self.path))
+        self.path = destination
+
+    def discard(self):
+        """ Remove the spooled file """
+        self.close()
+        remove(self.path)
+        remove(metadata_path(self.path))
+        self.path = None
+
+def metadata_path(path):
+    return path + '.json'
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class SpooledFileUpload(FileUpload):
+    """ A file upload widget which copies each uploaded file once, in
+    chunks, to a file of its own in a spool directory (by default the
+    ``formish.upload_spool_dir`` setting, or the system's temporary
+    directory).  Files larger than ``max_size`` bytes, if given, are
+    refused with a field error.  The converted value of the field is a
+    ``SpooledFile``. """
+    too_large_message = 'File is larger than %(max_size)s bytes'
+
+    def __init__(self, spool_dir=None, max_size=None, **kw):
+        FileUpload.__init__(self, filestore=None, **kw)
+        self.spool_dir = spool_dir
+        self.max_size = max_size
+
+    def get_spool_dir(self):
+        if self.spool_dir is not None:
+            return self.spool_dir
+        settings = get_current_registry().settings or {}
+        return settings.get('formish.upload_spool_dir', tempfile.gettempdir())
+
+    def spool(self, fieldstorage):
+        """ Copy the uploaded file of ``fieldstorage`` into the spool
+        directory; return its key """
+        src = fieldstorage.file
+        if self.max_size is not None:
+            try:
+                size = os.fstat(src.fileno()).st_size
+            except (AttributeError, IOError, OSError):
+                # e.g. a StringIO holding a small upload
+                size = None
+            if size is not None and size > self.max_size:
+                raise UploadTooLarge(size)
+        key = uuid.uuid4().hex
+        path = os.path.join(self.get_spool_dir(), key)
+        fd = os.open(path, os.O_WRONLY|os.O_CREAT|os.O_EXCL, 0600)
+        dest = os.fdopen(fd, 'wb')
+        size = 0
+        try:
+            try:
+                src.seek(0)
+                while True:
+                    data = src.read(COPY_BUFFER_SIZE)
+                    if not data:
+                        break
+                    size += len(data)
+                    if self.max_size is not None and size > self.max_size:
+                        raise UploadTooLarge(size)
+                    dest.write(data)
+            finally:
+                dest.close()
+        except:
+            remove(path)
+            raise
+        metadata = {'filename':fieldstorage.filename,
+                    'mimetype':fieldstorage.type,
+                    'size':size}
+        f = open(metadata_path(path), 'wb')
+        try:
+            json.dump(metadata, f)
+        finally:
+            f.close()
+        return key
+
+    def pre_parse_incoming_request_data(self, field, data):
+        if data is None:
+            data = {}
+        if data.get('remove', [None])[0] is not None:
+            data['name'] = ['']
+            data['mimetype'] = ['']
+            return data
+        fieldstorage = data.get('file', [''])[0]
+        if getattr(fieldstorage, 'file', None):
+            try:
+                key = self.spool(fieldstorage)
+            except UploadTooLarge:
+                data['name'] = ['']
+                data['mimetype'] = ['']
+                data['too_large'] = ['true']
+                return data
+            data['name'] = [util.encode_file_resource_path(SPOOL_NAME, key)]
+            data['mimetype'] = [fieldstorage.type]
+        return data
+
+    def from_request_data(self, field, request_data):
+        if request_data.get('too_large'):
+            raise ConvertError(self.too_large_message %
+                               {'max_size':self.max_size})
+        if request_data['name'] == ['']:
+            return None
+        if request_data['name'] == request_data['default']:
+            return File(None, None, None)
+        name, key = util.decode_file_resource_path(request_data['name'][0])
+        if name != SPOOL_NAME or not _key_re.match(key):
+            return None
+        path = os.path.join(self.get_spool_dir(), key)
+        try:
+            f = open(metadata_path(path), 'rb')
+        except IOError:
+            return None
+        try:
+            metadata = json.load(f)
+        finally:
+            f.close()
+        return SpooledFile(path, metadata['filename'], metadata['mimetype'],
+                           metadata['size'])
@@ -0,0 +1,180 @@
+import threading
+from multiprocessing.pool import ThreadPool
+
+import schemaish
+import validatish
+
+from pyramid.threadlocal import get_current_registry
+from pyramid.threadlocal import manager
+
+from pyramid_formish import ValidationError
+
+DEFAULT_VALIDATOR_THREADS = 10
+
+# the ids of the I/O-bound validators which leave their checks until the rest
+# of the form has validated, set while ``validate_form`` validates a form
+_deferral = threading.local()
+_pool_lock = threading.Lock()
+
+class IOBound(validatish.Validator):
+    """ Wraps a validator which spends most of its time waiting for I/O,
+    e.g. on another service.  When a form is submitted through a
+    ``formish:form`` view, such validators are run concurrently, on a thread
+    pool, once the rest of the form has validated. """
+    def __init__(self, validator):
+        self.validator = validator
+
+    def __call__(self, value):
+        deferred = getattr(_deferral, 'validators', None)
+        if deferred and id(self) in deferred:
+            return
+        return self.validator(value)
+
+    def __repr__(self):
+        return 'io_bound(%r)' % (self.validator,)
+
+def io_bound(validator):
+    """ Mark ``validator`` as I/O-bound; may be used as a decorator """
+    return IOBound(validator)
+
+def io_bound_validators(validator):
+    """ Yield the ``IOBound`` validators of ``validator``, including those
+    combined into it with ``validatish.All`` """
+    if isinstance(validator, IOBound):
+        yield validator
+    elif isinstance(validator, validatish.All):
+        for child in validator.validators:
+            for found in io_bound_validators(child):
+                yield found
+
+def inline_io_bound_validators(validator, combined=False):
+    """ Yield the ``IOBound`` validators of ``validator`` which are combined
+    into it with ``validatish.Any``, and whose checks therefore cannot be
+    left until the rest of the form has validated """
+    if isinstance(validator, IOBound):
+        if combined:
+            yield validator
+    elif isinstance(validator, (validatish.All, validatish.Any)):
+        combined = combined or isinstance(validator, validatish.Any)
+        for child in validator.validators:
+            for found in inline_io_bound_validators(child, combined):
+                yield found
+
+def iter_attrs(attr):
+    """ Yield the schema ``attr`` and its children """
+    yield attr
+    if isinstance(attr, schemaish.Structure):
+        children = [ child for name, child in attr.attrs ]
+    elif isinstance(attr, schemaish.Sequence):
+        children = [attr.attr]
+    else:
+        children = []
+    for child in children:
+        for found in iter_attrs(child):
+            yield found
+
+def deferred_validators(attr):
+    """ Return the ids of the ``IOBound`` validators of the schema ``attr``
+    and its children whose checks ``validate_form`` leaves until the rest of
+    the form has validated: those used directly or combined with
+    ``validatish.All`` and nowhere in the schema with ``validatish.Any``.
+    Any other I/O-bound validator (e.g. one held by a validator of another
+    type) is run while the form is validated. """
+    deferred = set()
+    inline = set()
+    for child in iter_attrs(attr):
+        validator = getattr(child, 'validator', None)
+        for found in io_bound_validators(validator):
+            deferred.add(id(found))
+        for found in inline_io_bound_validators(validator):
+            inline.add(id(found))
+    return deferred - inline
+
+def iter_checks(attr, value, key=''):
+    """ Yield a ``(key, validator, value)`` triple for each I/O-bound
+    validator of the schema ``attr`` and its children, given the converted
+    data ``value`` """
+    for validator in io_bound_validators(getattr(attr, 'validator', None)):
+        yield key, validator, value
+    if value is None:
+        return
+    if isinstance(attr, schemaish.Structure):
+        children = [ (name, child, value.get(name))
+                     for name, child in attr.attrs ]
+    elif isinstance(attr, schemaish.Sequence):
+        children = [ (str(i), attr.attr, item)
+                     for i, item in enumerate(value) ]
+    else:
+        children = []
+    for name, child, child_value in children:
+        if key:
+            name = '%s.%s' % (key, name)
+        for check in iter_checks(child, child_value, name):
+            yield check
+
+def get_pool(registry):
+    """ Return the thread pool of ``registry`` on which I/O-bound validators
+    are run, creating it the first time it is needed.  Its size is set by
+    the ``formish.validator_threads`` setting. """
+    try:
+        return registry.formish_validator_pool
+    except AttributeError:
+        pass
+    _pool_lock.acquire()
+    try:
+        pool = getattr(registry, 'formish_validator_pool', None)
+        if pool is None:
+            settings = registry.settings or {}
+            size = int(settings.get('formish.validator_threads',
+                                    DEFAULT_VALIDATOR_THREADS))
+            pool = registry.formish_validator_pool = ThreadPool(size)
+        return pool
+    finally:
+        _pool_lock.release()
+
+def run_checks(checks, registry=None):
+    """ Run the I/O-bound validator ``checks`` (as yielded by
+    ``iter_checks``), concurrently if there are several.  Return a
+    dictionary mapping the key of each check which failed to its error. """
+    if registry is None:
+        registry = get_current_registry()
+    # validators see the registry and request of the submission
+    threadlocals = manager.get()
+    def run(check):
+        key, validator, value = check
+        manager.push(threadlocals)
+        try:
+            validator.validator(value)
+        except validatish.Invalid, e:
+            return key, e
+        finally:
+            manager.pop()
+    if len(checks) == 1:
+        results = [run(checks[0])]
+    else:
+        results = get_pool(registry).map(run, checks)
+    errors = {}
+    for result in results:
+        if result is not None:
+            key, error = result
+            errors.setdefault(key, error)
+    return errors
+
+def validate_form(form, request):
+    """ Validate the submission of ``form`` in ``request``.  I/O-bound
+    validators (see ``deferred_validators``) are only run, concurrently,
+    when the rest of the form is valid; if any of them fail, raise a
+    ``ValidationError`` with their errors. """
+    deferred = deferred_validators(form.structure.attr)
+    _deferral.validators = deferred
+    try:
+        converted = form.validate(request, check_form_name=False)
+    finally:
+        _deferral.validators = None
+    checks = [ check for check in iter_checks(form.structure.attr, converted)
+               if id(check[1]) in deferred ]
+    if checks:
+        errors = run_checks(checks)
+        if errors:
+            raise ValidationError(**errors)
+    return converted
@@ -4,7 +4,8 @@ from pkg_resources import resource_filename
 from formish import validation
 import schemaish
 
-from zope.component import getSiteManager
+from webob.datetime_utils import parse_date
+from webob.datetime_utils import serialize_date
 
 import zope.configuration.config
 from zope.configuration.fields import GlobalObject
@@ -15,11 +16,28 @@ from zope.interface import implements
 
 from zope.schema import TextLine
 from zope.schema import Bool
+from zope.schema import Int
 
 from pyramid_formish import Form
 from pyramid_formish import ValidationError
 from pyramid_formish import IFormishSearchPath
+from pyramid_formish import DEFAULT_RESULT_CACHE_TTL
+from pyramid_formish import RenderCache
+from pyramid_formish import ResultCache
+from pyramid_formish import definition_token
+from pyramid_formish import digest
+from pyramid_formish import get_result_caches
+from pyramid_formish import reset_default_renderer
+from pyramid_formish.bulk import FieldValidator
+from pyramid_formish.describe import FormDescription
+from pyramid_formish.events import timed
+from pyramid_formish.validators import validate_form
 from pyramid.config import Configurator
+from pyramid.decorator import reify
+from pyramid.httpexceptions import HTTPNotFound
+from pyramid.httpexceptions import HTTPNotModified
+from pyramid.response import Response
+from pyramid.threadlocal import get_current_registry
 
 class IFormsDirective(Interface):
     view = GlobalObject(title=u'view', required=False)
@@ -42,10 +60,17 @@ class IFormDirective(Interface):
     wrapper = TextLine(title = u'wrapper', required=False)
     form_id = TextLine(title = u'name', required=False)
     method = TextLine(title = u'method', required=False)
+    render_cache_size = Int(title=u'render_cache_size', required=False)
+    validate_fields = Bool(title=u'validate_fields', required=False)
+    render_fields = Bool(title=u'render_fields', required=False)
+    export_schema = Bool(title=u'export_schema', required=False)
+    result_cache_size = Int(title=u'result_cache_size', required=False)
+    result_cache_ttl = Int(title=u'result_cache_ttl', required=False)
 
 class IFormInsideFormsDirective(Interface):
     controller = GlobalObject(title=u'display', required=True)
     form_id = TextLine(title = u'name', required=True)
+    render_cache_size = Int(title=u'render_cache_size', required=False)
 
 class FormsDirective(zope.configuration.config.GroupingContextDecorator):
     implements(zope.configuration.config.IConfigurationContext,
@@ -66,50 +91,108 @@ class FormsDirective(zope.configuration.config.GroupingContextDecorator):
         self.forms = []
 
     def after(self):
+        recorder = getattr(self.context.registry, 'formish_plan_recorder',
+                           None)
+        if recorder is not None:
+            recorder.forms(self)
         config = Configurator.with_context(self.context)
-        derived_view = config.derive_view(self.view)
-
-        def forms_view(context, request):
-            forms = []
-            for formdef in self.forms:
-                formid = formdef.form_id
-                actions = formdef._actions
-                controller = formdef.controller(context, request)
-                form = form_from_controller(controller, formid, actions)
-                form.controller = controller
-                form.bfg_actions = actions
-                forms.append((formid, form))
-
-            request.forms = [ x[1] for x in forms ]
-            request_formid = request.params.get('__formish_form__')
-
-            for formid, form in forms:
-                if formid == request_formid:
-                    for action in form.bfg_actions:
-                        if action.name in request.params:
-                            def curried_view():
-                                return derived_view(context, request)
-                            return submitted(request, form, form.controller,
-                                             action, curried_view)
-
-            return derived_view(context, request)
-
-        config.add_view(
-            permission=self.permission,
-            for_=self.for_,
-            view=forms_view,
-            name=self.name,
-            route_name=self.route_name,
-            containment=self.containment,
-            renderer=self.renderer,
-            wrapper=self.wrapper)
+        register_forms_view(config, self.view, self.forms,
+                            permission=self.permission,
+                            for_=self.for_,
+                            name=self.name,
+                            route_name=self.route_name,
+                            containment=self.containment,
+                            renderer=self.renderer,
+                            wrapper=self.wrapper)
+
+def dispatch_table(formdefs):
+    """ Return a dictionary mapping ``(form_id, action_name)`` to the index
+    of the form definition in ``formdefs`` and the action, and a dictionary
+    mapping each form id to the names of its actions in the order they were
+    declared.  When several forms share an id, an action name belongs to the
+    first of them which declares it. """
+    table = {}
+    action_names = {}
+    for index, formdef in enumerate(formdefs):
+        form_id = formdef.form_id
+        names = action_names.setdefault(form_id, [])
+        for action in formdef._actions:
+            key = (form_id, action.name)
+            if key not in table:
+                table[key] = (index, action)
+                names.append(action.name)
+    return table, action_names
+
+def register_forms_view(config, view, formdefs, **view_kw):
+    """ Add a view which displays ``view`` with the forms of ``formdefs`` as
+    ``request.forms`` and dispatches their submissions """
+    derived_view = config.derive_view(view)
+    table, action_names = dispatch_table(formdefs)
+
+    def forms_view(context, request):
+        forms = LazyForms(formdefs, context, request)
+        request.forms = forms
+        params = request.params
+        request_formid = params.get('__formish_form__')
+
+        for name in action_names.get(request_formid, ()):
+            if name in params:
+                index, action = table[(request_formid, name)]
+                form = forms[index]
+                def curried_view():
+                    return derived_view(context, request)
+                return submitted(request, form, form.controller,
+                                 action, curried_view)
+
+        return derived_view(context, request)
+
+    config.add_view(view=forms_view, **view_kw)
+
+class LazyForms(object):
+    """ The sequence of forms of a ``formish:forms`` group; each form (and
+    its controller) is only created when it is first accessed """
+    def __init__(self, formdefs, context, request):
+        self.formdefs = formdefs
+        self.context = context
+        self.request = request
+        self.forms = {}
+
+    def __len__(self):
+        return len(self.formdefs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ self[i] for i in range(*index.indices(len(self))) ]
+        if index < 0:
+            index += len(self)
+            if index < 0:
+                raise IndexError('form index out of range')
+        form = self.forms.get(index)
+        if form is None:
+            formdef = self.formdefs[index]
+            controller = formdef.controller(self.context, self.request)
+            render_cache = getattr(formdef, 'render_cache', None)
+            method = getattr(formdef, 'method', 'POST')
+            form = timed('build', formdef.form_id, None,
+                         form_from_controller, controller, formdef.form_id,
+                         formdef._actions, method, render_cache)
+            form.bfg_actions = formdef._actions
+            self.forms[index] = form
+        return form
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
 
 class FormDirective(zope.configuration.config.GroupingContextDecorator):
     implements(zope.configuration.config.IConfigurationContext,
                IFormDirective)
     def __init__(self, context, controller, for_=None, name='',
                  renderer=None, permission=None, containment=None,
-                 route_name=None, wrapper=None, form_id=None, method=None):
+                 route_name=None, wrapper=None, form_id=None, method=None,
+                 render_cache_size=None, validate_fields=False,
+                 render_fields=False, export_schema=False,
+                 result_cache_size=None, result_cache_ttl=None):
         self.context = context
         self.controller = controller
         self.for_ = for_
@@ -120,57 +203,386 @@ class FormDirective(zope.configuration.config.GroupingContextDecorator):
         self.route_name = route_name
         self.wrapper = wrapper
         self.form_id = form_id
-        method = method or 'POST'
-        if method not in ('GET', 'POST'):
-            raise ConfigurationError(
-                'method must be one of "GET" or "POST" (not "%s")' % method)
-        self.method = method
+        self.method = check_method(method)
+        self.render_cache_size = render_cache_size
+        self.render_cache = make_render_cache(render_cache_size)
+        self.validate_fields = validate_fields
+        self.render_fields = render_fields
+        self.export_schema = export_schema
+        self.result_cache_size = result_cache_size
+        self.result_cache_ttl = result_cache_ttl
+        self.result_cache = make_result_cache(
+            result_cache_size, result_cache_ttl, self.method)
         self._actions = [] # mutated by subdirectives
 
     def after(self):
         if getattr(self.context, 'forms', None) is not None:
             self.context.forms.append(self)
             return
-        
-        config = Configurator.with_context(self.context)
-        display_action = FormAction(None)
-        for action in [display_action] + self._actions:
-            form_view = FormView(self.controller, action, self._actions,
-                                 self.form_id, self.method)
 
-            config.add_view(permission=self.permission,
+        recorder = getattr(self.context.registry, 'formish_plan_recorder',
+                           None)
+        if recorder is not None:
+            recorder.form(self)
+        config = Configurator.with_context(self.context)
+        register_form_views(config, self,
+                            permission=self.permission,
                             for_=self.for_,
-                            view=form_view,
                             name=self.name,
-                            request_param=action.name,
                             route_name=self.route_name,
                             containment=self.containment,
                             renderer=self.renderer,
                             wrapper=self.wrapper)
 
+def check_method(method):
+    method = method or 'POST'
+    if method not in ('GET', 'POST'):
+        raise ConfigurationError(
+            'method must be one of "GET" or "POST" (not "%s")' % method)
+    return method
+
+def make_render_cache(render_cache_size):
+    if render_cache_size:
+        return RenderCache(render_cache_size)
+
+def make_result_cache(result_cache_size, result_cache_ttl, method):
+    if not result_cache_size:
+        return None
+    if method != 'GET':
+        raise ConfigurationError(
+            'result_cache_size may only be used on forms whose method is '
+            '"GET"')
+    if result_cache_ttl is None:
+        result_cache_ttl = DEFAULT_RESULT_CACHE_TTL
+    return ResultCache(result_cache_size, result_cache_ttl)
+
+def register_form_views(config, formdef, **view_kw):
+    """ Add a view displaying the form of ``formdef`` and a view for each of
+    its actions, and, if ``formdef.validate_fields``,
+    ``formdef.render_fields`` or ``formdef.export_schema`` are true, views
+    validating or rendering some of its fields or describing them """
+    if formdef.result_cache is not None:
+        caches = get_result_caches(config.registry)
+        caches.setdefault(formdef.form_id, []).append(formdef.result_cache)
+    display_action = FormAction(None)
+    for action in [display_action] + formdef._actions:
+        form_view = FormView(formdef.controller, action, formdef._actions,
+                             formdef.form_id, formdef.method,
+                             formdef.render_cache, formdef.result_cache,
+                             view_kw.get('wrapper'))
+        config.add_view(view=form_view, request_param=action.name, **view_kw)
+    if formdef.render_fields:
+        field_view = FieldView(formdef.controller, formdef._actions,
+                               formdef.form_id, formdef.method,
+                               formdef.render_cache)
+        config.add_view(view=field_view, request_param=FIELD_RENDER_PARAM,
+                        **dict(view_kw, renderer=None, wrapper=None))
+    if formdef.export_schema:
+        schema_view = SchemaView(formdef.controller, formdef._actions,
+                                 formdef.form_id, formdef.method)
+        config.add_view(view=schema_view, request_param=SCHEMA_PARAM,
+                        **dict(view_kw, renderer=None, wrapper=None))
+    if formdef.validate_fields:
+        validation_view = FieldValidationView(
+            formdef.controller, formdef._actions, formdef.form_id,
+            formdef.method)
+        config.add_view(view=validation_view,
+                        request_param=FIELD_VALIDATION_PARAM,
+                        **dict(view_kw, renderer='json', wrapper=None))
+
 class FormView(object):
     def __init__(self, controller_factory, action, actions, form_id=None,
-                 method='POST'):
+                 method='POST', render_cache=None, result_cache=None,
+                 wrapper=None):
         self.controller_factory = controller_factory
         self.action = action
         self.actions = actions
         self.form_id = form_id
         self.method = method
+        self.render_cache = render_cache
+        self.result_cache = result_cache
+        self.wrapper = wrapper
 
     def __call__(self, context, request):
         controller = self.controller_factory(context, request)
-        form = form_from_controller(controller, self.form_id, self.actions,
-                                    self.method)
+        validators = None
+        # the response of a wrapped view is only the body of the wrapper's
+        # own, which would not pass on a 304 or the validators
+        if not self.action.name and not self.wrapper:
+            validators = cache_validators(controller)
+            if validators is not None and not_modified(request, *validators):
+                return set_validators(HTTPNotModified(), *validators)
+
+        form = timed('build', self.form_id, self.action.name,
+                     form_from_controller, controller, self.form_id,
+                     self.actions, self.method, self.render_cache)
         request.form = form
 
         if not self.action.name:
             # GET view
-            return controller()
+            result = controller()
+            if validators is not None:
+                if isinstance(result, Response):
+                    set_validators(result, *validators)
+                else:
+                    # rendered into request.response by the view's renderer
+                    set_validators(request.response, *validators)
+            return result
 
         # the result of a form submission
-        return submitted(request, form, controller, self.action, controller)
+        return submitted(request, form, controller, self.action, controller,
+                         self.result_cache)
+
+# the request parameter naming the field rendered by a FieldView
+FIELD_RENDER_PARAM = '__formish_field__'
+
+class FieldView(object):
+    """ Renders the field (or structure or sequence) of a form named by the
+    ``__formish_field__`` parameter of a request, e.g. to replace it in a
+    page, without calling the display method.  Data submitted to the form
+    in the request is rendered in the field's inputs. """
+    def __init__(self, controller_factory, actions, form_id=None,
+                 method='POST', render_cache=None):
+        self.controller_factory = controller_factory
+        self.actions = actions
+        self.form_id = form_id
+        self.method = method
+        self.render_cache = render_cache
+
+    def __call__(self, context, request):
+        controller = self.controller_factory(context, request)
+        form = timed('build', self.form_id, FIELD_RENDER_PARAM,
+                     form_from_controller, controller, self.form_id,
+                     self.actions, self.method, self.render_cache)
+        request.form = form
+        if submits_to(form, request):
+            form.request = request
+        try:
+            html = form.render_field(request.params[FIELD_RENDER_PARAM])
+        except KeyError:
+            return HTTPNotFound()
+        return Response(html.encode('utf-8'))
+
+def submits_to(form, request):
+    """ Return True if ``request`` submits data to ``form``: it names the
+    form, or, if the form has no name, it has parameters for its fields """
+    data = getattr(request, form.method.upper())
+    if form.name is not None:
+        return data.get('__formish_form__') == form.name
+    names = set([ name for name, attr in form.structure.attr.attrs ])
+    for key in data:
+        if key.split('.', 1)[0] in names:
+            return True
+    return False
+
+# the request parameter naming the fields validated by a FieldValidationView
+FIELD_VALIDATION_PARAM = '__formish_validate__'
+
+class FieldValidationView(object):
+    """ Converts and validates the fields of a form named, separated by
+    commas, by the ``__formish_validate__`` parameter of a request, without
+    building the form.  Returns a dictionary mapping the names of those
+    which are invalid to their error messages, for the ``json`` renderer.
+    """
+    def __init__(self, controller_factory, actions, form_id=None,
+                 method='POST'):
+        self.controller_factory = controller_factory
+        self.actions = actions
+        self.form_id = form_id
+        self.method = method
+
+    def __call__(self, context, request):
+        controller = self.controller_factory(context, request)
+        params = request.params
+        names = [ name.strip() for name in
+                  params[FIELD_VALIDATION_PARAM].split(',') ]
+        validator = field_validator(controller, self.form_id, self.actions,
+                                    self.method)
+        return timed('validate', self.form_id, FIELD_VALIDATION_PARAM,
+                     validator, [ name for name in names if name ], params)
+
+# the request parameter asking a SchemaView for the description of a form
+SCHEMA_PARAM = '__formish_schema__'
+
+DEFAULT_SCHEMA_MAX_AGE = 86400
+
+class SchemaView(object):
+    """ Responds to requests with a ``__formish_schema__`` parameter with a
+    JSON description of the fields and validators of a form (see
+    ``pyramid_formish.describe``).  The description of a static form is
+    computed once, and may be cached by browsers and proxies for the number
+    of seconds of the ``formish.schema_max_age`` setting; those of other
+    forms must be revalidated each time they are used. """
+    def __init__(self, controller_factory, actions, form_id=None,
+                 method='POST'):
+        self.controller_factory = controller_factory
+        self.actions = actions
+        self.form_id = form_id
+        self.method = method
+
+    def __call__(self, context, request):
+        controller = self.controller_factory(context, request)
+        static = getattr(controller, 'static_form', False)
+        if static:
+            description = get_blueprint(controller, self.form_id,
+                                        self.actions,
+                                        self.method).description
+        else:
+            description = FormDescription(controller.form_fields(),
+                                          self.form_id)
+        if_none_match = getattr(request, 'if_none_match', None)
+        if if_none_match and description.etag in if_none_match:
+            response = HTTPNotModified()
+        else:
+            response = Response(description.body,
+                                content_type='application/json')
+        response.etag = description.etag
+        if static:
+            settings = get_current_registry().settings or {}
+            response.cache_control.public = True
+            response.cache_control.max_age = int(settings.get(
+                'formish.schema_max_age', DEFAULT_SCHEMA_MAX_AGE))
+        else:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+        return response
+
+def field_validator(controller, form_id, actions=(), method='POST'):
+    """ Return a ``FieldValidator`` for the form of ``controller``; that of
+    a static form is created once and kept by its blueprint """
+    if not getattr(controller, 'static_form', False):
+        form_fields = controller.form_fields()
+        widgets = None
+        if hasattr(controller, 'form_widgets'):
+            widgets = controller.form_widgets(form_fields)
+        return FieldValidator(form_fields, widgets)
+    return get_blueprint(controller, form_id, actions, method).field_validator
+
+def cache_validators(controller):
+    """ Return the version and the last modification time of the display of
+    the form of ``controller``, as returned by its optional
+    ``form_version`` and ``form_last_modified`` methods, or None if it
+    supplies neither """
+    version = last_modified = None
+    if hasattr(controller, 'form_version'):
+        version = controller.form_version()
+    if hasattr(controller, 'form_last_modified'):
+        last_modified = controller.form_last_modified()
+    if version is None and last_modified is None:
+        return None
+    if version is not None:
+        version = str(version)
+    if last_modified is not None:
+        # as precise as the HTTP dates it is compared with
+        last_modified = parse_date(serialize_date(last_modified))
+    return version, last_modified
+
+def not_modified(request, version, last_modified):
+    """ Return True if ``request`` is a conditional GET whose client holds
+    the current display of a form """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # webob requests only; If-None-Match takes precedence over
+    # If-Modified-Since
+    if_none_match = getattr(request, 'if_none_match', None)
+    if if_none_match:
+        return version is not None and version in if_none_match
+    if_modified_since = getattr(request, 'if_modified_since', None)
+    if last_modified is not None and if_modified_since is not None:
+        return last_modified <= if_modified_since
+    return False
+
+def set_validators(response, version, last_modified):
+    if version is not None:
+        response.etag = version
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+class FormBlueprint(object):
+    """ The request-independent parts of a form (its schema, widgets,
+    actions and method), computed from a controller.  The forms bound from
+    a blueprint share its widgets and actions rather than copying them. """
+    def __init__(self, controller, form_id, actions=(), method='POST'):
+        self.form_id = form_id
+        self.actions = tuple(actions)
+        self.method = method
+        self.schema = schemaish.Structure()
+        form_fields = controller.form_fields()
+        for fieldname, field in form_fields:
+            self.schema.add(fieldname, field)
+        self.widgets = {}
+        if hasattr(controller, 'form_widgets'):
+            self.widgets = controller.form_widgets(form_fields)
+        prototype = self.form()
+        for action in self.actions:
+            prototype.add_action(action.name, action.title)
+        for name, widget in self.widgets.items():
+            prototype[name].widget = widget
+        resolve_widgets(prototype.structure)
+        self.item_data = prototype.item_data
+        self.form_actions = prototype._actions
+        self.token = definition_token()
+
+    def form(self):
+        return Form(self.schema, name=self.form_id, add_default_action=False,
+                    method=self.method)
+
+    @reify
+    def field_validator(self):
+        return FieldValidator(self.schema.attrs, self.widgets)
+
+    @reify
+    def description(self):
+        return FormDescription(self.schema.attrs, self.form_id)
+
+    def bind(self, controller, render_cache=None):
+        form = self.form()
+        form.share(self.item_data, self.form_actions, self.token)
+        form.controller = controller
+        form.render_cache = render_cache
+
+        if hasattr(controller, 'form_defaults'):
+            form.defaults = controller.form_defaults()
+
+        return form
+
+def resolve_widgets(collection):
+    """ Store the default widget of each field of ``collection`` in the
+    item data of its form, as rendering it would """
+    for field in collection.fields:
+        field.widget
+        if hasattr(field, 'fields'):
+            resolve_widgets(field)
+
+def get_blueprint(controller, form_id, actions=(), method='POST',
+                  registry=None):
+    """ Return the blueprint of the form of ``controller``, whose class
+    declares ``static_form``.  It is built once and kept on ``registry`` (by
+    default, the current registry), keyed on the controller class, the form
+    id, the names, titles and validation of the actions and the method. """
+    if registry is None:
+        registry = get_current_registry()
+    try:
+        blueprints = registry.formish_blueprints
+    except AttributeError:
+        blueprints = registry.formish_blueprints = {}
+    key = (controller.__class__, form_id,
+           tuple([ (action.name, action.title, action.validate)
+                   for action in actions ]),
+           method)
+    blueprint = blueprints.get(key)
+    if blueprint is None:
+        blueprint = FormBlueprint(controller, form_id, actions, method)
+        blueprints[key] = blueprint
+    return blueprint
+
+def form_from_controller(controller, form_id, actions=(), method='POST',
+                         render_cache=None):
+    if getattr(controller, 'static_form', False):
+        blueprint = get_blueprint(controller, form_id, actions, method)
+        return blueprint.bind(controller, render_cache)
 
-def form_from_controller(controller, form_id, actions=(), method='POST'):
     form_schema = schemaish.Structure()
 
     form_fields = controller.form_fields()
@@ -179,35 +591,55 @@ def form_from_controller(controller, form_id, actions=(), method='POST'):
     form = Form(form_schema, name=form_id, add_default_action=False,
                 method=method)
     form.controller = controller
+    form.render_cache = render_cache
 
     for action in actions:
         form.add_action(action.name, action.title)
 
-    form_widgets = []
     if hasattr(controller, 'form_widgets'):
         form_widgets = controller.form_widgets(form_fields)
         for name, widget in form_widgets.items():
             form[name].widget = widget
 
-    defaults = None
     if hasattr(controller, 'form_defaults'):
-        defaults = controller.form_defaults()
-        form.defaults = defaults
+        form.defaults = controller.form_defaults()
 
     return form
 
-def submitted(request, form, controller, action, view):
+def extra_params(form, request):
+    """ Return the sorted ``(name, value)`` pairs of the parameters of the
+    submission of ``form`` in ``request`` which are not data of its fields,
+    e.g. the page of the results of a search """
+    names = set([ name for name, attr in form.structure.attr.attrs ])
+    params = getattr(request, form.method.upper())
+    return sorted([ (key, value) for key, value in params.items()
+                    if key.split('.')[0] not in names ])
+
+def submitted(request, form, controller, action, view, result_cache=None):
     handler = 'handle_%s' % action.name
+    form_id = form.name
     if action.validate:
         if hasattr(controller, 'validate'):
-            result = controller.validate()
+            result = timed('validate', form_id, action.name,
+                           controller.validate)
         else:
             try:
-                converted = form.validate(request, check_form_name=False)
+                converted = timed('validate', form_id, action.name,
+                                  validate_form, form, request)
                 if action.success:
-                    result = action.success(controller, converted)
+                    handle = lambda: timed('handle', form_id, action.name,
+                                           action.success, controller,
+                                           converted)
                 else:
-                    result = getattr(controller, handler)(converted)
+                    handle = lambda: timed('handle', form_id, action.name,
+                                           getattr(controller, handler),
+                                           converted)
+                if result_cache is None:
+                    result = handle()
+                else:
+                    key = (request.path, action.name,
+                           digest((converted, extra_params(form, request))))
+                    result = result_cache.load(key, handle)
             except validation.FormError, e:
                 result = view()
             except ValidationError, e:
@@ -215,7 +647,8 @@ def submitted(request, form, controller, action, view):
                     form.errors[k] = v
                 result = view()
     else:
-        result = getattr(controller, handler)()
+        result = timed('handle', form_id, action.name,
+                       getattr(controller, handler))
 
     return result
 
@@ -262,14 +695,18 @@ def add_template_path(context, path):
         name = package.__name__
         fullpath = resource_filename(name, path)
 
+    recorder = getattr(context.registry, 'formish_plan_recorder', None)
+    if recorder is not None:
+        recorder.template_path(context, fullpath)
+
     def callback():
-        sm = getSiteManager()
-        search_path = sm.queryUtility(IFormishSearchPath, default=[])
-        search_path.append(fullpath)
-        sm.registerUtility(search_path, IFormishSearchPath)
+        add_search_path(context.registry, fullpath)
 
     context.action(discriminator=None, callable=callback)
 
-        
-        
-    
+def add_search_path(registry, path):
+    """ Append ``path`` to the template search path of ``registry`` """
+    search_path = registry.queryUtility(IFormishSearchPath, default=[])
+    search_path.append(path)
+    registry.registerUtility(search_path, IFormishSearchPath)
+    reset_default_renderer(registry)
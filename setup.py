@@ -61,6 +61,8 @@ setup(name='pyramid_formish',
       entry_points = """\
         [console_scripts]
         bfgformish2pyramidformish = pyramid_formish.fix_formish_imports:main
+        formish_precompile = pyramid_formish.precompile:main
+        formish_benchmark = pyramid_formish.benchmark:main
       """
       )
 